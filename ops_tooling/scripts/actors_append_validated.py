@@ -4,8 +4,11 @@ import json
 import os
 import sys
 import tempfile
+from pathlib import Path
 from typing import Any, Dict, List, Tuple
 
+from schema_validation import validate_file
+
 
 def load_json(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as handle:
@@ -153,6 +156,12 @@ def main() -> int:
         default="docs/canon/actors/dm_actor_model_v1.json",
         help="Path to actor model doc",
     )
+    parser.add_argument(
+        "--model-schema",
+        dest="model_schema",
+        default="docs/canon/actors/dm_actor_model_v1.schema.json",
+        help="Path to actor model JSON Schema",
+    )
     parser.add_argument("--validate-only", dest="validate_only", action="store_true")
     args = parser.parse_args()
     intake_path = "ops_tooling/updates/actors_inbox/dm_actors_v1.src.json"
@@ -185,6 +194,14 @@ def main() -> int:
         print("NO_ACTORS_TO_APPEND no actors to append")
         return 0
 
+    model_issues = validate_file(Path(args.model_schema), Path(args.model_doc))
+    if model_issues:
+        print("E_ACTOR_MODEL_SCHEMA_VALIDATION")
+        for issue in model_issues:
+            print(f"path: {issue['path']}")
+            print(f"message: {issue['message']}")
+        return 1
+
     model_doc = load_json(args.model_doc)
     required, allowed, scalar_enums, array_enums = derive_schema(model_doc)
 
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Apply ops_tooling/db/migrations/*.sql and record them in dm.migration_ledger.
+
+Connection settings come from the standard libpq env vars (PGHOST, PGPORT,
+PGDATABASE, PGUSER, PGPASSWORD, PGSSLMODE), the same ones the DB workflows use.
+
+A deploy opens two psql sessions whatever the number of migrations:
+1) bootstrap the ledger and read it in one query
+2) apply every pending migration, each in its own transaction together with
+   its ledger row, timed with clock_timestamp() on the server
+
+Files are hashed in parallel. Checksums of applied migrations are compared
+before anything runs, so an edited migration stops the deploy with nothing
+applied.
+
+Statements that cannot run inside a transaction block (create index
+concurrently, vacuum, alter type ... add value on PG 11 or when the new value
+is used in the same file) need the file to opt out with this line in its
+leading comment header:
+
+  -- dm:no-transaction
+
+Such a file runs statement by statement in autocommit mode and its ledger row
+is written after the last statement succeeds. A failure leaves the statements
+before it applied and no ledger row, so the file is retried on the next
+deploy: write it to be rerunnable (if not exists, if exists).
+
+db_migrate_selftest.py exercises this runner against a scratch database on
+a local Postgres.
+
+Writes out/<UTC timestamp>__migration_status.csv
+(filename,repo_checksum,db_checksum,db_applied_at,status).
+
+Usage:
+  python db_migrate.py --plan     # dry run: read the ledger, report, apply nothing
+  python db_migrate.py
+"""
+import argparse
+import csv
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+MIGRATIONS_DIR = REPO_ROOT / "ops_tooling" / "db" / "migrations"
+HASH_WORKERS = min(8, (os.cpu_count() or 1) + 4)
+NO_TRANSACTION_MARKER = "-- dm:no-transaction"
+
+BOOTSTRAP_SQL = """
+begin;
+
+create schema if not exists dm;
+
+create table if not exists dm.migration_ledger (
+  id bigserial primary key,
+  filename text not null unique,
+  checksum text not null,
+  applied_at timestamptz not null default now()
+);
+
+commit;
+"""
+
+# Plan mode must not create anything, so the ledger may not exist yet.
+LEDGER_SQL = """
+select to_regclass('dm.migration_ledger') is not null as ledger_exists \\gset
+\\if :ledger_exists
+select 'L|' || filename || '|' || checksum || '|' || applied_at from dm.migration_ledger;
+\\endif
+"""
+
+
+@dataclass
+class Migration:
+    path: Path
+    checksum: str
+    db_checksum: Optional[str] = None
+    db_applied_at: Optional[str] = None
+    status: str = "PENDING"
+    elapsed_ms: Optional[float] = None
+    no_transaction: bool = False
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+
+def die(msg: str, code: int = 1) -> None:
+    print(msg, file=sys.stderr)
+    raise SystemExit(code)
+
+
+def _psql_cmd() -> List[str]:
+    return ["psql", "-v", "ON_ERROR_STOP=1", "-X", "-q", "-tA"]
+
+
+def psql_script(sql: str) -> str:
+    result = subprocess.run(_psql_cmd(), input=sql, capture_output=True, text=True)
+    if result.returncode != 0:
+        die(f"psql failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def wants_no_transaction(path: Path) -> bool:
+    """True when the leading comment header carries NO_TRANSACTION_MARKER."""
+    with path.open("r", encoding="utf-8", errors="replace") as handle:
+        for line in handle:
+            stripped = line.strip()
+            if not stripped:
+                continue
+            if not stripped.startswith("--"):
+                return False
+            if stripped.lower() == NO_TRANSACTION_MARKER:
+                return True
+    return False
+
+
+def _inspect(path: Path) -> Migration:
+    return Migration(path, sha256_file(path), no_transaction=wants_no_transaction(path))
+
+
+def discover(migrations_dir: Path) -> List[Migration]:
+    paths = sorted(p for p in migrations_dir.glob("*.sql") if p.is_file())
+    with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool:
+        return list(pool.map(_inspect, paths))
+
+
+def read_ledger(bootstrap: bool) -> Dict[str, Tuple[str, str]]:
+    """filename -> (checksum, applied_at), in one session and one ledger query."""
+    output = psql_script((BOOTSTRAP_SQL if bootstrap else "") + LEDGER_SQL)
+    ledger: Dict[str, Tuple[str, str]] = {}
+    for line in output.splitlines():
+        if not line.startswith("L|"):
+            continue
+        _tag, filename, checksum, applied_at = line.split("|", 3)
+        ledger[filename] = (checksum, applied_at)
+    return ledger
+
+
+def plan(migrations: List[Migration], ledger: Dict[str, Tuple[str, str]]) -> List[Migration]:
+    """Mark applied and mismatched migrations. Returns the pending ones in order."""
+    pending = []
+    for mig in migrations:
+        row = ledger.get(mig.filename)
+        if row is None:
+            pending.append(mig)
+            continue
+        mig.db_checksum, mig.db_applied_at = row
+        mig.status = "ALREADY_APPLIED" if mig.db_checksum == mig.checksum else "CHECKSUM_MISMATCH"
+    return pending
+
+
+def apply_script(pending: List[Migration]) -> str:
+    parts = []
+    for mig in pending:
+        name = _sql_literal(mig.filename)
+        begin, commit = ("", "") if mig.no_transaction else ("begin;\n", "commit;\n")
+        parts.append(
+            f"select 'T|begin|' || {name} || '|' || extract(epoch from clock_timestamp());\n"
+            f"{begin}"
+            f"\\i {_sql_literal(str(mig.path))}\n"
+            f"insert into dm.migration_ledger (filename, checksum) values ({name}, {_sql_literal(mig.checksum)});\n"
+            f"{commit}"
+            f"select 'T|commit|' || {name} || '|' || extract(epoch from clock_timestamp()) || '|' || applied_at\n"
+            f"from dm.migration_ledger where filename = {name};\n"
+        )
+    return "".join(parts)
+
+
+def apply_pending(pending: List[Migration]) -> bool:
+    """Apply pending migrations over one psql session. Returns False on the first failure."""
+    by_name = {mig.filename: mig for mig in pending}
+    started: Dict[str, float] = {}
+    current: Optional[Migration] = None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # A script file rather than stdin, so large migration output cannot
+        # block psql while the script is still being written.
+        script = Path(tmp) / "apply.sql"
+        script.write_text(apply_script(pending), encoding="utf-8")
+        proc = subprocess.Popen(_psql_cmd() + ["-f", str(script)], stdout=subprocess.PIPE, text=True)
+        for line in proc.stdout:
+            if not line.startswith("T|"):
+                continue
+            fields = line.rstrip("\n").split("|")
+            event, filename, epoch = fields[1], fields[2], float(fields[3])
+            mig = by_name[filename]
+            if event == "begin":
+                current = mig
+                started[filename] = epoch
+                print(f"APPLY {filename}{' (no transaction)' if mig.no_transaction else ''}", flush=True)
+            else:
+                mig.status = "APPLIED_NOW"
+                mig.db_checksum = mig.checksum
+                mig.db_applied_at = fields[4]
+                mig.elapsed_ms = round((epoch - started[filename]) * 1000, 1)
+                current = None
+                print(f"DONE {filename} {mig.elapsed_ms} ms", flush=True)
+        returncode = proc.wait()
+    if returncode == 0:
+        return True
+    if current is not None:
+        current.status = "FAILED"
+        if current.no_transaction:
+            print(
+                f"ERROR: {current.filename} failed outside a transaction; statements before the failure stay applied",
+                file=sys.stderr,
+            )
+        else:
+            print(f"ERROR: {current.filename} failed and was rolled back", file=sys.stderr)
+    return False
+
+
+def write_report(migrations: List[Migration], out_dir: Path) -> Path:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ts = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    report = out_dir / f"{ts}__migration_status.csv"
+    with report.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, lineterminator="\n")
+        writer.writerow(["filename", "repo_checksum", "db_checksum", "db_applied_at", "status"])
+        for mig in migrations:
+            writer.writerow([mig.filename, mig.checksum, mig.db_checksum or "", mig.db_applied_at or "", mig.status])
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply ops_tooling/db migrations")
+    parser.add_argument("--plan", action="store_true", help="Dry run: report pending migrations, apply nothing")
+    parser.add_argument("--migrations-dir", default=str(MIGRATIONS_DIR), help="Directory of *.sql migrations")
+    parser.add_argument("--out-dir", default="out", help="Report output directory")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    migrations = discover(Path(args.migrations_dir).resolve())
+    print(f"Found {len(migrations)} migration file(s) in repo")
+    if not migrations:
+        print("No migrations found. Exiting successfully.")
+        return 0
+
+    pending = plan(migrations, read_ledger(bootstrap=not args.plan))
+    mismatched = [mig for mig in migrations if mig.status == "CHECKSUM_MISMATCH"]
+    for mig in migrations:
+        if mig.status == "ALREADY_APPLIED":
+            print(f"SKIP {mig.filename}")
+        elif mig.status == "PENDING":
+            print(f"PLAN {mig.filename}")
+
+    ok = True
+    if mismatched:
+        for mig in mismatched:
+            print(f"ERROR: checksum mismatch for {mig.filename}", file=sys.stderr)
+        print("Do not edit existing migrations. Create a new migration file instead.", file=sys.stderr)
+        ok = False
+    elif pending and not args.plan:
+        ok = apply_pending(pending)
+
+    report = write_report(migrations, Path(args.out_dir))
+    applied = sum(1 for mig in migrations if mig.status == "APPLIED_NOW")
+    print(f"Applied {applied}, pending {len(pending) - applied}, in {time.perf_counter() - t0:.2f}s")
+    print(f"Wrote migration report: {report}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Exercise db_migrate.py against a local Postgres.
+
+Creates a scratch database, drives db_migrate.py through it with generated
+migrations and checks the ledger, the report statuses and the exit codes:
+
+1) --plan on an empty database creates no ledger
+2) an apply of --count migrations, plus a dm:no-transaction migration that
+   runs create index concurrently and vacuum
+3) a re-run skips everything
+4) a failing migration rolls back its own changes, keeps the ones before it
+   and leaves the ones after it PENDING
+5) an edited applied migration stops the deploy with nothing applied
+
+Connection settings come from the standard libpq env vars. The role needs
+createdb. The scratch database is dropped at the end unless --keep is given.
+
+Usage:
+  PGHOST=localhost PGUSER=postgres python db_migrate_selftest.py
+  python db_migrate_selftest.py --count 200 --keep
+"""
+import argparse
+import csv
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, Tuple
+
+RUNNER = Path(__file__).resolve().parent / "db_migrate.py"
+
+NO_TRANSACTION_MIGRATION = """-- Needs autocommit: create index concurrently and vacuum refuse to run in a transaction block.
+-- dm:no-transaction
+
+create index concurrently if not exists selftest_t0001_note_idx on dm.selftest_t0001 (note);
+vacuum dm.selftest_t0001;
+"""
+
+
+def psql(database: str, sql: str) -> str:
+    env = dict(os.environ, PGDATABASE=database)
+    result = subprocess.run(
+        ["psql", "-v", "ON_ERROR_STOP=1", "-X", "-q", "-tA"], input=sql, capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"psql failed: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def run_runner(database: str, migrations_dir: Path, out_dir: Path, *extra: str) -> Tuple[int, Dict[str, str]]:
+    """Run db_migrate.py once. Returns (exit code, filename -> report status)."""
+    # Report names have one second resolution, so every run gets its own directory.
+    out_dir = out_dir / f"run{len(list(out_dir.iterdir())) + 1:02d}"
+    env = dict(os.environ, PGDATABASE=database)
+    result = subprocess.run(
+        [sys.executable, str(RUNNER), "--migrations-dir", str(migrations_dir), "--out-dir", str(out_dir), *extra],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    reports = sorted(out_dir.glob("*.csv"))
+    statuses: Dict[str, str] = {}
+    if reports:
+        with reports[-1].open(newline="", encoding="utf-8") as handle:
+            statuses = {row["filename"]: row["status"] for row in csv.DictReader(handle)}
+    return result.returncode, statuses
+
+
+def write_migration(migrations_dir: Path, index: int, body: str) -> str:
+    name = f"{index:04d}_selftest.sql"
+    (migrations_dir / name).write_text(body, encoding="utf-8")
+    return name
+
+
+def table_migration(index: int) -> str:
+    return f"create table dm.selftest_t{index:04d} (id bigserial primary key, note text);\n"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Self test db_migrate.py against a local Postgres")
+    parser.add_argument("--count", type=int, default=60, help="Generated migrations in the first apply")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    args = parser.parse_args()
+
+    admin_db = os.environ.get("PGDATABASE") or "postgres"
+    database = f"dm_migrate_selftest_{os.getpid()}"
+    results: Dict[str, bool] = {}
+
+    def check(name: str, ok: bool, detail: str = "") -> None:
+        print(f"{'PASS' if ok else 'FAIL'} {name}{': ' + detail if detail and not ok else ''}")
+        results[name] = ok
+
+    psql(admin_db, f'create database "{database}";')
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            migrations_dir = Path(tmp) / "migrations"
+            out_dir = Path(tmp) / "out"
+            migrations_dir.mkdir()
+            out_dir.mkdir()
+            psql(database, "create schema if not exists dm;")
+
+            names = [write_migration(migrations_dir, i, table_migration(i)) for i in range(1, args.count + 1)]
+            names.append(write_migration(migrations_dir, args.count + 1, NO_TRANSACTION_MIGRATION))
+
+            code, statuses = run_runner(database, migrations_dir, out_dir, "--plan")
+            ledger = psql(database, "select to_regclass('dm.migration_ledger') is not null;")
+            check("plan", code == 0 and set(statuses.values()) == {"PENDING"} and ledger == "f", f"exit {code}")
+
+            code, statuses = run_runner(database, migrations_dir, out_dir)
+            rows = psql(database, "select count(*) from dm.migration_ledger;")
+            index_valid = psql(
+                database,
+                "select coalesce(bool_and(indisvalid), false) from pg_index "
+                "where indexrelid = to_regclass('dm.selftest_t0001_note_idx');",
+            )
+            check(
+                "apply",
+                code == 0 and set(statuses.values()) == {"APPLIED_NOW"} and rows == str(len(names)),
+                f"exit {code}, ledger rows {rows}",
+            )
+            check("no-transaction", statuses.get(names[-1]) == "APPLIED_NOW" and index_valid == "t")
+
+            code, statuses = run_runner(database, migrations_dir, out_dir)
+            check("rerun", code == 0 and set(statuses.values()) == {"ALREADY_APPLIED"}, f"exit {code}")
+
+            base = args.count + 2
+            good = write_migration(migrations_dir, base, table_migration(base))
+            bad = write_migration(migrations_dir, base + 1, table_migration(base + 1) + "select 1/0;\n")
+            after = write_migration(migrations_dir, base + 2, table_migration(base + 2))
+            code, statuses = run_runner(database, migrations_dir, out_dir)
+            rolled_back = psql(database, f"select to_regclass('dm.selftest_t{base + 1:04d}') is null;")
+            check(
+                "failure",
+                code == 1
+                and (statuses.get(good), statuses.get(bad), statuses.get(after)) == ("APPLIED_NOW", "FAILED", "PENDING")
+                and rolled_back == "t",
+                f"exit {code}, statuses {statuses.get(good)}/{statuses.get(bad)}/{statuses.get(after)}",
+            )
+
+            (migrations_dir / bad).write_text(table_migration(base + 1), encoding="utf-8")
+            with (migrations_dir / names[0]).open("a", encoding="utf-8") as handle:
+                handle.write("-- edited after it was applied\n")
+            code, statuses = run_runner(database, migrations_dir, out_dir)
+            untouched = psql(database, f"select to_regclass('dm.selftest_t{base + 1:04d}') is null;")
+            check(
+                "checksum mismatch",
+                code == 1 and statuses.get(names[0]) == "CHECKSUM_MISMATCH" and untouched == "t",
+                f"exit {code}, status {statuses.get(names[0])}",
+            )
+    finally:
+        if args.keep:
+            print(f"Kept database {database}")
+        else:
+            psql(admin_db, f'drop database if exists "{database}";')
+
+    passed = sum(results.values())
+    print(f"{'OK' if passed == len(results) else 'FAILED'}: {passed} of {len(results)} checks passed")
+    return 0 if passed == len(results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Detach and archive old monthly partitions of vendor_invoice_lines and
+curbside_orders into gzip compressed CSV files.
+
+Each partition is exported and verified while still attached. Detach, the
+optional drop and the curbside_order_guids cleanup then run in one
+transaction, which first checks that the partition still matches the export
+(row count and a hash of every row). A failed export or a changed partition
+leaves the database untouched.
+
+Connection settings come from the standard libpq env vars (PGHOST, PGPORT,
+PGDATABASE, PGUSER, PGPASSWORD, PGSSLMODE), the same ones the DB workflows use.
+
+Without --apply the script only prints the plan.
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import List, Tuple
+
+PARENTS = ("vendor_invoice_lines", "curbside_orders")
+LIST_PARTITIONS_SQL = """
+select p.relname, c.relname
+from pg_inherits i
+join pg_class c on c.oid = i.inhrelid
+join pg_class p on p.oid = i.inhparent
+join pg_namespace n on n.oid = p.relnamespace
+where n.nspname = 'public'
+  and p.relname in ('vendor_invoice_lines', 'curbside_orders')
+order by p.relname, c.relname;
+"""
+
+# Row count and an order independent hash of every row.
+FINGERPRINT_SQL = (
+    "select count(*) || '|' || coalesce(md5(string_agg(md5(t::text), '' order by md5(t::text))), '') "
+    "from public.{partition} t"
+)
+
+
+def die(msg: str, code: int = 1) -> None:
+    print(msg, file=sys.stderr)
+    raise SystemExit(code)
+
+
+def psql(sql: str) -> str:
+    result = subprocess.run(
+        ["psql", "-v", "ON_ERROR_STOP=1", "-X", "-tA", "-F", "|", "-c", sql],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        die(f"psql failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def psql_script(sql: str) -> str:
+    result = subprocess.run(
+        ["psql", "-v", "ON_ERROR_STOP=1", "-X", "-q", "-tA"], input=sql, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        die(f"psql failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def month_of(partition: str) -> date:
+    suffix = partition.rsplit("_p", 1)[-1]
+    return date(int(suffix[:4]), int(suffix[4:6]), 1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def list_partitions() -> List[Tuple[str, str]]:
+    rows = []
+    for line in psql(LIST_PARTITIONS_SQL).splitlines():
+        if not line.strip():
+            continue
+        parent, partition = line.split("|", 1)
+        rows.append((parent, partition))
+    return rows
+
+
+def export_partition(partition: str, out_path: Path) -> Tuple[int, str, str]:
+    """Export one snapshot of the partition. Returns (rows, file sha256, fingerprint)."""
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / f"{partition}.csv"
+        # The fingerprint and the copy read the same repeatable read snapshot.
+        output = psql_script(
+            "begin isolation level repeatable read read only;\n"
+            f"select 'F|' || ({FINGERPRINT_SQL.format(partition=partition)});\n"
+            f"\\copy (select * from public.{partition}) to '{csv_path}' with (format csv, header)\n"
+            "commit;\n"
+        )
+        fingerprint = next((line[2:] for line in output.splitlines() if line.startswith("F|")), "")
+        with csv_path.open("rb") as src, gzip.open(tmp_path, "wb") as handle:
+            for block in iter(lambda: src.read(1 << 20), b""):
+                handle.write(block)
+
+    rows = -1
+    digest = hashlib.sha256()
+    with tmp_path.open("rb") as raw:
+        for block in iter(lambda: raw.read(1 << 20), b""):
+            digest.update(block)
+    with gzip.open(tmp_path, "rt", encoding="utf-8", newline="") as handle:
+        for _row in csv.reader(handle):
+            rows += 1
+    tmp_path.replace(out_path)
+    return max(rows, 0), digest.hexdigest(), fingerprint
+
+
+def detach_sql(parent: str, partition: str, fingerprint: str, drop: bool) -> str:
+    start = month_of(partition)
+    statements = [
+        "begin;",
+        # Writers wait from here on, so the check below holds until commit.
+        f"lock table public.{parent} in share row exclusive mode;",
+        "do $check$\nbegin\n"
+        f"  if ({FINGERPRINT_SQL.format(partition=partition)}) is distinct from '{fingerprint}' then\n"
+        f"    raise exception '{partition} changed after export';\n"
+        "  end if;\nend\n$check$;",
+        f"alter table public.{parent} detach partition public.{partition};",
+    ]
+    if drop:
+        statements.append(f"drop table public.{partition};")
+        if parent == "curbside_orders":
+            statements.append(
+                "delete from public.curbside_order_guids "
+                f"where first_seen_at >= '{start.isoformat()} 00:00:00+00' "
+                f"and first_seen_at < '{add_months(start, 1).isoformat()} 00:00:00+00';"
+            )
+    statements.append("commit;")
+    return "\n".join(statements) + "\n"
+
+
+def archive_partition(parent: str, partition: str, out_dir: Path, drop: bool) -> None:
+    out_path = out_dir / parent / f"{partition}.csv.gz"
+    rows, sha, fingerprint = export_partition(partition, out_path)
+    expected = int(fingerprint.split("|", 1)[0] or -1)
+    if rows != expected:
+        die(f"Row count mismatch for {partition}: expected {expected}, exported {rows}. Partition left attached.")
+    print(f"EXPORTED {partition} rows={rows} file={out_path}")
+
+    psql_script(detach_sql(parent, partition, fingerprint, drop))
+    print(f"DROPPED {partition}" if drop else f"DETACHED {partition}")
+
+    start = month_of(partition)
+    manifest = {
+        "archived_at_utc": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "parent": parent,
+        "partition": partition,
+        "range_start": start.isoformat(),
+        "range_end": add_months(start, 1).isoformat(),
+        "rows": rows,
+        "file": out_path.name,
+        "sha256": sha,
+        "dropped": drop,
+    }
+    manifest_path = out_path.with_name(f"{partition}.json")
+    manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n")
+    print(f"ARCHIVED {partition} rows={rows} file={out_path}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Detach and archive old monthly partitions")
+    parser.add_argument(
+        "--keep-months",
+        type=int,
+        default=12,
+        help="Months to keep attached, counting the current month",
+    )
+    parser.add_argument("--table", choices=PARENTS, default=None, help="Limit to one parent table")
+    parser.add_argument("--out-dir", default="out/partition_archive", help="Archive output directory")
+    parser.add_argument("--apply", action="store_true", help="Detach and export (default: plan only)")
+    parser.add_argument("--drop", action="store_true", help="Drop partitions after a verified export")
+    args = parser.parse_args()
+
+    if args.keep_months < 1:
+        die("--keep-months must be at least 1")
+
+    today = datetime.now(timezone.utc).date()
+    cutoff = add_months(date(today.year, today.month, 1), -(args.keep_months - 1))
+
+    candidates = [
+        (parent, partition)
+        for parent, partition in list_partitions()
+        if (args.table is None or parent == args.table) and month_of(partition) < cutoff
+    ]
+
+    if not candidates:
+        print(f"No partitions older than {cutoff.isoformat()}")
+        return 0
+
+    for parent, partition in candidates:
+        print(f"PLAN {parent} {partition}")
+
+    if not args.apply:
+        return 0
+
+    out_dir = Path(args.out_dir)
+    for parent, partition in candidates:
+        archive_partition(parent, partition, out_dir, args.drop)
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
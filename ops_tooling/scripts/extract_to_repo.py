@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import hashlib
+import os
 import shutil
 import sys
+import threading
 import time
 import zipfile
-from pathlib import Path
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+PAYLOAD_MARKERS = ("ops_tooling/scripts/toast_api/", "scripts/toast_api/")
+CHUNK = 1 << 20
+WORKERS = min(32, (os.cpu_count() or 1) * 4)
 
 
 def die(msg: str, code: int = 1) -> None:
@@ -13,18 +23,108 @@ def die(msg: str, code: int = 1) -> None:
     raise SystemExit(code)
 
 
-def copytree_overwrite(src: Path, dst: Path) -> None:
+def find_payload_prefix(names: List[str]) -> Optional[str]:
+    """
+    Locate the toast_api payload from the zip central directory.
+    Some zips have an extra top-level folder, so the marker may sit under one.
+    """
+    for marker in PAYLOAD_MARKERS:
+        prefixes = set()
+        for name in names:
+            idx = name.find(marker)
+            if idx == 0 or (idx > 0 and name[idx - 1] == "/"):
+                prefixes.add(name[: idx + len(marker)])
+        if prefixes:
+            return min(prefixes, key=len)
+    return None
+
+
+def payload_members(zf: zipfile.ZipFile, prefix: str) -> Dict[str, zipfile.ZipInfo]:
+    members: Dict[str, zipfile.ZipInfo] = {}
+    for info in zf.infolist():
+        if info.is_dir() or not info.filename.startswith(prefix):
+            continue
+        rel = PurePosixPath(info.filename[len(prefix) :])
+        if rel.is_absolute() or ".." in rel.parts or "\\" in info.filename:
+            die(f"Unsafe path in zip: {info.filename}")
+        members[rel.as_posix()] = info
+    return members
+
+
+def hash_file(path: Path) -> Tuple[str, int, int]:
+    """Return (sha256, crc32, size) from a single streaming read."""
+    sha = hashlib.sha256()
+    crc = 0
+    size = 0
+    with path.open("rb") as handle:
+        for block in iter(lambda: handle.read(CHUNK), b""):
+            sha.update(block)
+            crc = zlib.crc32(block, crc)
+            size += len(block)
+    return sha.hexdigest(), crc, size
+
+
+def scan_tree(root: Path) -> Dict[str, Tuple[str, int, int]]:
+    files = [p for p in root.rglob("*") if p.is_file()]
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        hashes = list(pool.map(hash_file, files))
+    return {p.relative_to(root).as_posix(): h for p, h in zip(files, hashes)}
+
+
+def snapshot_backup(dest: Path, state: Dict[str, Tuple[str, int, int]], backup_root: Path) -> Tuple[Path, int]:
     """
-    Copy src tree into dst, overwriting files that already exist.
+    Snapshot dest as hardlinks into a content addressed object store, so
+    repeated backups only store bytes that changed since an earlier snapshot.
     """
-    for p in src.rglob("*"):
-        rel = p.relative_to(src)
-        target = dst / rel
-        if p.is_dir():
-            target.mkdir(parents=True, exist_ok=True)
-        else:
-            target.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(p, target)
+    objects = backup_root / "objects"
+    snap = backup_root / time.strftime("%Y%m%d_%H%M%S") / "toast_api"
+    stored = 0
+    for rel, (sha, _crc, size) in sorted(state.items()):
+        obj = objects / sha[:2] / sha
+        if not obj.exists():
+            obj.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(dest / rel, obj)
+            stored += size
+        target = snap / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(obj, target)
+        except OSError:
+            shutil.copy2(obj, target)
+    return snap.parent, stored
+
+
+class _ZipReaders:
+    """One ZipFile handle per worker thread so members decompress in parallel."""
+
+    def __init__(self, zip_path: Path) -> None:
+        self.zip_path = zip_path
+        self._local = threading.local()
+        self._handles: List[zipfile.ZipFile] = []
+        self._lock = threading.Lock()
+
+    def get(self) -> zipfile.ZipFile:
+        zf = getattr(self._local, "zf", None)
+        if zf is None:
+            zf = zipfile.ZipFile(self.zip_path, "r")
+            self._local.zf = zf
+            with self._lock:
+                self._handles.append(zf)
+        return zf
+
+    def close(self) -> None:
+        for zf in self._handles:
+            zf.close()
+
+
+def install_member(readers: _ZipReaders, info: zipfile.ZipInfo, target: Path) -> None:
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+    with readers.get().open(info) as src, tmp.open("wb") as out:
+        shutil.copyfileobj(src, out, CHUNK)
+    mtime = time.mktime(info.date_time + (0, 0, -1))
+    os.utime(tmp, (mtime, mtime))
+    os.replace(tmp, target)
 
 
 def main() -> int:
@@ -36,46 +136,39 @@ def main() -> int:
     if not zip_path.exists():
         die(f"Zip not found: {zip_path}")
 
-    tmp = repo_root / ".tmp_toast_api_envkit_extract"
-    if tmp.exists():
-        shutil.rmtree(tmp)
-    tmp.mkdir(parents=True, exist_ok=True)
-
     with zipfile.ZipFile(zip_path, "r") as z:
-        z.extractall(tmp)
-
-    # Find the payload root.
-    # Preferred: payload contains ops_tooling/scripts/toast_api/*
-    # Some zips have an extra top-level folder, so search.
-    candidates = list(tmp.rglob("ops_tooling/scripts/toast_api"))
-    if not candidates:
-        candidates = list(tmp.rglob("scripts/toast_api"))
-    if not candidates:
-        die("Zip payload did not contain ops_tooling/scripts/toast_api. Nothing to install.")
-    payload_toast_api = candidates[0]
-
-    # Backup existing ops_tooling/scripts/toast_api if present
+        prefix = find_payload_prefix(z.namelist())
+        if prefix is None:
+            die("Zip payload did not contain ops_tooling/scripts/toast_api. Nothing to install.")
+        members = payload_members(z, prefix)
+
     dest_toast_api = repo_root / "ops_tooling" / "scripts" / "toast_api"
-    if dest_toast_api.exists():
-        backup_root = repo_root / ".backup_toast_api"
-        backup_root.mkdir(parents=True, exist_ok=True)
-        stamp = time.strftime("%Y%m%d_%H%M%S")
-        backup_path = backup_root / stamp
-        backup_path.mkdir(parents=True, exist_ok=True)
-        shutil.copytree(dest_toast_api, backup_path / "toast_api")
-        print(f"Backed up existing ops_tooling/scripts/toast_api to: {backup_path}")
-
-    # Install: copy ops_tooling/scripts/toast_api into repo ops_tooling/scripts/toast_api
-    (repo_root / "ops_tooling" / "scripts").mkdir(parents=True, exist_ok=True)
-    dest_toast_api.mkdir(parents=True, exist_ok=True)
-    copytree_overwrite(payload_toast_api, dest_toast_api)
-    print(f"Installed ops_tooling/scripts/toast_api to: {dest_toast_api}")
+    state = scan_tree(dest_toast_api) if dest_toast_api.exists() else {}
+
+    # Only members whose content differs from the installed file are written.
+    pending = [
+        (rel, info)
+        for rel, info in members.items()
+        if rel not in state or state[rel][1] != info.CRC or state[rel][2] != info.file_size
+    ]
 
-    # Also copy ENV_KEYS.txt / README if they exist in payload ops_tooling/scripts/toast_api
-    # (already included above), so nothing else required.
+    # Backup existing ops_tooling/scripts/toast_api if anything will change
+    if state and pending:
+        backup_path, stored = snapshot_backup(dest_toast_api, state, repo_root / ".backup_toast_api")
+        print(f"Backed up existing ops_tooling/scripts/toast_api to: {backup_path} (new bytes stored: {stored})")
 
-    # Cleanup temp
-    shutil.rmtree(tmp)
+    dest_toast_api.mkdir(parents=True, exist_ok=True)
+    readers = _ZipReaders(zip_path)
+    try:
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            futures = [pool.submit(install_member, readers, info, dest_toast_api / rel) for rel, info in pending]
+            for future in futures:
+                future.result()
+    finally:
+        readers.close()
+
+    print(f"Installed ops_tooling/scripts/toast_api to: {dest_toast_api}")
+    print(f"Files written: {len(pending)}, unchanged: {len(members) - len(pending)}")
     print("Done.")
     return 0
 
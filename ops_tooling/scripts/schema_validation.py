@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Shared JSON Schema validation engine for the repo validation scripts.
+
+- Compiled validators are cached in process by schema SHA-256. The schema
+  file is only read again when its size or mtime changes, and the meta-schema
+  check runs once per compiled schema. Every document is validated on every
+  run; no results are cached.
+- Each document is read and parsed once. An optional precheck sees the parsed
+  document before schema validation, for shape checks the schema cannot make.
+- validate_documents() checks many documents in one call, fanning out to
+  worker processes that each build the validator once.
+"""
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from jsonschema import Draft202012Validator
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+_VALIDATORS: Dict[str, Draft202012Validator] = {}
+_SCHEMA_DIGESTS: Dict[Tuple[str, int, int], str] = {}
+
+Issue = Dict[str, str]
+# Returns an error message for a parsed document, or None when it may be validated.
+Precheck = Callable[[Any], Optional[str]]
+
+
+def format_path(error_path) -> str:
+    if not error_path:
+        return "$"
+    parts = ["$"]
+    for part in error_path:
+        if isinstance(part, int):
+            parts.append(f"[{part}]")
+        else:
+            parts.append(f".{part}")
+    return "".join(parts)
+
+
+def sha256_bytes(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+def get_validator(schema_path: Path) -> Tuple[Draft202012Validator, str]:
+    """Return (validator, schema_sha256), compiling at most once per schema hash."""
+    stat = schema_path.stat()
+    stat_key = (str(schema_path.resolve()), stat.st_size, stat.st_mtime_ns)
+    digest = _SCHEMA_DIGESTS.get(stat_key)
+    if digest is not None:
+        return _VALIDATORS[digest], digest
+    raw = schema_path.read_bytes()
+    digest = sha256_bytes(raw)
+    if digest not in _VALIDATORS:
+        schema = json.loads(raw)
+        Draft202012Validator.check_schema(schema)
+        _VALIDATORS[digest] = Draft202012Validator(schema)
+    _SCHEMA_DIGESTS[stat_key] = digest
+    return _VALIDATORS[digest], digest
+
+
+def collect_issues(validator: Draft202012Validator, instance: Any, fail_fast: bool) -> List[Issue]:
+    errors = validator.iter_errors(instance)
+    if fail_fast:
+        first = next(errors, None)
+        found = [] if first is None else [first]
+    else:
+        found = sorted(errors, key=lambda e: [str(p) for p in e.absolute_path])
+    return [{"path": format_path(e.absolute_path), "message": e.message} for e in found]
+
+
+def validate_instance(schema_path: Path, instance: Any, fail_fast: bool = True) -> List[Issue]:
+    """Validate one loaded document."""
+    validator, _digest = get_validator(schema_path)
+    return collect_issues(validator, instance, fail_fast)
+
+
+def validate_file(
+    schema_path: Path,
+    doc_path: Path,
+    fail_fast: bool = True,
+    precheck: Optional[Precheck] = None,
+) -> List[Issue]:
+    try:
+        instance = json.loads(doc_path.read_bytes())
+    except (OSError, ValueError) as exc:
+        return [{"path": "$", "message": f"Failed to read {doc_path}: {exc}"}]
+    if precheck is not None:
+        problem = precheck(instance)
+        if problem:
+            return [{"path": "$", "message": problem}]
+    return validate_instance(schema_path, instance, fail_fast=fail_fast)
+
+
+def _worker_init(schema_path: str) -> None:
+    get_validator(Path(schema_path))
+
+
+def _worker_validate(args: Tuple[str, str, bool, Optional[Precheck]]) -> Tuple[str, List[Issue]]:
+    schema_path, doc_path, fail_fast, precheck = args
+    return doc_path, validate_file(Path(schema_path), Path(doc_path), fail_fast, precheck)
+
+
+def validate_documents(
+    schema_path: Path,
+    doc_paths: Sequence[Path],
+    fail_fast: bool = True,
+    workers: int = 1,
+    precheck: Optional[Precheck] = None,
+) -> List[Tuple[Path, List[Issue]]]:
+    """
+    Validate many documents against one schema, in order of doc_paths.
+
+    precheck must be a module level function when workers > 1, so it can be
+    sent to the worker processes.
+    """
+    if workers <= 1 or len(doc_paths) <= 1:
+        return [(p, validate_file(schema_path, p, fail_fast, precheck)) for p in doc_paths]
+
+    jobs = [(str(schema_path), str(p), fail_fast, precheck) for p in doc_paths]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(doc_paths)),
+        initializer=_worker_init,
+        initargs=(str(schema_path),),
+    ) as pool:
+        results = dict(pool.map(_worker_validate, jobs, chunksize=8))
+    return [(p, results[str(p)]) for p in doc_paths]
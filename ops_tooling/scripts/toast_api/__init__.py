@@ -0,0 +1,37 @@
+"""
+Toast API mini-kit as an importable package.
+
+From ops_tooling/scripts:
+  python -m toast_api <command> [args...]
+
+Command modules are imported on first use, so importing the package (or
+running one command) never pays for the others.
+"""
+import importlib
+import os
+import sys
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+if _HERE not in sys.path:
+    # Kit modules import each other as top level modules (from _common import ...),
+    # which keeps every script runnable on its own as well.
+    sys.path.insert(0, _HERE)
+
+# command -> (module, summary)
+COMMANDS = {
+    "probe": ("toast_host_probe", "Check auth and ordersBulk connectivity"),
+    "snapshot": ("toast_find_curbside_yesterday", "Snapshot yesterday's curbside orders"),
+    "shape": ("toast_order_shape", "Print the key and type shape of one snapshot"),
+    "project": ("toast_order_project", "Project snapshots into typed curbside_orders columns"),
+    "export": ("toast_order_export", "Export snapshots to partitioned Parquet for analytics"),
+    "sync": ("toast_curbside_checkin_match", "Match pending curbside check-ins to captured orders"),
+    "settings": ("app_settings_client", "Print app_settings and follow changes via LISTEN/NOTIFY"),
+    "sim": ("toast_sim", "Serve a local Toast API simulator"),
+    "loadtest": ("toast_loadtest", "Load test the kit against the simulator"),
+}
+
+
+def load(command: str):
+    """Import and return the module behind a command."""
+    module_name, _summary = COMMANDS[command]
+    return importlib.import_module(module_name)
@@ -0,0 +1,107 @@
+"""
+Single entry point for the Toast API kit.
+
+Usage (from ops_tooling/scripts):
+  python -m toast_api probe
+  python -m toast_api snapshot
+  python -m toast_api shape <snapshot.json>
+  python -m toast_api project <snapshot_dir> [--check-shape] [--upload]
+  python -m toast_api sync [--watch 15] [--dry-run]
+  python -m toast_api startup [--runs 10] [--budget-ms 150] [command]
+
+Arguments after the command are passed to that script unchanged. The
+dispatcher itself avoids argparse and only imports the module it runs.
+
+startup measures cold start (interpreter, command module import and config
+discovery, no network) in fresh subprocesses and exits 1 when the median is
+over budget. TOAST_STARTUP_BUDGET_MS sets the default budget.
+"""
+import os
+import sys
+
+if __package__ in (None, ""):
+    # Allow `python ops_tooling/scripts/toast_api` as well as `python -m toast_api`.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import toast_api
+from toast_api import COMMANDS
+
+DEFAULT_BUDGET_MS = 150.0
+
+
+def _usage() -> str:
+    lines = ["usage: python -m toast_api <command> [args...]", "", "commands:"]
+    for name, (_module, summary) in COMMANDS.items():
+        lines.append(f"  {name:<9} {summary}")
+    lines.append(f"  {'startup':<9} Measure cold start time against a budget")
+    return "\n".join(lines)
+
+
+def _cold_start(command: str) -> int:
+    module = toast_api.load(command)
+    common = sys.modules.get("_common")
+    if common is not None:
+        common._maybe_load_dotenv()
+    return 0 if module else 1
+
+
+def _startup(args) -> int:
+    import statistics
+    import subprocess
+    import time
+
+    runs = 10
+    budget_ms = float(os.environ.get("TOAST_STARTUP_BUDGET_MS") or DEFAULT_BUDGET_MS)
+    command = "probe"
+    rest = list(args)
+    while rest:
+        arg = rest.pop(0)
+        if arg == "--child":
+            return _cold_start(rest[0])
+        if arg == "--runs":
+            runs = int(rest.pop(0))
+        elif arg == "--budget-ms":
+            budget_ms = float(rest.pop(0))
+        elif arg in COMMANDS:
+            command = arg
+        else:
+            print(f"Unknown startup argument: {arg}", file=sys.stderr)
+            return 2
+
+    cmd = [sys.executable, "-m", "toast_api", "startup", "--child", command]
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(toast_api.__file__)))
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, check=True)
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    median = statistics.median(samples)
+    status = "OK" if median <= budget_ms else "OVER BUDGET"
+    print(
+        f"startup {command}: median {median:.1f} ms, min {min(samples):.1f} ms, "
+        f"max {max(samples):.1f} ms over {runs} runs (budget {budget_ms:.0f} ms) {status}"
+    )
+    return 0 if median <= budget_ms else 1
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print(_usage())
+        return 0 if argv else 2
+
+    command, rest = argv[0], argv[1:]
+    if command == "startup":
+        return _startup(rest)
+    if command not in COMMANDS:
+        print(f"Unknown command: {command}\n\n{_usage()}", file=sys.stderr)
+        return 2
+
+    module = toast_api.load(command)
+    sys.argv = [f"toast_api {command}", *rest]
+    return module.main()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -16,11 +16,24 @@ Supported env vars:
 - TOAST_USER_ACCESS_TYPE            (default: TOAST_MACHINE_CLIENT)
 - TOAST_RESTAURANT_GUID
 - TOAST_BASE_URL                    (default: https://ws-api.toasttab.com)
+- TOAST_HTTP_RETRIES                (default: 3) retries for 429, 5xx and connection errors
+- TOAST_HTTP_BACKOFF_S              (default: 0.5) first backoff, doubled per retry; Retry-After wins
+
+Supabase env vars (used by the check-in matcher and other sync tooling):
+- SUPABASE_URL
+- SUPABASE_SERVICE_ROLE_KEY
 
 Optional env vars for your broader system (not used by these scripts today):
 - SUPABASE_ANON_KEY
 - DEBUG_KEY
 
+Repo root discovery (for .env.local) walks up from this directory once per
+process. DM_REPO_ROOT skips the walk.
+
+Instrumentation (opt in via env vars, read by the snapshot and probe scripts):
+- TOAST_METRICS_SUMMARY=1           print a per stage timing table at the end of a run
+- TOAST_PROFILE=cprofile|tracemalloc write profile.pstats or tracemalloc.txt next to the output
+
 Legacy fallback (still supported):
 - ops_tooling/scripts/toast_api/TOAST_API_HEADERS.json with keys:
   {
@@ -34,14 +47,23 @@ Legacy fallback (still supported):
 
 from __future__ import annotations
 
+import http.client
 import json
 import os
+import socket
+import random
+import threading
+import time
+from contextlib import contextmanager
 from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+from urllib.parse import urlencode
+from urllib.request import HTTPHandler, HTTPSHandler, Request, build_opener, urlopen
 
 
 @dataclass(frozen=True)
@@ -53,6 +75,12 @@ class ToastConfig:
     base_url: str = "https://ws-api.toasttab.com"
 
 
+@dataclass(frozen=True)
+class SupabaseConfig:
+    url: str
+    service_role_key: str
+
+
 def _parse_env_file(env_path: Path) -> Dict[str, str]:
     """Minimal .env parser."""
     out: Dict[str, str] = {}
@@ -71,7 +99,11 @@ def _parse_env_file(env_path: Path) -> Dict[str, str]:
     return out
 
 
+@lru_cache(maxsize=None)
 def _find_repo_root(start: Path) -> Optional[Path]:
+    override = os.environ.get("DM_REPO_ROOT")
+    if override:
+        return Path(override).resolve()
     cur = start.resolve()
     for _ in range(12):
         if (cur / ".git").exists():
@@ -84,8 +116,15 @@ def _find_repo_root(start: Path) -> Optional[Path]:
     return None
 
 
+_DOTENV_LOADED = False
+
+
 def _maybe_load_dotenv() -> None:
-    """Load repo root .env.local into process env (no overwrite)."""
+    """Load repo root .env.local into process env (no overwrite). Runs once per process."""
+    global _DOTENV_LOADED
+    if _DOTENV_LOADED:
+        return
+    _DOTENV_LOADED = True
     here = Path(__file__).resolve().parent
     root = _find_repo_root(here)
     if not root:
@@ -143,6 +182,45 @@ def load_config(path: Path) -> ToastConfig:
     )
 
 
+def load_supabase_config() -> SupabaseConfig:
+    """Load Supabase REST config from env (optionally via repo root .env.local)."""
+    _maybe_load_dotenv()
+
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+    missing = [k for k, v in (("SUPABASE_URL", url), ("SUPABASE_SERVICE_ROLE_KEY", key)) if not v]
+    if missing:
+        raise ValueError(f"Missing env vars: {', '.join(missing)}")
+    return SupabaseConfig(url=url.rstrip("/"), service_role_key=key)
+
+
+def supabase_rest(
+    cfg: SupabaseConfig,
+    method: str,
+    table: str,
+    query: Optional[Dict[str, str]] = None,
+    body: Optional[Any] = None,
+    prefer: Optional[str] = None,
+) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+    """Call PostgREST for one table. Returns (data, err) like _http_json."""
+    url = f"{cfg.url}/rest/v1/{table}"
+    if query:
+        url = f"{url}?{urlencode(query, safe='(),.*:')}"
+    headers = {
+        "apikey": cfg.service_role_key,
+        "Authorization": f"Bearer {cfg.service_role_key}",
+        "Accept": "application/json",
+    }
+    data = None
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+        data = json.dumps(body).encode("utf-8")
+    if prefer:
+        headers["Prefer"] = prefer
+    req = Request(url, data=data, headers=headers, method=method)
+    return _http_json(req)
+
+
 def toast_dt(dt: datetime) -> str:
     base = dt.strftime("%Y-%m-%dT%H:%M:%S")
     ms = f"{int(dt.microsecond / 1000):03d}"
@@ -150,16 +228,308 @@ def toast_dt(dt: datetime) -> str:
     return f"{base}.{ms}{tz}"
 
 
-def _http_json(req: Request, timeout: int = 20) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+# Per request phase timings. The timed connection classes below fill these in
+# for the request running on the current thread.
+_phase = threading.local()
+
+
+def _timed_create_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, *args, **kwargs):
+    host, port = address
+    t0 = perf_counter()
+    infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    t1 = perf_counter()
+    _phase.dns_ms = (t1 - t0) * 1000
+    last_err: Optional[OSError] = None
+    for af, socktype, proto, _canon, sockaddr in infos:
+        sock = None
+        try:
+            sock = socket.socket(af, socktype, proto)
+            if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            sock.connect(sockaddr)
+            _phase.connect_ms = (perf_counter() - t1) * 1000
+            return sock
+        except OSError as e:
+            last_err = e
+            if sock is not None:
+                sock.close()
+    raise last_err or OSError(f"getaddrinfo returned no addresses for {host}")
+
+
+class _TimedHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _timed_create_connection
+
+
+class _TimedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._create_connection = _timed_create_connection
+
+    def connect(self):
+        t0 = perf_counter()
+        super().connect()
+        total_ms = (perf_counter() - t0) * 1000
+        _phase.tls_ms = max(0.0, total_ms - getattr(_phase, "dns_ms", 0.0) - getattr(_phase, "connect_ms", 0.0))
+
+
+class _TimedHTTPHandler(HTTPHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_TimedHTTPConnection, req, **kwargs)
+
+
+class _TimedHTTPSHandler(HTTPSHandler):
+    def do_open(self, http_class, req, **kwargs):
+        return super().do_open(_TimedHTTPSConnection, req, **kwargs)
+
+
+class HttpMetrics:
+    """Collects per request timings and bytes, grouped by stage (auth, list, get, ...)."""
+
+    BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self) -> None:
+        self.requests: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.requests.append(entry)
+
+    @contextmanager
+    def timed(self, stage: str, nbytes: int = 0) -> Iterator[None]:
+        """Time a non HTTP step (for example disk writes) under its own stage."""
+        t0 = perf_counter()
+        try:
+            yield
+        finally:
+            self.record({"stage": stage, "total_ms": (perf_counter() - t0) * 1000, "bytes_out": nbytes})
+
+    @staticmethod
+    def _pct(sorted_values: List[float], pct: float) -> float:
+        if not sorted_values:
+            return 0.0
+        idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+        return sorted_values[idx]
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        by_stage: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in self.requests:
+            by_stage.setdefault(entry["stage"], []).append(entry)
+
+        out: Dict[str, Dict[str, Any]] = {}
+        for stage, entries in sorted(by_stage.items()):
+            totals = sorted(e["total_ms"] for e in entries)
+            hist = [0] * (len(self.BUCKETS_MS) + 1)
+            for value in totals:
+                slot = next((i for i, b in enumerate(self.BUCKETS_MS) if value <= b), len(self.BUCKETS_MS))
+                hist[slot] += 1
+            phases = {}
+            for phase in ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "body_ms"):
+                values = [e[phase] for e in entries if phase in e]
+                if values:
+                    phases[f"mean_{phase}"] = round(sum(values) / len(values), 3)
+            out[stage] = {
+                "count": len(entries),
+                "errors": sum(1 for e in entries if e.get("error")),
+                "bytes_in": sum(e.get("bytes_in", 0) for e in entries),
+                "bytes_out": sum(e.get("bytes_out", 0) for e in entries),
+                "total_ms_sum": round(sum(totals), 3),
+                "p50_ms": round(self._pct(totals, 50), 3),
+                "p90_ms": round(self._pct(totals, 90), 3),
+                "p99_ms": round(self._pct(totals, 99), 3),
+                "max_ms": round(totals[-1], 3),
+                "histogram_ms": {
+                    **{f"le_{b}": hist[i] for i, b in enumerate(self.BUCKETS_MS)},
+                    "gt_max": hist[-1],
+                },
+                **phases,
+            }
+        return out
+
+    def write(self, path: Path) -> None:
+        data = {"stages": self.summary(), "requests": self.requests}
+        path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+    def format_table(self) -> str:
+        header = f"{'stage':<8} {'count':>6} {'errors':>6} {'p50_ms':>9} {'p99_ms':>9} {'sum_ms':>10} {'bytes_in':>10}"
+        lines = [header, "-" * len(header)]
+        for stage, s in self.summary().items():
+            lines.append(
+                f"{stage:<8} {s['count']:>6} {s['errors']:>6} {s['p50_ms']:>9.1f} {s['p99_ms']:>9.1f} "
+                f"{s['total_ms_sum']:>10.1f} {s['bytes_in']:>10}"
+            )
+        return "\n".join(lines)
+
+
+_METRICS: Optional[HttpMetrics] = None
+_TIMED_OPENER = None
+
+
+def enable_metrics() -> HttpMetrics:
+    """Start recording timings for every _http_json call in this process."""
+    global _METRICS, _TIMED_OPENER
+    if _METRICS is None:
+        _METRICS = HttpMetrics()
+        _TIMED_OPENER = build_opener(_TimedHTTPHandler, _TimedHTTPSHandler)
+    return _METRICS
+
+
+def finish_metrics(out_dir: Path) -> Optional[Path]:
+    """Write metrics.json into out_dir and print the summary table if requested."""
+    if _METRICS is None:
+        return None
+    path = out_dir / "metrics.json"
+    _METRICS.write(path)
+    if os.environ.get("TOAST_METRICS_SUMMARY") == "1":
+        print(_METRICS.format_table())
+    return path
+
+
+def run_profiled(fn: Callable[[], int], out_dir: Path) -> int:
+    """Run fn under cProfile or tracemalloc when TOAST_PROFILE asks for it."""
+    mode = (os.environ.get("TOAST_PROFILE") or "").strip().lower()
+    if mode == "cprofile":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn)
+        finally:
+            out_dir.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(str(out_dir / "profile.pstats"))
+    if mode == "tracemalloc":
+        import tracemalloc
+
+        tracemalloc.start(25)
+        try:
+            return fn()
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines = [f"current_bytes: {current}", f"peak_bytes: {peak}", ""]
+            lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:25])
+            out_dir.mkdir(parents=True, exist_ok=True)
+            (out_dir / "tracemalloc.txt").write_text("\n".join(lines) + "\n")
+    return fn()
+
+
+def _copy_headers(headers: Any, into: Optional[Dict[str, str]]) -> None:
+    if into is not None and headers is not None:
+        into.update((name.lower(), value) for name, value in headers.items())
+
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRY_WAIT_S = 30.0
+
+
+def _retry_wait(attempt: int, headers: Dict[str, str]) -> float:
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), MAX_RETRY_WAIT_S)
+        except ValueError:
+            pass
+    base = float(os.environ.get("TOAST_HTTP_BACKOFF_S") or 0.5)
+    return min(base * (2**attempt) * random.uniform(0.5, 1.0), MAX_RETRY_WAIT_S)
+
+
+def _http_json(
+    req: Request,
+    timeout: int = 20,
+    stage: str = "other",
+    response_headers: Optional[Dict[str, str]] = None,
+) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+    """
+    response_headers, when given, is filled with the reply's headers (lowercased names).
+
+    429, 5xx and connection errors are retried up to TOAST_HTTP_RETRIES times,
+    waiting for Retry-After when the server sends it and backing off
+    exponentially otherwise. Each attempt is recorded in the metrics. The error
+    returned after the last attempt carries the attempt count.
+    """
+    retries = int(os.environ.get("TOAST_HTTP_RETRIES") or 3)
+    attempt = 0
+    while True:
+        headers: Dict[str, str] = {}
+        data, err = _http_json_once(req, timeout, stage, headers)
+        if response_headers is not None:
+            response_headers.clear()
+            response_headers.update(headers)
+        if err is None or (err["http"] is not None and err["http"] not in RETRY_STATUSES):
+            return data, err
+        if attempt >= retries:
+            err["attempts"] = attempt + 1
+            return data, err
+        time.sleep(_retry_wait(attempt, headers))
+        attempt += 1
+
+
+def _http_json_once(
+    req: Request, timeout: int, stage: str, response_headers: Dict[str, str]
+) -> Tuple[Optional[Any], Optional[Dict[str, Any]]]:
+    metrics = _METRICS
+    if metrics is None:
+        try:
+            with urlopen(req, timeout=timeout) as resp:
+                _copy_headers(resp.headers, response_headers)
+                raw = resp.read().decode("utf-8")
+            return json.loads(raw) if raw else None, None
+        except HTTPError as e:
+            _copy_headers(e.headers, response_headers)
+            body = e.read().decode("utf-8", errors="replace")
+            return None, {"http": e.code, "reason": str(getattr(e, "reason", "")), "body_prefix": body[:800]}
+        except URLError as e:
+            return None, {"http": None, "reason": str(e.reason), "body_prefix": ""}
+
+    for phase in ("dns_ms", "connect_ms", "tls_ms"):
+        setattr(_phase, phase, 0.0)
+    entry: Dict[str, Any] = {
+        "stage": stage,
+        "method": req.get_method(),
+        "bytes_out": len(req.data or b""),
+    }
+    t0 = t1 = perf_counter()
+    body_bytes = b""
     try:
-        with urlopen(req, timeout=timeout) as resp:
-            raw = resp.read().decode("utf-8")
+        try:
+            with _TIMED_OPENER.open(req, timeout=timeout) as resp:
+                t1 = perf_counter()
+                _copy_headers(resp.headers, response_headers)
+                body_bytes = resp.read()
+                entry["status"] = resp.status
+        except HTTPError as e:
+            t1 = perf_counter()
+            _copy_headers(e.headers, response_headers)
+            body_bytes = e.read()
+            entry["status"] = e.code
+            entry["error"] = True
+            body = body_bytes.decode("utf-8", errors="replace")
+            return None, {"http": e.code, "reason": str(getattr(e, "reason", "")), "body_prefix": body[:800]}
+        except URLError as e:
+            t1 = perf_counter()
+            entry["error"] = True
+            return None, {"http": None, "reason": str(e.reason), "body_prefix": ""}
+        raw = body_bytes.decode("utf-8")
         return json.loads(raw) if raw else None, None
-    except HTTPError as e:
-        body = e.read().decode("utf-8", errors="replace")
-        return None, {"http": e.code, "reason": str(getattr(e, "reason", "")), "body_prefix": body[:800]}
-    except URLError as e:
-        return None, {"http": None, "reason": str(e.reason), "body_prefix": ""}
+    finally:
+        t2 = perf_counter()
+        entry.update(
+            {
+                "dns_ms": _phase.dns_ms,
+                "connect_ms": _phase.connect_ms,
+                "tls_ms": _phase.tls_ms,
+                "ttfb_ms": (t1 - t0) * 1000,
+                "body_ms": (t2 - t1) * 1000,
+                "total_ms": (t2 - t0) * 1000,
+                "bytes_in": len(body_bytes),
+            }
+        )
+        metrics.record(entry)
 
 
 def auth_access_token(cfg: ToastConfig) -> str:
@@ -175,7 +545,7 @@ def auth_access_token(cfg: ToastConfig) -> str:
         method="POST",
     )
 
-    data, err = _http_json(req)
+    data, err = _http_json(req, stage="auth")
     if err:
         raise RuntimeError(f"Auth failed: {err}")
     if not isinstance(data, dict):
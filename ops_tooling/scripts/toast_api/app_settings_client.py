@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+In-memory app_settings cache kept current by Postgres LISTEN/NOTIFY.
+
+start() listens on app_settings_changed, then loads every setting in one query.
+A background thread waits for notifications (sent by the
+app_settings_notify_change trigger) and re-reads only the changed key, so
+get() is a plain dict lookup with no I/O and changes land within a second of
+the commit. Each applied change bumps `version`. If the connection drops, the
+thread reconnects and reloads everything.
+
+Connection settings come from APP_SETTINGS_DSN, else the standard libpq env
+vars (PGHOST, PGPORT, PGDATABASE, PGUSER, PGPASSWORD, PGSSLMODE). On Supabase
+use the session pooler or a direct connection: the transaction pooler does not
+deliver notifications.
+
+Requires psycopg 3 (optional for the rest of the kit): pip install "psycopg[binary]"
+
+Usage:
+  python app_settings_client.py                 # print all settings
+  python app_settings_client.py --watch         # print, then every change as it lands
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from _common import _maybe_load_dotenv
+
+CHANNEL = "app_settings_changed"
+LOAD_ALL_SQL = "select key, value from app_settings"
+LOAD_ONE_SQL = "select value from app_settings where key = %s"
+
+ChangeCallback = Callable[[str, Any, int], None]
+
+
+def _require_psycopg():
+    try:
+        import psycopg
+    except ImportError as exc:
+        raise RuntimeError('app_settings client needs psycopg 3 (pip install "psycopg[binary]")') from exc
+    return psycopg
+
+
+class AppSettings:
+    """Versioned copy of app_settings. Readers never block on the listener."""
+
+    def __init__(self, dsn: Optional[str] = None, reconnect_delay: float = 1.0) -> None:
+        _maybe_load_dotenv()
+        self.dsn = dsn if dsn is not None else os.environ.get("APP_SETTINGS_DSN", "")
+        self.reconnect_delay = reconnect_delay
+        self.version = 0
+        # Replaced as a whole on every change, so a reader holding it sees one version.
+        self._values: Dict[str, Any] = {}
+        self._callbacks: List[ChangeCallback] = []
+        self._changed = threading.Condition()
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._values.get(key, default)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._values
+
+    def snapshot(self) -> Tuple[int, Dict[str, Any]]:
+        with self._changed:
+            return self.version, dict(self._values)
+
+    def on_change(self, callback: ChangeCallback) -> None:
+        """callback(key, value, version) runs on the listener thread; value is None when deleted."""
+        self._callbacks.append(callback)
+
+    def wait_for_version(self, version: int, timeout: Optional[float] = None) -> bool:
+        with self._changed:
+            return self._changed.wait_for(lambda: self.version >= version, timeout)
+
+    def start(self, timeout: float = 10.0) -> "AppSettings":
+        """Connect, listen, load everything and return once the cache is filled."""
+        _require_psycopg()
+        self._thread = threading.Thread(target=self._run, name="app-settings-listener", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            self.close()
+            raise RuntimeError(f"app_settings not loaded within {timeout}s: {self._error}")
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "AppSettings":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def _publish(self, values: Dict[str, Any], changes: List[Tuple[str, Any]]) -> None:
+        with self._changed:
+            self._values = values
+            self.version += 1
+            version = self.version
+            self._changed.notify_all()
+        for key, value in changes:
+            for callback in self._callbacks:
+                try:
+                    callback(key, value, version)
+                except Exception as exc:  # a bad callback must not stop the listener
+                    print(f"app_settings callback failed for {key}: {exc}", file=sys.stderr)
+
+    def _load_all(self, conn) -> None:
+        rows = conn.execute(LOAD_ALL_SQL).fetchall()
+        values = {key: value for key, value in rows}
+        old = self._values
+        changes = [(k, v) for k, v in values.items() if old.get(k) != v or k not in old]
+        changes += [(k, None) for k in old if k not in values]
+        if changes or not self._ready.is_set():
+            self._publish(values, changes)
+
+    def _apply(self, conn, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            event = {}
+        key = event.get("key")
+        if not isinstance(key, str):
+            self._load_all(conn)
+            return
+        row = conn.execute(LOAD_ONE_SQL, (key,)).fetchone()
+        values = dict(self._values)
+        if row is None:
+            if key not in values:
+                return
+            del values[key]
+            self._publish(values, [(key, None)])
+        elif values.get(key) != row[0] or key not in values:
+            values[key] = row[0]
+            self._publish(values, [(key, row[0])])
+
+    def _run(self) -> None:
+        psycopg = _require_psycopg()
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    # Listen before loading, so a change between the two is not lost.
+                    conn.execute(f"listen {CHANNEL}")
+                    self._load_all(conn)
+                    self._ready.set()
+                    while not self._stop.is_set():
+                        # Drain first: the generator holds the connection, so the
+                        # re-read in _apply cannot run inside it.
+                        for note in list(conn.notifies(timeout=0.5, stop_after=1)):
+                            self._apply(conn, note.payload)
+            except psycopg.Error as exc:
+                self._error = exc
+                self._stop.wait(self.reconnect_delay)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Print app_settings and follow changes")
+    parser.add_argument("--watch", action="store_true", help="Keep running and print each change")
+    parser.add_argument("--dsn", default=None, help="Connection string (default: APP_SETTINGS_DSN, else libpq env)")
+    args = parser.parse_args()
+
+    settings = AppSettings(args.dsn)
+    try:
+        settings.start()
+    except RuntimeError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    version, values = settings.snapshot()
+    for key in sorted(values):
+        print(f"{key} = {json.dumps(values[key], sort_keys=True)}")
+    print(f"version={version} keys={len(values)}")
+    if not args.watch:
+        settings.close()
+        return 0
+
+    settings.on_change(
+        lambda key, value, ver: print(f"[v{ver}] {key} = {json.dumps(value, sort_keys=True)}", flush=True)
+    )
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        settings.close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Resolve curbside check-ins against a hot in-memory index of recent order GUIDs.
+
+Check-ins can land before their order reaches curbside_orders, so the check-in
+row starts with order_found unset (or false). This service keeps the GUIDs of
+recent orders in memory, fed by the snapshot sync (guids.json) and by the
+curbside_order_guids registry, and flips order_found to true in batch as soon
+as the order shows up. Lookups are a set membership test; no per check-in
+table query is made.
+
+In watch mode a pass that fails on a Supabase error is logged to stderr and
+the next pass runs on schedule. A single pass raises instead.
+
+Usage:
+  python toast_curbside_checkin_match.py                 # one reconcile pass
+  python toast_curbside_checkin_match.py --watch 15      # reconcile every 15s
+  python toast_curbside_checkin_match.py --dry-run       # report matches only
+  python toast_curbside_checkin_match.py --live-settings # interval from app_settings, applied on change
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from _common import SupabaseConfig, load_supabase_config, supabase_rest
+
+PATCH_CHUNK = 100
+# app_settings key holding {"seconds": N}; read live with --live-settings.
+INTERVAL_SETTING = "toast.checkin_match_interval_seconds"
+
+
+class OrderGuidIndex:
+    """GUIDs of recently seen orders.
+
+    watermark tracks the newest registry first_seen_at so refreshes only pull new rows.
+    """
+
+    def __init__(self, window: timedelta) -> None:
+        self.window = window
+        self._first_seen: Dict[str, datetime] = {}
+        self.watermark: Optional[datetime] = None
+
+    def __contains__(self, guid: str) -> bool:
+        return guid in self._first_seen
+
+    def __len__(self) -> int:
+        return len(self._first_seen)
+
+    def add(self, guid: str, first_seen: datetime) -> None:
+        if guid not in self._first_seen:
+            self._first_seen[guid] = first_seen
+
+    def add_many(self, guids: Iterable[str], first_seen: datetime) -> None:
+        for guid in guids:
+            self.add(guid, first_seen)
+
+    def evict(self, now: datetime) -> int:
+        cutoff = now - self.window
+        stale = [g for g, seen in self._first_seen.items() if seen < cutoff]
+        for guid in stale:
+            del self._first_seen[guid]
+        return len(stale)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _parse_ts(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def seed_from_snapshots(index: OrderGuidIndex, snap_dir: Path) -> int:
+    """Load GUIDs written by the snapshot sync (guids.json) without parsing orders."""
+    guids_path = snap_dir / "guids.json"
+    if not guids_path.exists():
+        return 0
+    guids = json.loads(guids_path.read_text())
+    if not isinstance(guids, list):
+        return 0
+    before = len(index)
+    seen_at = datetime.fromtimestamp(guids_path.stat().st_mtime, tz=timezone.utc)
+    index.add_many((g for g in guids if isinstance(g, str)), seen_at)
+    return len(index) - before
+
+
+def refresh_from_registry(index: OrderGuidIndex, sb: SupabaseConfig, now: datetime) -> int:
+    """Pull GUIDs first seen after the index watermark from curbside_order_guids."""
+    since = index.watermark or (now - index.window)
+    rows, err = supabase_rest(
+        sb,
+        "GET",
+        "curbside_order_guids",
+        {
+            "select": "toast_order_guid,first_seen_at",
+            "first_seen_at": f"gte.{_iso(since)}",
+            "order": "first_seen_at.asc",
+        },
+    )
+    if err:
+        raise RuntimeError(f"Registry refresh failed: {err}")
+    before = len(index)
+    for row in rows or []:
+        first_seen = _parse_ts(row["first_seen_at"])
+        index.add(row["toast_order_guid"], first_seen)
+        if index.watermark is None or first_seen > index.watermark:
+            index.watermark = first_seen
+    return len(index) - before
+
+
+def pending_checkins(sb: SupabaseConfig, since: datetime) -> List[str]:
+    rows, err = supabase_rest(
+        sb,
+        "GET",
+        "curbside_checkins",
+        {
+            "select": "toast_order_guid",
+            "or": "(order_found.is.null,order_found.is.false)",
+            "occurred_at": f"gte.{_iso(since)}",
+        },
+    )
+    if err:
+        raise RuntimeError(f"Pending check-in read failed: {err}")
+    return [row["toast_order_guid"] for row in rows or [] if row.get("toast_order_guid")]
+
+
+def mark_found(sb: SupabaseConfig, guids: List[str]) -> None:
+    for start in range(0, len(guids), PATCH_CHUNK):
+        chunk = guids[start : start + PATCH_CHUNK]
+        _data, err = supabase_rest(
+            sb,
+            "PATCH",
+            "curbside_checkins",
+            {"toast_order_guid": f"in.({','.join(chunk)})"},
+            body={"order_found": True},
+            prefer="return=minimal",
+        )
+        if err:
+            raise RuntimeError(f"order_found update failed: {err}")
+
+
+def reconcile(index: OrderGuidIndex, sb: SupabaseConfig, now: datetime, dry_run: bool) -> List[str]:
+    """Resolve every pending check-in in one read and one batched write."""
+    pending = pending_checkins(sb, now - index.window)
+    matched: Set[str] = {g for g in pending if g in index}
+    ordered = sorted(matched)
+    if ordered and not dry_run:
+        mark_found(sb, ordered)
+    return ordered
+
+
+def run_once(index: OrderGuidIndex, sb: SupabaseConfig, snap_dir: Path, dry_run: bool) -> Dict[str, int]:
+    now = datetime.now(timezone.utc)
+    evicted = index.evict(now)
+    seeded = seed_from_snapshots(index, snap_dir)
+    refreshed = refresh_from_registry(index, sb, now)
+    matched = reconcile(index, sb, now, dry_run)
+    return {
+        "index_size": len(index),
+        "seeded_from_snapshots": seeded,
+        "refreshed_from_registry": refreshed,
+        "evicted": evicted,
+        "matched": len(matched),
+    }
+
+
+def watch_interval(settings, fallback: float) -> float:
+    """Seconds between passes: the live setting when present and valid, else --watch."""
+    value = settings.get(INTERVAL_SETTING) if settings is not None else None
+    seconds = value.get("seconds") if isinstance(value, dict) else None
+    if isinstance(seconds, (int, float)) and not isinstance(seconds, bool) and seconds >= 0:
+        return float(seconds)
+    return fallback
+
+
+def main() -> int:
+    here = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Resolve curbside check-ins against recent orders")
+    parser.add_argument("--snapshots", default=str(here / "snapshots_yesterday"), help="Snapshot sync output dir")
+    parser.add_argument("--window-hours", type=float, default=36.0, help="How far back orders and check-ins are matched")
+    parser.add_argument("--watch", type=float, default=0.0, help="Reconcile every N seconds (0 = run once)")
+    parser.add_argument("--dry-run", action="store_true", help="Report matches without updating check-ins")
+    parser.add_argument(
+        "--live-settings",
+        action="store_true",
+        help=f"Take the watch interval from app_settings {INTERVAL_SETTING} (needs psycopg)",
+    )
+    args = parser.parse_args()
+
+    sb = load_supabase_config()
+    index = OrderGuidIndex(timedelta(hours=args.window_hours))
+    snap_dir = Path(args.snapshots)
+    settings = None
+    if args.live_settings:
+        from app_settings_client import AppSettings
+
+        settings = AppSettings().start()
+
+    while True:
+        try:
+            stats = run_once(index, sb, snap_dir, args.dry_run)
+        except RuntimeError as exc:
+            if watch_interval(settings, args.watch) <= 0:
+                raise
+            # A failed pass keeps the index and its watermark; the next pass retries.
+            print(f"reconcile pass failed: {exc}", file=sys.stderr, flush=True)
+        else:
+            print(json.dumps(stats, sort_keys=True), flush=True)
+        interval = watch_interval(settings, args.watch)
+        if interval <= 0:
+            return 0
+        if settings is None:
+            time.sleep(interval)
+        else:
+            # A settings change ends the wait early so a new interval applies at once.
+            settings.wait_for_version(settings.version + 1, timeout=interval)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
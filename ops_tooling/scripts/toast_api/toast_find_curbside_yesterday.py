@@ -1,98 +1,257 @@
 #!/usr/bin/env python3
+"""
+Snapshot the previous business day's orders: list GUIDs, fetch each order
+and write <guid>.json, guids.json, errors.json and report.txt to out_dir.
+
+Progress is journaled to out_dir/journal.jsonl (see toast_journal). A run
+that crashes or is killed resumes where it stopped: completed list windows
+are not listed again and saved orders are not fetched again. Rerunning a
+finished date sends If-None-Match with each order's last ETag and leaves
+unchanged orders' files alone.
+
+Usage:
+  python toast_find_curbside_yesterday.py                                   # yesterday -> snapshots_yesterday/
+  python toast_find_curbside_yesterday.py --date 2026-09-01 --until 2026-09-30   # backfill -> snapshots/<date>/
+  python toast_find_curbside_yesterday.py --date 2026-09-14 --refresh            # re-check a finished date
+"""
 from __future__ import annotations
 
+import argparse
 import json
-from datetime import datetime, timedelta, timezone
+import os
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import quote
 from urllib.request import Request
 
-from _common import load_config, auth_access_token, orders_headers, toast_dt, _http_json
+from _common import (
+    load_config,
+    auth_access_token,
+    orders_headers,
+    toast_dt,
+    _http_json,
+    enable_metrics,
+    finish_metrics,
+    run_profiled,
+)
+from toast_windows import (
+    DensityHistory,
+    business_date,
+    business_day_bounds,
+    list_windows,
+    plan_windows,
+    restaurant_schedule,
+    settings_from_env,
+    slot_count,
+)
+from toast_journal import JOURNAL_NAME, RunJournal
+
+MAX_ORDERS = 250
 
 
 def list_order_guids(cfg, token: str, start: datetime, end: datetime):
     url = (
         f"{cfg.base_url}/orders/v2/orders"
         f"?restaurantGuid={cfg.restaurant_guid}"
-        f"&startDate={toast_dt(start)}"
-        f"&endDate={toast_dt(end)}"
+        f"&startDate={quote(toast_dt(start))}"
+        f"&endDate={quote(toast_dt(end))}"
     )
     req = Request(url, headers=orders_headers(token, cfg.restaurant_guid), method="GET")
-    data, err = _http_json(req)
+    data, err = _http_json(req, stage="list")
     if err:
         return None, {"stage": "list", "url": url, **err}
     return data, None
 
 
-def get_order(cfg, token: str, guid: str):
+def get_order(
+    cfg, token: str, guid: str, etag: Optional[str] = None, response_headers: Optional[Dict[str, str]] = None
+):
+    """With etag, an unchanged order comes back as an error with http 304."""
     url = f"{cfg.base_url}/orders/v2/orders/{guid}"
-    req = Request(url, headers=orders_headers(token, cfg.restaurant_guid), method="GET")
-    data, err = _http_json(req)
+    headers = orders_headers(token, cfg.restaurant_guid)
+    if etag:
+        headers["If-None-Match"] = etag
+    req = Request(url, headers=headers, method="GET")
+    data, err = _http_json(req, stage="get", response_headers=response_headers)
     if err:
         return None, {"stage": "get", "url": url, "guid": guid, **err}
     return data, None
 
 
-def main() -> int:
-    here = Path(__file__).resolve().parent
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
+
+
+def snapshot_order(cfg, token: str, guid: str, out_dir: Path, journal: RunJournal, metrics) -> Tuple[str, Any]:
+    """Returns (status, err); status is resumed, unchanged or fetched."""
+    path = out_dir / f"{guid}.json"
+    have = path.exists()
+    if have and journal.saved(guid):
+        return "resumed", None
+    prior = journal.known.get(guid, {}) if have else {}
+    headers: Dict[str, str] = {}
+    order, err = get_order(cfg, token, guid, etag=prior.get("etag"), response_headers=headers)
+    if err and err.get("http") == 304 and prior:
+        journal.order_saved(guid, prior.get("modified"), prior.get("etag"), "unchanged")
+        return "unchanged", None
+    if err:
+        return "error", err
+    modified = order.get("modifiedDate") if isinstance(order, dict) else None
+    etag = headers.get("etag")
+    if modified and modified == prior.get("modified"):
+        journal.order_saved(guid, modified, etag, "unchanged")
+        return "unchanged", None
+    text = json.dumps(order, indent=2, sort_keys=True)
+    with metrics.timed("write", len(text)):
+        _write_atomic(path, text)
+    journal.order_saved(guid, modified, etag, "fetched")
+    return "fetched", None
+
+
+def run(
+    here: Path,
+    out_dir: Path,
+    day: Optional[date] = None,
+    history_path: Optional[Path] = None,
+    skip_finished: bool = False,
+) -> int:
+    """Snapshot business date `day` (default: yesterday) into out_dir."""
+    metrics = enable_metrics()
     cfg = load_config(here / "TOAST_API_HEADERS.json")
     token = auth_access_token(cfg)
 
-    out_dir = here / "snapshots_yesterday"
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    tz = timezone(timedelta(hours=-5))
-    today = datetime.now(tz).date()
-    yday = today - timedelta(days=1)
-    start_day = datetime(yday.year, yday.month, yday.day, 0, 0, 0, tzinfo=tz)
-    end_day = start_day + timedelta(days=1)
+    tz, closeout_hour = restaurant_schedule(cfg, token)
+    if day is None:
+        day = business_date(datetime.now(timezone.utc), tz, closeout_hour) - timedelta(days=1)
+    start_day, end_day = business_day_bounds(day, tz, closeout_hour)
+
+    journal = RunJournal.open(out_dir / JOURNAL_NAME, day)
+    if journal.finished and skip_finished:
+        print(f"{day}: already snapshotted in {out_dir}, skipping")
+        return 0
+
+    split_at, workers = settings_from_env()
+    history = DensityHistory.load(history_path or out_dir / "window_density.json")
+    if journal.resumed:
+        windows = journal.windows
+    else:
+        density = history.slot_density(slot_count(start_day, end_day), before=day)
+        windows = plan_windows(start_day, end_day, density, target=split_at / 2)
+        journal.begin(windows)
+    pending = journal.pending(windows)
 
     errors = []
     guids_all = []
 
-    cur = start_day
-    while cur < end_day:
-        nxt = min(cur + timedelta(hours=1), end_day)
-        guids, err = list_order_guids(cfg, token, cur, nxt)
+    listed = list_windows(
+        lambda start, end: list_order_guids(cfg, token, start, end),
+        pending,
+        workers=workers,
+        split_at=split_at,
+        on_done=journal.window_done,
+    )
+    results = sorted(journal.completed_results() + listed, key=lambda r: r[0].start)
+    for _window, guids, err in results:
         if err:
             errors.append(err)
+        elif isinstance(guids, list):
+            guids_all.extend(guids)
         else:
-            if isinstance(guids, list):
-                guids_all.extend(guids)
-            else:
-                errors.append({"stage": "list", "url": "shape", "body_prefix": json.dumps(guids)[:800]})
-        cur = nxt
+            errors.append({"stage": "list", "url": "shape", "body_prefix": json.dumps(guids)[:800]})
+    history.record(day, start_day, results)
+    history.save()
 
     seen = set()
     guids_all = [g for g in guids_all if not (g in seen or seen.add(g))]
 
-    max_orders = 250
     snap_errors = []
     snapped = []
-    for guid in guids_all[:max_orders]:
-        order, err = get_order(cfg, token, guid)
+    counts = {"resumed": 0, "unchanged": 0, "fetched": 0}
+    for guid in guids_all[:MAX_ORDERS]:
+        status, err = snapshot_order(cfg, token, guid, out_dir, journal, metrics)
         if err:
             snap_errors.append(err)
             continue
-        (out_dir / f"{guid}.json").write_text(json.dumps(order, indent=2, sort_keys=True))
+        counts[status] += 1
         snapped.append(guid)
 
-    (out_dir / "guids.json").write_text(json.dumps(snapped, indent=2))
+    _write_atomic(out_dir / "guids.json", json.dumps(snapped, indent=2))
     (out_dir / "errors.json").write_text(json.dumps(errors + snap_errors, indent=2, sort_keys=True))
+    # Leave a run with failures unfinished, so the next run retries only those.
+    if errors or snap_errors:
+        journal.close()
+    else:
+        journal.finish(len(snapped))
 
     report_lines = [
         f"restaurantGuid: {cfg.restaurant_guid}",
-        f"yesterday: {start_day.isoformat()} -> {end_day.isoformat()}",
+        f"business_date: {day.isoformat()}",
+        f"yesterday: {start_day.astimezone(tz).isoformat()} -> {end_day.astimezone(tz).isoformat()}",
+        f"timezone: {tz.key} closeout_hour: {closeout_hour}",
+        f"list_windows: planned={len(windows)} from_journal={len(windows) - len(pending)} requested={len(listed)}",
         f"guids_found: {len(guids_all)}",
-        f"snapped: {len(snapped)} (max {max_orders})",
+        f"snapped: {len(snapped)} (max {MAX_ORDERS}) fetched={counts['fetched']} "
+        f"unchanged={counts['unchanged']} resumed={counts['resumed']}",
+        f"journal: resumed={'yes' if journal.resumed else 'no'} finished={'yes' if journal.finished else 'no'}",
         f"errors: {len(errors) + len(snap_errors)}",
     ]
+    for stage, summary in metrics.summary().items():
+        report_lines.append(
+            f"timing[{stage}]: count={summary['count']} p50_ms={summary['p50_ms']} "
+            f"p99_ms={summary['p99_ms']} total_ms={summary['total_ms_sum']} bytes_in={summary['bytes_in']}"
+        )
     (out_dir / "report.txt").write_text("\n".join(report_lines) + "\n")
+    metrics_path = finish_metrics(out_dir)
 
     print(f"Wrote snapshots to: {out_dir}")
     print(f"Report: {out_dir / 'report.txt'}")
     print(f"Errors: {out_dir / 'errors.json'}")
+    print(f"Metrics: {metrics_path}")
     return 0
 
 
+def _parse_date(text: str) -> date:
+    try:
+        return date.fromisoformat(text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"not a YYYY-MM-DD date: {text}") from exc
+
+
+def backfill(here: Path, out_root: Path, first: date, last: date, refresh: bool = False) -> int:
+    """Snapshot each business date into out_root/<date>/. Finished dates are skipped unless refresh."""
+    status = 0
+    day = first
+    while day <= last:
+        status |= run(here, out_root / day.isoformat(), day, out_root / "window_density.json", skip_finished=not refresh)
+        day += timedelta(days=1)
+    return status
+
+
+def main() -> int:
+    here = Path(__file__).resolve().parent
+    parser = argparse.ArgumentParser(description="Snapshot one business day of Toast orders")
+    parser.add_argument("--date", type=_parse_date, default=None, help="Business date YYYY-MM-DD (default: yesterday)")
+    parser.add_argument("--until", type=_parse_date, default=None, help="Last business date of a backfill from --date")
+    parser.add_argument("--out", default=None, help="Output dir (default: snapshots_yesterday, or snapshots/ with --date)")
+    parser.add_argument("--refresh", action="store_true", help="With --date, list finished dates again and refetch changed orders")
+    args = parser.parse_args()
+
+    if args.date is None:
+        if args.until is not None:
+            parser.error("--until needs --date")
+        out_dir = Path(args.out) if args.out else here / "snapshots_yesterday"
+        return run_profiled(lambda: run(here, out_dir), out_dir)
+    out_root = Path(args.out) if args.out else here / "snapshots"
+    last = args.until or args.date
+    if last < args.date:
+        parser.error("--until is before --date")
+    return run_profiled(lambda: backfill(here, out_root, args.date, last, args.refresh), out_root)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -6,11 +6,12 @@ from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from urllib.request import Request
 
-from _common import load_config, auth_access_token, orders_headers, toast_dt, _http_json
+from _common import load_config, auth_access_token, orders_headers, toast_dt, _http_json, enable_metrics
 
 
 def main() -> int:
     here = Path(__file__).resolve().parent
+    metrics = enable_metrics()
     cfg = load_config(here / "TOAST_API_HEADERS.json")
     token = auth_access_token(cfg)
 
@@ -37,7 +38,8 @@ def main() -> int:
     print("DEBUG", json.dumps(debug))
 
     req = Request(url, headers=headers, method="GET")
-    data, err = _http_json(req)
+    data, err = _http_json(req, stage="list")
+    print("TIMING", json.dumps(metrics.summary(), sort_keys=True))
     if err:
         print("ERR", json.dumps(err))
         return 1
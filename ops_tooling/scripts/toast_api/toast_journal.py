@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Crash-safe run journal for the order snapshot (toast_find_curbside_yesterday).
+
+One append-only JSONL file per snapshot directory. Every line is flushed and
+fsynced before the work it records counts as done, so a run that crashes or
+is killed leaves a journal of exactly what finished:
+
+  {"type": "run", "business_date": "2026-10-18", "started_at": ..., "windows": [[start, end, expected], ...]}
+  {"type": "window", "start": ..., "end": ..., "results": [[start, end, [guid, ...]], ...]}
+  {"type": "order", "guid": ..., "modified": ..., "etag": ..., "status": "fetched" | "unchanged"}
+  {"type": "done", "finished_at": ..., "snapped": 250}
+
+Opening the journal for the business date of an unfinished run resumes it:
+the same window plan, completed windows taken from the journal, and orders
+already saved by that run skipped without a request. A finished run for the
+same date starts a new run that lists again but knows each order's last
+ETag and modifiedDate, so unchanged orders are not rewritten. A different
+business date starts a fresh journal. A torn last line left by a crash in
+the middle of a write is dropped.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from toast_windows import ListResult, Window
+
+JOURNAL_NAME = "journal.jsonl"
+
+WindowKey = Tuple[str, str]
+
+
+def _key(window: Window) -> WindowKey:
+    return window.start.isoformat(), window.end.isoformat()
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class RunJournal:
+    """What the current run for one business date has already finished."""
+
+    def __init__(self, path: Path, day: date) -> None:
+        self.path = path
+        self.business_date = day.isoformat()
+        self.resumed = False
+        self.finished = False
+        self.windows: List[Window] = []
+        # Latest record per order across runs for this date, for conditional fetches.
+        self.known: Dict[str, Dict[str, Any]] = {}
+        self._completed: Dict[WindowKey, List[ListResult]] = {}
+        self._saved: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._handle = None
+
+    @classmethod
+    def open(cls, path: Path, day: date) -> "RunJournal":
+        journal = cls(path, day)
+        journal._load()
+        return journal
+
+    def _load(self) -> None:
+        try:
+            raw = self.path.read_bytes()
+        except OSError:
+            return
+        # Anything after the last newline is a line that never finished writing.
+        intact = raw[: raw.rfind(b"\n") + 1]
+        run: Optional[Dict[str, Any]] = None
+        done = False
+        for line in intact.decode("utf-8", errors="replace").splitlines():
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(rec, dict):
+                continue
+            kind = rec.get("type")
+            if kind == "run":
+                if run is not None and run.get("business_date") != rec.get("business_date"):
+                    self.known = {}
+                run, done = rec, False
+                self._completed, self._saved = {}, {}
+            elif kind == "window" and run is not None:
+                results = [
+                    (Window(datetime.fromisoformat(s), datetime.fromisoformat(e)), guids, None)
+                    for s, e, guids in rec.get("results", [])
+                ]
+                self._completed[(rec["start"], rec["end"])] = results
+            elif kind == "order" and isinstance(rec.get("guid"), str):
+                self.known[rec["guid"]] = rec
+                if run is not None:
+                    self._saved[rec["guid"]] = rec
+            elif kind == "done":
+                done = True
+
+        if run is None or run.get("business_date") != self.business_date:
+            self.known = {}
+            self._completed, self._saved = {}, {}
+            return
+        if done:
+            self.finished = True
+            self._completed, self._saved = {}, {}
+            return
+        self.resumed = True
+        self.windows = [
+            Window(datetime.fromisoformat(s), datetime.fromisoformat(e), float(expected))
+            for s, e, expected in run.get("windows", [])
+        ]
+        if len(intact) < len(raw):
+            with self.path.open("r+b") as handle:
+                handle.truncate(len(intact))
+        self._handle = self.path.open("a", encoding="utf-8")
+
+    def begin(self, windows: List[Window]) -> None:
+        """Start a new run with this window plan. A resumed run keeps its own plan."""
+        if self.resumed:
+            return
+        self.windows = list(windows)
+        # Rewrite rather than append, so a journal reused day after day stays
+        # one run long: the known orders, then the new run header.
+        lines = [json.dumps(rec, sort_keys=True) for rec in self.known.values()]
+        lines.append(
+            json.dumps(
+                {
+                    "type": "run",
+                    "business_date": self.business_date,
+                    "started_at": _now(),
+                    "windows": [[w.start.isoformat(), w.end.isoformat(), w.expected] for w in windows],
+                },
+                sort_keys=True,
+            )
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with tmp.open("w", encoding="utf-8") as handle:
+            handle.write("\n".join(lines) + "\n")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp, self.path)
+        self._handle = self.path.open("a", encoding="utf-8")
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec, sort_keys=True) + "\n"
+        with self._lock:
+            self._handle.write(line)
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+
+    def pending(self, windows: List[Window]) -> List[Window]:
+        return [w for w in windows if _key(w) not in self._completed]
+
+    def completed_results(self) -> List[ListResult]:
+        return [result for results in self._completed.values() for result in results]
+
+    def window_done(self, window: Window, results: List[ListResult]) -> None:
+        """Record a planned window whose every part listed cleanly. Safe to call from worker threads."""
+        if any(err or not isinstance(guids, list) for _w, guids, err in results):
+            return
+        start, end = _key(window)
+        self._append(
+            {
+                "type": "window",
+                "start": start,
+                "end": end,
+                "results": [[w.start.isoformat(), w.end.isoformat(), guids] for w, guids, _err in results],
+            }
+        )
+        with self._lock:
+            self._completed[(start, end)] = results
+
+    def saved(self, guid: str) -> bool:
+        """True when this run already wrote or confirmed the order."""
+        return guid in self._saved
+
+    def order_saved(self, guid: str, modified: Optional[str], etag: Optional[str], status: str) -> None:
+        rec = {"type": "order", "guid": guid, "modified": modified, "etag": etag, "status": status}
+        self._append(rec)
+        self.known[guid] = rec
+        self._saved[guid] = rec
+
+    def finish(self, snapped: int) -> None:
+        self._append({"type": "done", "finished_at": _now(), "snapped": snapped})
+        self.finished = True
+        self.close()
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
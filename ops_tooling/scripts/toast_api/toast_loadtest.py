@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Load and regression test the kit against the local Toast simulator.
+
+Starts toast_sim in process (or targets one already running with --base-url),
+points the _common client at it and reports requests/sec, p50/p99 latency
+per stage and whether every source order was listed, fetched and matched the
+source data. The client retries 429 and 5xx responses; an order only counts
+as correct once it was actually fetched, so injected faults that outlast the
+retries fail the run.
+
+Modes:
+  client    list the planned windows of the business day and fetch every order,
+            with --concurrency worker threads, repeated --rounds times
+  snapshot  run toast_find_curbside_yesterday end to end into a temp directory
+            and check guids.json against the simulator's orders
+
+Usage:
+  python toast_loadtest.py --synthetic 2000 --concurrency 16 --rounds 3
+  python toast_loadtest.py --mode snapshot --synthetic 300 --latency-ms 20
+  python toast_loadtest.py --synthetic 500 --throttle-rate 0.05 --out loadtest.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import toast_sim
+from toast_windows import business_day_bounds, plan_windows
+
+
+def _point_client_at(base_url: str, timezone_name: str, closeout_hour: int) -> None:
+    os.environ["TOAST_BASE_URL"] = base_url
+    os.environ["TOAST_CLIENT_ID"] = "sim-client"
+    os.environ["TOAST_CLIENT_SECRET"] = "sim-secret"
+    os.environ["TOAST_RESTAURANT_GUID"] = "00000000-0000-0000-0000-000000000000"
+    os.environ["TOAST_TIMEZONE"] = timezone_name
+    os.environ["TOAST_CLOSEOUT_HOUR"] = str(closeout_hour)
+
+
+def run_client(
+    store: Optional[toast_sim.OrderStore], bounds: Tuple[datetime, datetime], concurrency: int, rounds: int
+) -> Dict[str, Any]:
+    from _common import auth_access_token, load_config
+    from toast_find_curbside_yesterday import get_order, list_order_guids
+
+    cfg = load_config(Path(__file__).resolve().parent / "TOAST_API_HEADERS.json")
+    token = auth_access_token(cfg)
+    expected = set(store.guids_between(*bounds)) if store else None
+    windows = [(w.start, w.end) for w in plan_windows(*bounds)]
+
+    mismatches: List[str] = []
+    errors: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(rounds):
+            listed: List[str] = []
+            for (start, end), (guids, err) in zip(windows, pool.map(lambda w: list_order_guids(cfg, token, *w), windows)):
+                if err:
+                    errors.append(err)
+                    mismatches.append(f"window {start.isoformat()}: not listed (http {err.get('http')})")
+                elif isinstance(guids, list):
+                    listed.extend(guids)
+            if expected is not None and set(listed) != expected:
+                missing, extra = len(expected - set(listed)), len(set(listed) - expected)
+                mismatches.append(f"listed {len(set(listed))} guids, expected {len(expected)} ({missing} missing, {extra} extra)")
+
+            for guid, (order, err) in zip(listed, pool.map(lambda g: get_order(cfg, token, g), listed)):
+                if err:
+                    errors.append(err)
+                    mismatches.append(f"order {guid}: not fetched (http {err.get('http')})")
+                elif not isinstance(order, dict) or order.get("guid") != guid:
+                    mismatches.append(f"order {guid}: wrong guid in body")
+                elif store is not None and order != store.by_guid.get(guid):
+                    mismatches.append(f"order {guid}: body differs from source")
+    return {"errors": errors, "mismatches": mismatches}
+
+
+def run_snapshot(store: Optional[toast_sim.OrderStore], bounds: Tuple[datetime, datetime]) -> Dict[str, Any]:
+    import toast_find_curbside_yesterday as snap
+
+    mismatches: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        out_dir = Path(tmp)
+        snap.run(Path(__file__).resolve().parent, out_dir)
+        written = json.loads((out_dir / "guids.json").read_text())
+        errors = json.loads((out_dir / "errors.json").read_text())
+        if store is not None:
+            expected = store.guids_between(*bounds)[:250]
+            if written != expected:
+                missing = len(set(expected) - set(written))
+                mismatches.append(
+                    f"guids.json has {len(written)} guids, expected {len(expected)} in list order ({missing} not fetched)"
+                )
+            for guid in written:
+                body = json.loads((out_dir / f"{guid}.json").read_text())
+                if body != store.by_guid.get(guid):
+                    mismatches.append(f"snapshot {guid}: body differs from source")
+    return {"errors": errors, "mismatches": mismatches}
+
+
+def report(result: Dict[str, Any], elapsed: float, sim_counts: Dict[str, int]) -> Dict[str, Any]:
+    from _common import _METRICS
+
+    stages = _METRICS.summary() if _METRICS else {}
+    http_requests = sum(s["count"] for name, s in stages.items() if name != "write")
+    statuses: Dict[str, int] = {}
+    for err in result["errors"]:
+        key = str(err.get("http"))
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "requests": http_requests,
+        "requests_per_s": round(http_requests / elapsed, 1) if elapsed else 0.0,
+        "stages": {
+            name: {k: s[k] for k in ("count", "errors", "p50_ms", "p99_ms", "max_ms")} for name, s in stages.items()
+        },
+        "errors_by_status": statuses,
+        "mismatches": result["mismatches"][:50],
+        "correct": not result["mismatches"],
+        "simulator_counts": sim_counts,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load test the Toast kit against the local simulator")
+    parser.add_argument("--mode", choices=("client", "snapshot"), default="client")
+    parser.add_argument("--base-url", default=None, help="Use a simulator that is already running (skips correctness checks)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--out", default=None, help="Also write the report as JSON")
+    toast_sim.add_source_args(parser)
+    args = parser.parse_args()
+
+    from _common import enable_metrics
+
+    day = toast_sim.synthetic_day(args)
+    bounds = business_day_bounds(day, ZoneInfo(args.timezone), args.closeout_hour)
+
+    server = None
+    store: Optional[toast_sim.OrderStore] = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        args.day = day.isoformat()
+        store = toast_sim.store_from_args(args)
+        server, base_url = toast_sim.start_server(
+            store, toast_sim.faults_from_args(args), restaurant=toast_sim.restaurant_from_args(args)
+        )
+    _point_client_at(base_url, args.timezone, args.closeout_hour)
+    enable_metrics()
+
+    t0 = time.perf_counter()
+    try:
+        if args.mode == "snapshot":
+            result = run_snapshot(store, bounds)
+        else:
+            result = run_client(store, bounds, args.concurrency, args.rounds)
+    finally:
+        elapsed = time.perf_counter() - t0
+        sim_counts = dict(server.state.counts) if server else {}  # type: ignore[attr-defined]
+        if server:
+            server.shutdown()
+
+    summary = report(result, elapsed, sim_counts)
+    print(
+        f"mode={args.mode} orders={len(store) if store else 'external'} requests={summary['requests']} "
+        f"elapsed_s={summary['elapsed_s']} rps={summary['requests_per_s']}"
+    )
+    for name, s in summary["stages"].items():
+        print(f"  {name:<6} count={s['count']} errors={s['errors']} p50_ms={s['p50_ms']} p99_ms={s['p99_ms']} max_ms={s['max_ms']}")
+    if summary["errors_by_status"]:
+        print(f"  errors_by_status={summary['errors_by_status']}")
+    print(f"  correct={summary['correct']}")
+    for line in summary["mismatches"][:10]:
+        print(f"  MISMATCH {line}")
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(summary, indent=2, sort_keys=True) + "\n")
+    return 0 if summary["correct"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
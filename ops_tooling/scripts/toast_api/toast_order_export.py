@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Export Toast order snapshots to partitioned Parquet for local analytics.
+
+Four tables are written under the export root, each partitioned by business
+date in hive layout (orders/business_date=2026-10-18/part-*.parquet):
+
+  orders      one row per order (typed columns from toast_order_project)
+  checks      one row per check
+  selections  one row per check selection
+  payments    one row per check payment
+
+Exports are incremental. _export_manifest.json records each exported order's
+modifiedDate. New orders are appended as a new part file. An order whose
+modifiedDate changed, or that a partition already holds, causes the partition
+to be rewritten without the stale rows, so re-exporting after a crash
+between the part files and the manifest does not duplicate orders. A rewrite
+lists the part files it replaces in .pending_delete.json before swapping in
+the new part. The next export or summary finishes or abandons it.
+Customer names, phone numbers and curbside notes are not exported.
+
+Requires pyarrow (optional for the rest of the kit): pip install pyarrow
+
+Usage:
+  python toast_order_export.py snapshots_yesterday [more_snapshot_dirs...] --out exports
+  python toast_order_export.py --out exports --summary [--since 2026-09-01] [--until 2026-09-30]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from toast_order_project import _cast_business_date, _cast_cents, load_snapshots, project_orders
+
+MANIFEST_NAME = "_export_manifest.json"
+PENDING_NAME = ".pending_delete.json"
+TS_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+
+# (column, type) per table; business_date is carried by the partition path.
+TABLES: Dict[str, Tuple[Tuple[str, str], ...]] = {
+    "orders": (
+        ("order_guid", "string"),
+        ("dining_option_guid", "string"),
+        ("order_source", "string"),
+        ("display_number", "string"),
+        ("is_curbside", "bool"),
+        ("check_count", "int64"),
+        ("selection_count", "int64"),
+        ("total_amount_cents", "int64"),
+        ("tax_amount_cents", "int64"),
+        ("opened_at", "ts"),
+        ("closed_at", "ts"),
+        ("promised_at", "ts"),
+        ("toast_modified_at", "ts"),
+    ),
+    "checks": (
+        ("order_guid", "string"),
+        ("check_guid", "string"),
+        ("display_number", "string"),
+        ("payment_status", "string"),
+        ("voided", "bool"),
+        ("amount_cents", "int64"),
+        ("tax_amount_cents", "int64"),
+        ("total_amount_cents", "int64"),
+        ("opened_at", "ts"),
+        ("closed_at", "ts"),
+    ),
+    "selections": (
+        ("order_guid", "string"),
+        ("check_guid", "string"),
+        ("selection_guid", "string"),
+        ("item_guid", "string"),
+        ("display_name", "string"),
+        ("quantity", "float64"),
+        ("price_cents", "int64"),
+        ("pre_discount_price_cents", "int64"),
+        ("voided", "bool"),
+        ("created_at", "ts"),
+    ),
+    "payments": (
+        ("order_guid", "string"),
+        ("check_guid", "string"),
+        ("payment_guid", "string"),
+        ("payment_type", "string"),
+        ("card_type", "string"),
+        ("payment_status", "string"),
+        ("refund_status", "string"),
+        ("amount_cents", "int64"),
+        ("tip_amount_cents", "int64"),
+        ("paid_at", "ts"),
+    ),
+}
+
+Rows = Dict[str, List[Dict[str, Any]]]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.compute  # noqa: F401
+        import pyarrow.dataset  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError as exc:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from exc
+    return pyarrow
+
+
+def _ts(value: Any) -> Optional[datetime]:
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.strptime(value, TS_FORMAT).astimezone(timezone.utc)
+    except ValueError:
+        return None
+
+
+def _str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _guid(node: Any) -> Optional[str]:
+    return node.get("guid") if isinstance(node, dict) else None
+
+
+def _float(value: Any) -> Optional[float]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def flatten(orders: Sequence[Dict[str, Any]]) -> Dict[str, Rows]:
+    """Flatten orders into per table rows grouped by business date (ISO string)."""
+    out: Dict[str, Rows] = {}
+    for order, row in zip(orders, project_orders(orders)):
+        bdate = row.get("business_date") or "unknown"
+        tables = out.setdefault(bdate, {name: [] for name in TABLES})
+        order_guid = order["guid"]
+        tables["orders"].append(
+            {
+                "order_guid": order_guid,
+                "dining_option_guid": row.get("dining_option_guid"),
+                "order_source": row.get("order_source"),
+                "display_number": row.get("display_number"),
+                "is_curbside": isinstance(order.get("curbsidePickupInfo"), dict),
+                "check_count": row.get("check_count"),
+                "selection_count": row.get("selection_count"),
+                "total_amount_cents": row.get("total_amount_cents"),
+                "tax_amount_cents": row.get("tax_amount_cents"),
+                "opened_at": _ts(row.get("opened_at")),
+                "closed_at": _ts(row.get("closed_at")),
+                "promised_at": _ts(row.get("promised_at")),
+                "toast_modified_at": _ts(row.get("toast_modified_at")),
+            }
+        )
+        for check in order.get("checks") or []:
+            if not isinstance(check, dict):
+                continue
+            check_guid = check.get("guid")
+            tables["checks"].append(
+                {
+                    "order_guid": order_guid,
+                    "check_guid": check_guid,
+                    "display_number": _str(check.get("displayNumber")),
+                    "payment_status": _str(check.get("paymentStatus")),
+                    "voided": bool(check.get("voided")),
+                    "amount_cents": _cast_cents(check.get("amount")),
+                    "tax_amount_cents": _cast_cents(check.get("taxAmount")),
+                    "total_amount_cents": _cast_cents(check.get("totalAmount")),
+                    "opened_at": _ts(check.get("openedDate")),
+                    "closed_at": _ts(check.get("closedDate")),
+                }
+            )
+            for sel in check.get("selections") or []:
+                if not isinstance(sel, dict):
+                    continue
+                tables["selections"].append(
+                    {
+                        "order_guid": order_guid,
+                        "check_guid": check_guid,
+                        "selection_guid": sel.get("guid"),
+                        "item_guid": _guid(sel.get("item")),
+                        "display_name": _str(sel.get("displayName")),
+                        "quantity": _float(sel.get("quantity")),
+                        "price_cents": _cast_cents(sel.get("price")),
+                        "pre_discount_price_cents": _cast_cents(sel.get("preDiscountPrice")),
+                        "voided": bool(sel.get("voided")),
+                        "created_at": _ts(sel.get("createdDate")),
+                    }
+                )
+            for pay in check.get("payments") or []:
+                if not isinstance(pay, dict):
+                    continue
+                tables["payments"].append(
+                    {
+                        "order_guid": order_guid,
+                        "check_guid": check_guid,
+                        "payment_guid": pay.get("guid"),
+                        "payment_type": _str(pay.get("type")),
+                        "card_type": _str(pay.get("cardType")),
+                        "payment_status": _str(pay.get("paymentStatus")),
+                        "refund_status": _str(pay.get("refundStatus")),
+                        "amount_cents": _cast_cents(pay.get("amount")),
+                        "tip_amount_cents": _cast_cents(pay.get("tipAmount")),
+                        "paid_at": _ts(pay.get("paidDate")),
+                    }
+                )
+    return out
+
+
+def _schema(pa, table: str):
+    types = {
+        "string": pa.string(),
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "bool": pa.bool_(),
+        "ts": pa.timestamp("ms", tz="UTC"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in TABLES[table]])
+
+
+def _partitioning(pa):
+    import pyarrow.dataset as ds
+
+    return ds.partitioning(pa.schema([("business_date", pa.string())]), flavor="hive")
+
+
+def _finish_rewrite(part_dir: Path) -> None:
+    """Complete or abandon a rewrite interrupted between its part swap and cleanup."""
+    pending = part_dir / PENDING_NAME
+    try:
+        plan = json.loads(pending.read_text())
+    except (OSError, ValueError):
+        pending.unlink(missing_ok=True)
+        return
+    if (part_dir / plan["target"]).exists():
+        for name in plan["delete"]:
+            (part_dir / name).unlink(missing_ok=True)
+    pending.unlink()
+
+
+def _recover(out_root: Path) -> None:
+    for pending in out_root.glob(f"*/business_date=*/{PENDING_NAME}"):
+        _finish_rewrite(pending.parent)
+
+
+def _write_partition(pa, part_dir: Path, new_table, replace_guids: Iterable[str], stamp: str) -> None:
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    part_dir.mkdir(parents=True, exist_ok=True)
+    _finish_rewrite(part_dir)
+    existing = sorted(part_dir.glob("*.parquet"))
+    replace = set(replace_guids)
+    if existing and new_table.num_rows:
+        # Orders written by an export that crashed before saving the manifest.
+        held = pa.concat_tables([pq.read_table(p, columns=["order_guid"]) for p in existing])["order_guid"]
+        replace.update(pc.filter(held, pc.is_in(held, value_set=new_table["order_guid"])).to_pylist())
+    target = part_dir / f"part-{stamp}.parquet"
+    tmp = part_dir / f".part-{stamp}.parquet.tmp"
+    if replace and existing:
+        old = pa.concat_tables([pq.read_table(p, schema=new_table.schema) for p in existing])
+        keep = pc.invert(pc.is_in(old["order_guid"], value_set=pa.array(sorted(replace), pa.string())))
+        pq.write_table(pa.concat_tables([old.filter(keep), new_table]), tmp, compression="zstd")
+        stale = [p.name for p in existing if p != target]
+        (part_dir / PENDING_NAME).write_text(json.dumps({"target": target.name, "delete": stale}) + "\n")
+        os.replace(tmp, target)
+        for name in stale:
+            (part_dir / name).unlink()
+        (part_dir / PENDING_NAME).unlink()
+        return
+    pq.write_table(new_table, tmp, compression="zstd")
+    os.replace(tmp, target)
+
+
+def _load_manifest(out_root: Path) -> Dict[str, Dict[str, Any]]:
+    try:
+        data = json.loads((out_root / MANIFEST_NAME).read_text())
+    except (OSError, ValueError):
+        return {}
+    return data.get("orders", {}) if isinstance(data, dict) else {}
+
+
+def _save_manifest(out_root: Path, orders: Dict[str, Dict[str, Any]]) -> None:
+    tmp = out_root / f".{MANIFEST_NAME}.tmp"
+    tmp.write_text(json.dumps({"orders": orders}, sort_keys=True) + "\n")
+    os.replace(tmp, out_root / MANIFEST_NAME)
+
+
+def export(orders: Sequence[Dict[str, Any]], out_root: Path) -> Dict[str, int]:
+    """Append new and changed orders to the Parquet export. Returns counts."""
+    pa = _require_pyarrow()
+    out_root.mkdir(parents=True, exist_ok=True)
+    _recover(out_root)
+    manifest = _load_manifest(out_root)
+
+    pending = []
+    replaced: Dict[str, List[str]] = {}
+    for order in orders:
+        seen = manifest.get(order["guid"])
+        if seen is not None and seen.get("modified") == order.get("modifiedDate"):
+            continue
+        if seen is not None:
+            replaced.setdefault(seen.get("business_date") or "unknown", []).append(order["guid"])
+        pending.append(order)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    by_date = flatten(pending)
+    for bdate in sorted(set(by_date) | set(replaced)):
+        rows = by_date.get(bdate, {name: [] for name in TABLES})
+        for table in TABLES:
+            schema = _schema(pa, table)
+            new_table = pa.Table.from_pylist(rows[table], schema=schema)
+            replace = replaced.get(bdate, [])
+            if new_table.num_rows == 0 and not replace:
+                continue
+            _write_partition(pa, out_root / table / f"business_date={bdate}", new_table, replace, stamp)
+
+    for order in pending:
+        bdate = _cast_business_date(order.get("businessDate")) or "unknown"
+        manifest[order["guid"]] = {"modified": order.get("modifiedDate"), "business_date": bdate}
+    _save_manifest(out_root, manifest)
+    return {
+        "orders_seen": len(orders),
+        "orders_written": len(pending),
+        "orders_replaced": sum(len(v) for v in replaced.values()),
+        "partitions": len(set(by_date) | set(replaced)),
+    }
+
+
+def summarize(out_root: Path, since: Optional[date] = None, until: Optional[date] = None):
+    """Per business date order counts, curbside share, sales and ticket minutes."""
+    pa = _require_pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+
+    if not (out_root / "orders").is_dir():
+        raise RuntimeError(f"No order export under {out_root}")
+    _recover(out_root)
+    dataset = ds.dataset(out_root / "orders", format="parquet", partitioning=_partitioning(pa))
+    filt = None
+    if since:
+        filt = ds.field("business_date") >= since.isoformat()
+    if until:
+        upper = ds.field("business_date") <= until.isoformat()
+        filt = upper if filt is None else filt & upper
+    table = dataset.to_table(
+        columns=["business_date", "order_guid", "is_curbside", "total_amount_cents", "opened_at", "closed_at"],
+        filter=filt,
+    )
+    elapsed = pc.subtract(table["closed_at"], table["opened_at"])
+    minutes = pc.divide(pc.cast(elapsed, pa.int64()), 60000.0)
+    table = table.append_column("ticket_minutes", minutes)
+    grouped = table.group_by("business_date").aggregate(
+        [
+            ("order_guid", "count"),
+            ("is_curbside", "sum"),
+            ("total_amount_cents", "sum"),
+            ("ticket_minutes", "mean"),
+        ]
+    )
+    return grouped.sort_by("business_date")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export Toast order snapshots to partitioned Parquet")
+    parser.add_argument("snapshot_dirs", nargs="*", help="Directories of <guid>.json order snapshots")
+    parser.add_argument("--out", default=None, help="Export root (default: <toast_api>/exports)")
+    parser.add_argument("--summary", action="store_true", help="Print per day aggregates from the export")
+    parser.add_argument("--since", default=None, help="Summary start business date YYYY-MM-DD")
+    parser.add_argument("--until", default=None, help="Summary end business date YYYY-MM-DD")
+    args = parser.parse_args()
+
+    out_root = Path(args.out) if args.out else Path(__file__).resolve().parent / "exports"
+    if not args.snapshot_dirs and not args.summary:
+        parser.error("give at least one snapshot directory or --summary")
+
+    try:
+        for snap_dir in args.snapshot_dirs:
+            counts = export(load_snapshots(Path(snap_dir)), out_root)
+            print(f"Exported {snap_dir}: {json.dumps(counts, sort_keys=True)}")
+        if args.summary:
+            since = date.fromisoformat(args.since) if args.since else None
+            until = date.fromisoformat(args.until) if args.until else None
+            result = summarize(out_root, since, until)
+            print("business_date  orders  curbside  sales_cents  mean_ticket_min")
+            for row in result.to_pylist():
+                mean = row["ticket_minutes_mean"]
+                print(
+                    f"{row['business_date']:<13} {row['order_guid_count']:>7} {row['is_curbside_sum'] or 0:>9} "
+                    f"{row['total_amount_cents_sum'] or 0:>12} {mean if mean is None else round(mean, 1):>16}"
+                )
+    except RuntimeError as exc:
+        print(str(exc), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Project Toast order snapshots into compact typed records.
+
+Each projected column is declared as a path in the notation printed by
+toast_order_shape.py ("$.checks[].customer.firstName"). Paths are compiled
+once and evaluated column by column over every snapshot in a directory, so a
+day of orders is projected in a single pass per field.
+
+Ingest projects each order itself: curbside_order_upsert_v1 fills the same
+columns through curbside_order_projection_v1, which mirrors PROJECTION (keep
+PROJECTION_VERSION in step). --upload is a backfill, for example after a
+projection change or for orders captured from snapshots.
+
+Usage:
+  python toast_order_project.py <snapshot_dir>                  # writes projections.jsonl
+  python toast_order_project.py <snapshot_dir> --check-shape    # report spec paths missing from the day's shape
+  python toast_order_project.py <snapshot_dir> --upload         # store columns on curbside_orders
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+PROJECTION_VERSION = 1
+UPLOAD_CHUNK = 500
+
+
+@dataclass(frozen=True)
+class Field:
+    column: str
+    paths: Tuple[str, ...]
+    reduce: str = "first"  # first | sum | count
+    cast: str = "text"  # text | int | cents | business_date | ts
+
+
+PROJECTION: Tuple[Field, ...] = (
+    Field("toast_order_guid", ("$.guid",)),
+    Field("business_date", ("$.businessDate",), cast="business_date"),
+    Field("dining_option_guid", ("$.diningOption.guid",)),
+    Field("order_source", ("$.source",)),
+    Field("display_number", ("$.displayNumber", "$.checks[].displayNumber")),
+    Field("customer_name", ("$.checks[].tabName",)),
+    Field("customer_first_name", ("$.checks[].customer.firstName",)),
+    Field("customer_last_name", ("$.checks[].customer.lastName",)),
+    Field("customer_phone", ("$.checks[].customer.phone",)),
+    Field("curbside_transport_color", ("$.curbsidePickupInfo.transportColor",)),
+    Field("curbside_transport_description", ("$.curbsidePickupInfo.transportDescription",)),
+    Field("curbside_notes", ("$.curbsidePickupInfo.notes",)),
+    Field("check_count", ("$.checks[]",), reduce="count", cast="int"),
+    Field("selection_count", ("$.checks[].selections[]",), reduce="count", cast="int"),
+    Field("total_amount_cents", ("$.checks[].totalAmount",), reduce="sum", cast="cents"),
+    Field("tax_amount_cents", ("$.checks[].taxAmount",), reduce="sum", cast="cents"),
+    Field("opened_at", ("$.openedDate",), cast="ts"),
+    Field("closed_at", ("$.closedDate",), cast="ts"),
+    Field("promised_at", ("$.promisedDate",), cast="ts"),
+    Field("toast_modified_at", ("$.modifiedDate",), cast="ts"),
+)
+
+# Helper columns folded into customer_name and dropped before storage.
+_NAME_PARTS = ("customer_first_name", "customer_last_name")
+
+
+def compile_path(path: str) -> Tuple[str, ...]:
+    """Split "$.a[].b" into ("a", "[]", "b")."""
+    if not path.startswith("$"):
+        raise ValueError(f"Path must start with $: {path}")
+    steps: List[str] = []
+    for part in path[1:].split("."):
+        if not part:
+            continue
+        while part.endswith("[]"):
+            part = part[:-2]
+            if part:
+                steps.append(part)
+                part = ""
+            steps.append("[]")
+        if part:
+            steps.append(part)
+    return tuple(steps)
+
+
+def eval_path(node: Any, steps: Sequence[str]) -> List[Any]:
+    frontier = [node]
+    for step in steps:
+        nxt: List[Any] = []
+        if step == "[]":
+            for item in frontier:
+                if isinstance(item, list):
+                    nxt.extend(item)
+        else:
+            for item in frontier:
+                if isinstance(item, dict) and item.get(step) is not None:
+                    nxt.append(item[step])
+        frontier = nxt
+        if not frontier:
+            break
+    return frontier
+
+
+def _cast_business_date(value: Any) -> Optional[str]:
+    text = str(value)
+    if len(text) != 8 or not text.isdigit():
+        return None
+    return date(int(text[:4]), int(text[4:6]), int(text[6:])).isoformat()
+
+
+def _cast_cents(value: Any) -> Optional[int]:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(round(value * 100))
+
+
+CASTS: Dict[str, Callable[[Any], Any]] = {
+    "text": lambda v: v if isinstance(v, str) else str(v),
+    "int": int,
+    "cents": _cast_cents,
+    "business_date": _cast_business_date,
+    "ts": lambda v: v if isinstance(v, str) else None,
+}
+
+
+def project_column(orders: Sequence[Any], field: Field) -> List[Any]:
+    compiled = [compile_path(p) for p in field.paths]
+    cast = CASTS[field.cast]
+    out: List[Any] = []
+    for order in orders:
+        values: List[Any] = []
+        for steps in compiled:
+            values = eval_path(order, steps)
+            if values:
+                break
+        if field.reduce == "count":
+            out.append(len(values))
+        elif field.reduce == "sum":
+            cast_values = [cast(v) for v in values]
+            kept = [v for v in cast_values if v is not None]
+            out.append(sum(kept) if kept else None)
+        else:
+            out.append(cast(values[0]) if values else None)
+    return out
+
+
+def project_orders(orders: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Project a batch of orders column by column, then assemble row records."""
+    columns = {field.column: project_column(orders, field) for field in PROJECTION}
+
+    names = columns["customer_name"]
+    for idx, name in enumerate(names):
+        if name:
+            continue
+        parts = [columns[c][idx] for c in _NAME_PARTS if columns[c][idx]]
+        names[idx] = " ".join(parts) or None
+    for column in _NAME_PARTS:
+        del columns[column]
+
+    rows: List[Dict[str, Any]] = []
+    for idx in range(len(orders)):
+        row = {column: values[idx] for column, values in columns.items()}
+        row["projection_version"] = PROJECTION_VERSION
+        rows.append(row)
+    return rows
+
+
+def load_snapshots(snap_dir: Path) -> List[Any]:
+    orders = []
+    for path in sorted(snap_dir.glob("*.json")):
+        obj = json.loads(path.read_text())
+        if isinstance(obj, dict) and obj.get("guid"):
+            orders.append(obj)
+    return orders
+
+
+def missing_paths(orders: Sequence[Any]) -> List[str]:
+    """Spec paths that never appear in the shape of the given orders."""
+    from toast_order_shape import walk
+
+    shape: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for order in orders:
+        walk(order, "$", shape)
+    return sorted({p for field in PROJECTION for p in field.paths if p not in shape})
+
+
+def upload(rows: List[Dict[str, Any]]) -> int:
+    from _common import load_supabase_config, supabase_rest
+
+    sb = load_supabase_config()
+    updated = 0
+    for start in range(0, len(rows), UPLOAD_CHUNK):
+        chunk = rows[start : start + UPLOAD_CHUNK]
+        data, err = supabase_rest(sb, "POST", "rpc/curbside_orders_project_v1", body={"p_rows": chunk})
+        if err:
+            raise RuntimeError(f"Projection upload failed: {err}")
+        updated += int(data or 0)
+    return updated
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Project Toast order snapshots into typed records")
+    parser.add_argument("snapshot_dir", help="Directory of <guid>.json order snapshots")
+    parser.add_argument("--out", default=None, help="Output JSONL (default: <snapshot_dir>/projections.jsonl)")
+    parser.add_argument("--check-shape", action="store_true", help="Report projection paths missing from the snapshots")
+    parser.add_argument("--upload", action="store_true", help="Store projected columns on curbside_orders")
+    args = parser.parse_args()
+
+    snap_dir = Path(args.snapshot_dir)
+    orders = load_snapshots(snap_dir)
+    if not orders:
+        print(f"No order snapshots in {snap_dir}", file=sys.stderr)
+        return 1
+
+    if args.check_shape:
+        for path in missing_paths(orders):
+            print(f"MISSING\t{path}")
+
+    rows = project_orders(orders)
+    out_path = Path(args.out) if args.out else snap_dir / "projections.jsonl"
+    with out_path.open("w", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row, sort_keys=True) + "\n")
+    print(f"Projected {len(rows)} orders to: {out_path}")
+
+    if args.upload:
+        print(f"Updated curbside_orders rows: {upload(rows)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
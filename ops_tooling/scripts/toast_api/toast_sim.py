@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Local Toast API simulator for load and regression testing.
+
+Serves the endpoints the kit uses:
+- POST /authentication/v1/authentication/login
+- GET  /orders/v2/orders?restaurantGuid=...&startDate=...&endDate=...   (list of GUIDs)
+- GET  /orders/v2/orders/<guid>                                    (ETag; If-None-Match answers 304)
+- GET  /restaurants/v1/restaurants/<guid>                                (timeZone, closeoutHour)
+- GET  /__sim/stats                                                     (simulator counters)
+
+Orders come from a directory of <guid>.json snapshots (the layout written by
+toast_find_curbside_yesterday.py) or from a seeded synthetic generator.
+Latency, 5xx errors and 429 throttling can be injected, so retry and
+concurrency behavior can be exercised without spending live rate limit.
+
+Usage:
+  python toast_sim.py --synthetic 2000 --port 8765
+  python toast_sim.py --snapshots snapshots_yesterday --latency-ms 40 --jitter-ms 20
+  python toast_sim.py --synthetic 500 --error-rate 0.02 --rate-limit-rps 20
+
+Point the kit at it with TOAST_BASE_URL=http://127.0.0.1:8765 (any client id,
+secret and restaurant GUID are accepted).
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+from zoneinfo import ZoneInfo
+
+from toast_windows import DEFAULT_TIMEZONE, business_day_bounds
+
+LIST_PATH = "/orders/v2/orders"
+AUTH_PATH = "/authentication/v1/authentication/login"
+RESTAURANT_PATH = "/restaurants/v1/restaurants/"
+STATS_PATH = "/__sim/stats"
+
+
+def parse_toast_dt(text: str) -> datetime:
+    """Inverse of _common.toast_dt ("2026-01-18T00:00:00.000-0500")."""
+    return datetime.strptime(text, "%Y-%m-%dT%H:%M:%S.%f%z")
+
+
+def _iso_ms(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.") + f"{dt.microsecond // 1000:03d}+0000"
+
+
+class OrderStore:
+    """Orders sorted by opened time so a list call is two bisects."""
+
+    def __init__(self, orders: Sequence[Dict[str, Any]]) -> None:
+        keyed = []
+        for order in orders:
+            opened = order.get("openedDate") or order.get("createdDate")
+            if not isinstance(order.get("guid"), str) or not isinstance(opened, str):
+                continue
+            keyed.append((parse_toast_dt(opened).timestamp(), order["guid"]))
+        keyed.sort()
+        self._times = [t for t, _g in keyed]
+        self._guids = [g for _t, g in keyed]
+        self.by_guid: Dict[str, Dict[str, Any]] = {o["guid"]: o for o in orders if isinstance(o.get("guid"), str)}
+        self._bodies: Dict[str, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._guids)
+
+    def guids_between(self, start: datetime, end: datetime) -> List[str]:
+        lo = bisect.bisect_left(self._times, start.timestamp())
+        hi = bisect.bisect_left(self._times, end.timestamp())
+        return self._guids[lo:hi]
+
+    def body(self, guid: str) -> Optional[bytes]:
+        cached = self._bodies.get(guid)
+        if cached is None:
+            order = self.by_guid.get(guid)
+            if order is None:
+                return None
+            cached = json.dumps(order).encode("utf-8")
+            self._bodies[guid] = cached
+        return cached
+
+    def etag(self, guid: str) -> Optional[str]:
+        body = self.body(guid)
+        return None if body is None else '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+    @classmethod
+    def from_snapshots(cls, snap_dir: Path) -> "OrderStore":
+        orders = []
+        for path in sorted(snap_dir.glob("*.json")):
+            obj = json.loads(path.read_text())
+            if isinstance(obj, dict) and obj.get("guid"):
+                orders.append(obj)
+        return cls(orders)
+
+
+def synthetic_orders(
+    count: int, day: date, seed: int = 0, tz: ZoneInfo = ZoneInfo(DEFAULT_TIMEZONE), closeout_hour: int = 0
+) -> List[Dict[str, Any]]:
+    """Orders spread over one business day, denser around lunch and dinner."""
+    rng = random.Random(seed)
+    start, end = business_day_bounds(day, tz, closeout_hour)
+    midnight = datetime(day.year, day.month, day.day, tzinfo=tz)
+    peaks = (12.0, 18.5)
+    orders = []
+    for idx in range(count):
+        hour = rng.gauss(rng.choice(peaks), 1.5)
+        opened = min(end - timedelta(seconds=1), max(start, midnight + timedelta(hours=hour, seconds=rng.random())))
+        checks = []
+        for _ in range(1 if rng.random() < 0.9 else 2):
+            selections = [
+                {"guid": str(uuid.UUID(int=rng.getrandbits(128))), "quantity": 1, "price": round(rng.uniform(2, 18), 2)}
+                for _ in range(rng.randint(1, 6))
+            ]
+            total = round(sum(s["price"] for s in selections), 2)
+            checks.append(
+                {
+                    "guid": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "displayNumber": str(100 + idx),
+                    "tabName": f"Guest {idx}",
+                    "customer": {"firstName": "Guest", "lastName": str(idx), "phone": f"555{idx:07d}"},
+                    "selections": selections,
+                    "totalAmount": round(total * 1.07, 2),
+                    "taxAmount": round(total * 0.07, 2),
+                }
+            )
+        order: Dict[str, Any] = {
+            "guid": str(uuid.UUID(int=rng.getrandbits(128))),
+            "entityType": "Order",
+            "businessDate": int(day.strftime("%Y%m%d")),
+            "displayNumber": str(100 + idx),
+            "source": rng.choice(["In Store", "Online", "API"]),
+            "diningOption": {"guid": rng.choice(["dine-in", "takeout", "curbside"]), "entityType": "DiningOption"},
+            "openedDate": _iso_ms(opened),
+            "createdDate": _iso_ms(opened),
+            "modifiedDate": _iso_ms(opened + timedelta(minutes=rng.randint(1, 30))),
+            "promisedDate": _iso_ms(opened + timedelta(minutes=20)),
+            "closedDate": _iso_ms(opened + timedelta(minutes=rng.randint(5, 40))),
+            "checks": checks,
+        }
+        if order["diningOption"]["guid"] == "curbside":
+            order["curbsidePickupInfo"] = {
+                "transportColor": rng.choice(["red", "blue", "white", "black"]),
+                "transportDescription": "sedan",
+                "notes": "",
+            }
+        orders.append(order)
+    return orders
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    rate_limit_rps: float = 0.0
+    max_range_minutes: int = 60
+    seed: int = 0
+    _rng: random.Random = field(default_factory=random.Random, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _tokens: float = field(default=0.0, init=False, repr=False)
+    _last: float = field(default=0.0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._rng.seed(self.seed)
+        self._tokens = self.rate_limit_rps
+        self._last = time.monotonic()
+
+    def delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000
+
+    def inject(self) -> Optional[int]:
+        """Status to fail this request with, or None to serve it."""
+        with self._lock:
+            if self.rate_limit_rps > 0:
+                now = time.monotonic()
+                self._tokens = min(self.rate_limit_rps, self._tokens + (now - self._last) * self.rate_limit_rps)
+                self._last = now
+                if self._tokens < 1:
+                    return 429
+                self._tokens -= 1
+            roll = self._rng.random()
+        if roll < self.throttle_rate:
+            return 429
+        if roll < self.throttle_rate + self.error_rate:
+            return 500
+        return None
+
+
+class SimState:
+    def __init__(self, store: OrderStore, faults: Faults, restaurant: Optional[Dict[str, Any]] = None) -> None:
+        self.store = store
+        self.faults = faults
+        self.restaurant = restaurant or {"timeZone": DEFAULT_TIMEZONE, "closeoutHour": 0}
+        self.tokens: set = set()
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def issue_token(self) -> str:
+        token = uuid.uuid4().hex
+        with self._lock:
+            self.tokens.add(token)
+        return token
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "ToastSim/1"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> SimState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Any, route: str, headers: Optional[Dict[str, str]] = None) -> None:
+        raw = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+        self.state.count(f"{route} {status}")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _faulted(self, route: str) -> bool:
+        delay = self.state.faults.delay()
+        if delay:
+            time.sleep(delay)
+        status = self.state.faults.inject()
+        if status == 429:
+            self._send(429, {"status": 429, "message": "Rate limit exceeded"}, route, {"Retry-After": "1"})
+            return True
+        if status is not None:
+            self._send(status, {"status": status, "message": "Injected failure"}, route)
+            return True
+        return False
+
+    def _authorized(self, route: str) -> bool:
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Bearer ") or auth[7:] not in self.state.tokens:
+            self._send(401, {"status": 401, "message": "Invalid token"}, route)
+            return False
+        if not self.headers.get("Toast-Restaurant-External-Id"):
+            self._send(400, {"status": 400, "message": "Missing Toast-Restaurant-External-Id"}, route)
+            return False
+        return True
+
+    def do_POST(self) -> None:
+        route = "auth"
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length) if length else b""
+        if urlsplit(self.path).path != AUTH_PATH:
+            self._send(404, {"status": 404, "message": "Not found"}, "unknown")
+            return
+        if self._faulted(route):
+            return
+        try:
+            body = json.loads(payload or b"{}")
+        except ValueError:
+            body = {}
+        if not body.get("clientId") or not body.get("clientSecret"):
+            self._send(401, {"status": 401, "message": "Bad credentials"}, route)
+            return
+        token = self.state.issue_token()
+        self._send(200, {"status": "SUCCESS", "token": {"accessToken": token, "tokenType": "Bearer", "expiresIn": 86400}}, route)
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        if parts.path == STATS_PATH:
+            self._send(200, {"orders": len(self.state.store), "counts": dict(self.state.counts)}, "stats")
+            return
+        if parts.path == LIST_PATH:
+            self._list(parse_qs(parts.query))
+            return
+        if parts.path.startswith(RESTAURANT_PATH):
+            if not self._faulted("config") and self._authorized("config"):
+                self._send(200, {"guid": parts.path[len(RESTAURANT_PATH) :], "general": self.state.restaurant}, "config")
+            return
+        if parts.path.startswith(LIST_PATH + "/"):
+            self._get(parts.path[len(LIST_PATH) + 1 :])
+            return
+        self._send(404, {"status": 404, "message": "Not found"}, "unknown")
+
+    def _list(self, query: Dict[str, List[str]]) -> None:
+        route = "list"
+        if self._faulted(route) or not self._authorized(route):
+            return
+        try:
+            start = parse_toast_dt(query["startDate"][0])
+            end = parse_toast_dt(query["endDate"][0])
+        except (KeyError, ValueError):
+            self._send(400, {"status": 400, "message": "startDate and endDate are required"}, route)
+            return
+        if end - start > timedelta(minutes=self.state.faults.max_range_minutes):
+            self._send(400, {"status": 400, "message": "Time range exceeds the maximum allowed"}, route)
+            return
+        self._send(200, self.state.store.guids_between(start, end), route)
+
+    def _get(self, guid: str) -> None:
+        route = "get"
+        if self._faulted(route) or not self._authorized(route):
+            return
+        body = self.state.store.body(guid)
+        if body is None:
+            self._send(404, {"status": 404, "message": f"Order {guid} not found"}, route)
+            return
+        etag = self.state.store.etag(guid) or ""
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, b"", route, {"ETag": etag})
+            return
+        self._send(200, body, route, {"ETag": etag})
+
+
+class _SimServer(ThreadingHTTPServer):
+    # urllib opens a connection per request; the default backlog of 5 drops
+    # SYNs under concurrency and shows up as 1s retransmit outliers.
+    request_queue_size = 256
+    daemon_threads = True
+
+
+def start_server(
+    store: OrderStore,
+    faults: Faults,
+    host: str = "127.0.0.1",
+    port: int = 0,
+    restaurant: Optional[Dict[str, Any]] = None,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the simulator on a background thread. Returns (server, base_url)."""
+    server = _SimServer((host, port), _Handler)
+    server.state = SimState(store, faults, restaurant)  # type: ignore[attr-defined]
+    thread = threading.Thread(target=server.serve_forever, name="toast-sim", daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_source_args(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--snapshots", default=None, help="Serve <guid>.json order snapshots from this directory")
+    parser.add_argument("--synthetic", type=int, default=500, help="Number of synthetic orders when --snapshots is not set")
+    parser.add_argument("--day", default=None, help="Synthetic business day YYYY-MM-DD (default: yesterday)")
+    parser.add_argument("--timezone", default=DEFAULT_TIMEZONE, help="Restaurant timezone reported by the config endpoint")
+    parser.add_argument("--closeout-hour", type=int, default=0, help="Business day cutoff hour reported by the config endpoint")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-limit-rps", type=float, default=0.0, help="Token bucket limit; excess requests get 429")
+
+
+def restaurant_from_args(args: argparse.Namespace) -> Dict[str, Any]:
+    return {"timeZone": args.timezone, "closeoutHour": args.closeout_hour}
+
+
+def synthetic_day(args: argparse.Namespace) -> date:
+    if args.day:
+        return date.fromisoformat(args.day)
+    return datetime.now(ZoneInfo(args.timezone)).date() - timedelta(days=1)
+
+
+def store_from_args(args: argparse.Namespace) -> OrderStore:
+    if args.snapshots:
+        return OrderStore.from_snapshots(Path(args.snapshots))
+    orders = synthetic_orders(args.synthetic, synthetic_day(args), args.seed, ZoneInfo(args.timezone), args.closeout_hour)
+    return OrderStore(orders)
+
+
+def faults_from_args(args: argparse.Namespace) -> Faults:
+    return Faults(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        rate_limit_rps=args.rate_limit_rps,
+        seed=args.seed,
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local Toast API simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_source_args(parser)
+    args = parser.parse_args()
+
+    server, base_url = start_server(
+        store_from_args(args), faults_from_args(args), args.host, args.port, restaurant_from_args(args)
+    )
+    print(f"Toast simulator serving {len(server.state.store)} orders at {base_url}")  # type: ignore[attr-defined]
+    print(f"export TOAST_BASE_URL={base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Business-day aware window planning for Toast order listing.
+
+The order list endpoint accepts at most a 60 minute range per call. A
+business day runs from the restaurant's closeout hour to the same hour the
+next calendar day in the restaurant's own timezone, so it can be 23 or 25
+hours long across DST changes.
+
+plan_windows() covers that range with contiguous windows. The day is cut
+into 15 minute slots. Neighbouring slots are merged while the expected order
+count stays under a target and the span stays within the API cap. A slot
+expected to hold more than the target is split further. The target is half
+of the split threshold, so ordinary day to day variation does not trigger
+the re-list fallback in list_windows(). Expected counts are
+the per-slot averages of previous runs (DensityHistory), so quiet stretches
+cost one request per hour and busy ones are listed in small pieces.
+
+Env overrides:
+- TOAST_TIMEZONE        IANA zone, e.g. America/New_York (default: restaurant config, else America/New_York)
+- TOAST_CLOSEOUT_HOUR   business day cutoff hour 0-23 (default: restaurant config, else 0)
+- TOAST_LIST_SPLIT_AT   GUIDs per response treated as possibly truncated and re-listed in halves (default 100)
+- TOAST_LIST_WORKERS    concurrent list requests (default 4)
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+SLOT_MINUTES = 15
+MAX_WINDOW_MINUTES = 60
+MIN_WINDOW_MINUTES = 5
+DEFAULT_TIMEZONE = "America/New_York"
+DEFAULT_SPLIT_AT = 100
+DEFAULT_WORKERS = 4
+HISTORY_DAYS = 14
+
+
+@dataclass(frozen=True)
+class Window:
+    start: datetime
+    end: datetime
+    expected: float = 0.0
+
+    @property
+    def minutes(self) -> float:
+        return (self.end - self.start).total_seconds() / 60
+
+
+ListResult = Tuple[Window, Any, Optional[Dict[str, Any]]]
+
+
+def restaurant_schedule(cfg, token: str) -> Tuple[ZoneInfo, int]:
+    """Timezone and closeout hour from env, else the restaurant config, else defaults."""
+    tz_name = os.environ.get("TOAST_TIMEZONE")
+    closeout = os.environ.get("TOAST_CLOSEOUT_HOUR")
+    if not tz_name or closeout is None:
+        general = _restaurant_general(cfg, token)
+        tz_name = tz_name or general.get("timeZone")
+        if closeout is None and isinstance(general.get("closeoutHour"), int):
+            closeout = str(general["closeoutHour"])
+    try:
+        tz = ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = ZoneInfo(DEFAULT_TIMEZONE)
+    hour = int(closeout) if closeout not in (None, "") else 0
+    return tz, hour % 24
+
+
+def _restaurant_general(cfg, token: str) -> Dict[str, Any]:
+    from urllib.request import Request
+
+    from _common import _http_json, orders_headers
+
+    url = f"{cfg.base_url}/restaurants/v1/restaurants/{cfg.restaurant_guid}"
+    req = Request(url, headers=orders_headers(token, cfg.restaurant_guid), method="GET")
+    data, err = _http_json(req, stage="config")
+    if err or not isinstance(data, dict) or not isinstance(data.get("general"), dict):
+        return {}
+    return data["general"]
+
+
+def business_date(now: datetime, tz: ZoneInfo, closeout_hour: int) -> date:
+    """Business date that `now` falls in."""
+    local = now.astimezone(tz)
+    day = local.date()
+    return day - timedelta(days=1) if local.hour < closeout_hour else day
+
+
+def business_day_bounds(day: date, tz: ZoneInfo, closeout_hour: int) -> Tuple[datetime, datetime]:
+    """[start, end) of a business day as UTC datetimes."""
+    nxt = day + timedelta(days=1)
+    start = datetime(day.year, day.month, day.day, closeout_hour, tzinfo=tz)
+    end = datetime(nxt.year, nxt.month, nxt.day, closeout_hour, tzinfo=tz)
+    return start.astimezone(timezone.utc), end.astimezone(timezone.utc)
+
+
+def slot_count(start: datetime, end: datetime) -> int:
+    return math.ceil((end - start).total_seconds() / 60 / SLOT_MINUTES)
+
+
+def _slots(start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+    out = []
+    cur = start
+    step = timedelta(minutes=SLOT_MINUTES)
+    while cur < end:
+        nxt = min(cur + step, end)
+        out.append((cur, nxt))
+        cur = nxt
+    return out
+
+
+def plan_windows(
+    start: datetime,
+    end: datetime,
+    slot_density: Sequence[float] = (),
+    target: float = DEFAULT_SPLIT_AT / 2,
+    max_minutes: int = MAX_WINDOW_MINUTES,
+    min_minutes: int = MIN_WINDOW_MINUTES,
+) -> List[Window]:
+    """Contiguous windows covering [start, end), sized from expected orders per slot."""
+    windows: List[Window] = []
+    cap = timedelta(minutes=max_minutes)
+    open_start: Optional[datetime] = None
+    open_end: Optional[datetime] = None
+    open_expected = 0.0
+
+    def flush() -> None:
+        nonlocal open_start, open_expected
+        if open_start is not None:
+            windows.append(Window(open_start, open_end, open_expected))
+        open_start, open_expected = None, 0.0
+
+    for idx, (s, e) in enumerate(_slots(start, end)):
+        expected = slot_density[idx] if idx < len(slot_density) else 0.0
+        if expected > target:
+            flush()
+            max_parts = max(1, int((e - s).total_seconds() // 60 // min_minutes))
+            parts = min(max_parts, math.ceil(expected / target))
+            step = (e - s) / parts
+            for part in range(parts):
+                p_end = e if part == parts - 1 else s + step * (part + 1)
+                windows.append(Window(s + step * part, p_end, expected / parts))
+            continue
+        if open_start is not None and (open_expected + expected > target or e - open_start > cap):
+            flush()
+        if open_start is None:
+            open_start = s
+        open_end = e
+        open_expected += expected
+    flush()
+    return windows
+
+
+def list_windows(
+    list_fn: Callable[[datetime, datetime], Tuple[Any, Optional[Dict[str, Any]]]],
+    windows: Sequence[Window],
+    workers: int = DEFAULT_WORKERS,
+    split_at: int = DEFAULT_SPLIT_AT,
+    min_minutes: int = MIN_WINDOW_MINUTES,
+    on_done: Optional[Callable[[Window, List[ListResult]], None]] = None,
+) -> List[ListResult]:
+    """
+    List every window concurrently and return results in window order.
+    A window that returns split_at or more GUIDs may have been cut short, so
+    it is listed again as two halves (down to min_minutes).
+    on_done(window, results) is called from the worker thread as each planned
+    window finishes, halves included.
+    """
+
+    def run(window: Window) -> List[ListResult]:
+        guids, err = list_fn(window.start, window.end)
+        if err or not isinstance(guids, list):
+            return [(window, guids, err)]
+        if split_at and len(guids) >= split_at and window.minutes >= 2 * min_minutes:
+            mid = window.start + (window.end - window.start) / 2
+            return run(Window(window.start, mid)) + run(Window(mid, window.end))
+        return [(window, guids, None)]
+
+    def run_planned(window: Window) -> List[ListResult]:
+        results = run(window)
+        if on_done is not None:
+            on_done(window, results)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return [result for batch in pool.map(run_planned, windows) for result in batch]
+
+
+class DensityHistory:
+    """Per business day list counts, stored as [offset_minutes, minutes, count] rows."""
+
+    def __init__(self, path: Path, days: Optional[Dict[str, List[List[float]]]] = None) -> None:
+        self.path = path
+        self.days: Dict[str, List[List[float]]] = days or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "DensityHistory":
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            data = {}
+        return cls(path, data.get("days", {}) if isinstance(data, dict) else {})
+
+    def record(self, day: date, day_start: datetime, results: Sequence[ListResult]) -> None:
+        rows = []
+        for window, guids, err in results:
+            if err or not isinstance(guids, list):
+                continue
+            offset = (window.start - day_start).total_seconds() / 60
+            rows.append([round(offset, 3), round(window.minutes, 3), len(guids)])
+        if rows:
+            self.days[day.isoformat()] = rows
+
+    def save(self, keep_days: int = HISTORY_DAYS) -> None:
+        kept = dict(sorted(self.days.items())[-keep_days:])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps({"slot_minutes": SLOT_MINUTES, "days": kept}, indent=2, sort_keys=True) + "\n")
+
+    def slot_density(self, n_slots: int, before: Optional[date] = None) -> List[float]:
+        """Average expected orders per slot over recorded days (before `before`, if given)."""
+        totals = [0.0] * n_slots
+        days = [d for d in self.days if before is None or d < before.isoformat()]
+        for day in days:
+            for offset, minutes, count in self.days[day]:
+                if minutes <= 0:
+                    continue
+                rate = count / minutes
+                lo, hi = offset, offset + minutes
+                first = max(0, int(lo // SLOT_MINUTES))
+                last = min(n_slots - 1, int((hi - 1e-9) // SLOT_MINUTES))
+                for slot in range(first, last + 1):
+                    s_lo = slot * SLOT_MINUTES
+                    overlap = min(hi, s_lo + SLOT_MINUTES) - max(lo, s_lo)
+                    if overlap > 0:
+                        totals[slot] += rate * overlap
+        return [t / len(days) for t in totals] if days else totals
+
+
+def settings_from_env() -> Tuple[int, int]:
+    """(split threshold, concurrent list workers)."""
+    split_at = int(os.environ.get("TOAST_LIST_SPLIT_AT") or DEFAULT_SPLIT_AT)
+    workers = int(os.environ.get("TOAST_LIST_WORKERS") or DEFAULT_WORKERS)
+    return split_at, workers
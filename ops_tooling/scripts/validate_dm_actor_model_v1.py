@@ -1,50 +1,54 @@
 #!/usr/bin/env python3
-import json
-import sys
+import argparse
+import os
 from pathlib import Path
+from typing import Any, Optional
 
-from jsonschema import Draft202012Validator
+from schema_validation import REPO_ROOT, get_validator, validate_documents
 
+DEFAULT_DATA = REPO_ROOT / "docs" / "canon" / "actors" / "dm_actor_model_v1.json"
+DEFAULT_SCHEMA = REPO_ROOT / "docs" / "canon" / "actors" / "dm_actor_model_v1.schema.json"
 
-def format_path(error_path):
-    if not error_path:
-        return "$"
-    parts = ["$"]
-    for part in error_path:
-        if isinstance(part, int):
-            parts.append(f"[{part}]")
-        else:
-            parts.append(f".{part}")
-    return "".join(parts)
 
+def check_model_shape(data: Any) -> Optional[str]:
+    if not isinstance(data, dict) or not isinstance(data.get("doc"), dict):
+        return "Invalid data format: missing doc object"
+    return None
 
-def main():
-    root = Path(__file__).resolve().parents[1]
-    data_path = root / "docs" / "dm_actor_model_v1.json"
-    schema_path = root / "docs" / "dm_actor_model_v1.schema.json"
-
-    try:
-        data = json.loads(data_path.read_text())
-    except Exception as exc:
-        print(f"Failed to read {data_path}: {exc}")
-        return 1
-
-    if not isinstance(data, dict) or "doc" not in data or not isinstance(data["doc"], dict):
-        print("Invalid data format: missing doc object")
-        return 1
 
+def main():
+    parser = argparse.ArgumentParser(description="Validate actor model documents against the v1 schema")
+    parser.add_argument("docs", nargs="*", default=[str(DEFAULT_DATA)], help="Model documents to validate")
+    parser.add_argument("--schema", default=str(DEFAULT_SCHEMA), help="Path to the JSON Schema")
+    parser.add_argument("--all-errors", action="store_true", help="Report every error instead of the first")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes for batch runs")
+    args = parser.parse_args()
+
+    schema_path = Path(args.schema)
     try:
-        schema = json.loads(schema_path.read_text())
+        get_validator(schema_path)
     except Exception as exc:
         print(f"Failed to read {schema_path}: {exc}")
         return 1
 
-    validator = Draft202012Validator(schema)
-    errors = sorted(validator.iter_errors(data), key=lambda e: e.path)
-
-    if errors:
-        error = errors[0]
-        print(f"Validation error at {format_path(error.path)}: {error.message}")
+    # Each document is read and parsed once, in the worker that validates it.
+    doc_paths = [Path(p) for p in args.docs]
+    results = validate_documents(
+        schema_path,
+        doc_paths,
+        fail_fast=not args.all_errors,
+        workers=args.workers,
+        precheck=check_model_shape,
+    )
+
+    failed = False
+    for data_path, issues in results:
+        for issue in issues:
+            prefix = f"{data_path}: " if len(doc_paths) > 1 else ""
+            print(f"{prefix}Validation error at {issue['path']}: {issue['message']}")
+            failed = True
+
+    if failed:
         return 1
 
     print("Validation passed.")
@@ -1,106 +1,166 @@
 #!/usr/bin/env python3
+import hashlib
+import json
 import os
 import sys
-from pathlib import Path
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
 
-ALLOWED_STATES = {"draft", "validated", "canonical", "locked", "deprecated"}
 AUTH_JSON = Path("docs") / "document_lifecycle_v1.json"
 AUTH_MD = Path("docs") / "DOCUMENT_LIFECYCLE_V1.MD"
 
-
-def _collect_docs_files(docs_root: Path):
+# Compiled rules keyed by the SHA-256 of the authority JSON.
+_RULES_CACHE: Dict[str, "LifecycleRules"] = {}
+
+
+@dataclass(frozen=True)
+class NameRule:
+    label: str
+    case: str
+    suffix: str
+
+    def message(self) -> str:
+        if self.case == "uppercase":
+            return f"{self.label} filename must be {self.case} with {self.suffix}"
+        return f"{self.label} filename must be {self.case}"
+
+    def ok(self, name: str, suffix: str) -> bool:
+        cased = name.upper() if self.case == "uppercase" else name.lower()
+        return name == cased and suffix == self.suffix
+
+
+@dataclass(frozen=True)
+class LifecycleRules:
+    states: FrozenSet[str]
+    name_rules: Dict[str, NameRule]
+    pair_roles: Tuple[str, ...]
+    same_basename: bool
+    same_directory: bool
+    both_required: bool
+
+
+def compile_rules(raw: bytes) -> LifecycleRules:
+    """Compile document_lifecycle_v1.json into precomputed sets and matchers."""
+    spec = json.loads(raw)
+    file_rules = spec["file_rules"]
+    pairing = file_rules.get("pairing_rules", {})
+
+    name_rules: Dict[str, NameRule] = {}
+    roles: List[str] = []
+    for key in ("machine_canonical", "human_companion"):
+        rule = file_rules[key]
+        fmt = rule["format"].lower()
+        case = rule["filename_case"]
+        suffix = f".{fmt.upper()}" if case == "uppercase" else f".{fmt}"
+        name_rules[f".{fmt}"] = NameRule(label=fmt.upper(), case=case, suffix=suffix)
+        roles.append(f".{fmt}")
+
+    return LifecycleRules(
+        states=frozenset(spec["lifecycle_states"]),
+        name_rules=name_rules,
+        pair_roles=tuple(roles),
+        same_basename=bool(pairing.get("same_basename_required", True)),
+        same_directory=bool(pairing.get("same_directory_required", True)),
+        both_required=bool(pairing.get("both_required", True)),
+    )
+
+
+def load_rules(auth_json: Path = AUTH_JSON) -> LifecycleRules:
+    raw = auth_json.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    rules = _RULES_CACHE.get(digest)
+    if rules is None:
+        rules = compile_rules(raw)
+        _RULES_CACHE[digest] = rules
+    return rules
+
+
+def _collect_docs_files(docs_root: Path) -> List[PurePosixPath]:
+    skip = {AUTH_JSON.relative_to("docs").as_posix(), AUTH_MD.relative_to("docs").as_posix()}
     files = []
     for root, _dirs, filenames in os.walk(docs_root):
+        rel_root = PurePosixPath(Path(root).relative_to(docs_root).as_posix())
         for name in filenames:
-            path = Path(root) / name
-            if path == AUTH_JSON or path == AUTH_MD:
+            rel = rel_root / name
+            if rel.as_posix() in skip:
                 continue
-            files.append(path)
+            files.append(rel)
     return files
 
 
-def _is_state_path_ok(rel_parts):
-    if len(rel_parts) != 3:
-        return False
-    return rel_parts[1] in ALLOWED_STATES
-
-
-def main() -> int:
-    if not AUTH_JSON.is_file():
-        print(f"Missing authority file: {AUTH_JSON}")
-        return 1
-    if not AUTH_MD.is_file():
-        print(f"Missing authority file: {AUTH_MD}")
-        return 1
-
-    docs_root = Path("docs")
-    if not docs_root.exists():
-        return 0
-
-    docs_files = _collect_docs_files(docs_root)
-    if not docs_files:
-        return 0
+def check_files(rel_paths: Iterable[PurePosixPath], rules: LifecycleRules) -> List[str]:
+    """Run every rule in a single pass over paths relative to docs/."""
+    violations: List[str] = []
+    # (directory or None, stem or full name) -> roles seen
+    pairs: Dict[Tuple[Optional[str], str], Set[str]] = {}
+    pair_dirs: Dict[Tuple[Optional[str], str], str] = {}
 
-    violations = []
-    files_by_dir = {}
-
-    for path in docs_files:
-        rel = path.relative_to(docs_root)
+    for rel in rel_paths:
         parts = rel.parts
+        shown = f"docs/{rel.as_posix()}"
 
         if len(parts) < 3:
-            violations.append(
-                f"Invalid path (missing state): docs/{rel.as_posix()}"
-            )
+            violations.append(f"Invalid path (missing state): {shown}")
             continue
         if len(parts) > 3:
-            violations.append(
-                f"Invalid path (extra nesting): docs/{rel.as_posix()}"
-            )
+            violations.append(f"Invalid path (extra nesting): {shown}")
+            continue
+        if parts[1] not in rules.states:
+            violations.append(f"Invalid state folder '{parts[1]}' for: {shown}")
             continue
-        if parts[1] not in ALLOWED_STATES:
-            violations.append(
-                f"Invalid state folder '{parts[1]}' for: docs/{rel.as_posix()}"
-            )
+
+        name = rel.name
+        suffix = rel.suffix
+        role = suffix.lower()
+        name_rule = rules.name_rules.get(role)
+        if name_rule is None:
             continue
+        if not name_rule.ok(name, suffix):
+            violations.append(f"{name_rule.message()}: {shown}")
+
+        parent = rel.parent.as_posix()
+        key = (
+            parent if rules.same_directory else None,
+            rel.stem.lower() if rules.same_basename else name.lower(),
+        )
+        pairs.setdefault(key, set()).add(role)
+        pair_dirs.setdefault(key, parent)
+
+    if rules.both_required:
+        first, second = rules.pair_roles
+        labels = {r: rules.name_rules[r].label for r in rules.pair_roles}
+        for key, roles in pairs.items():
+            stem = key[1]
+            where = f"docs/{pair_dirs[key]}"
+            if first in roles and second not in roles:
+                violations.append(f"Missing {labels[second]} pair for {labels[first]} '{stem}' in: {where}")
+            if second in roles and first not in roles:
+                violations.append(f"Missing {labels[first]} pair for {labels[second]} '{stem}' in: {where}")
+
+    return violations
+
+
+def lifecycle_violations(repo_root: Path = Path(".")) -> List[str]:
+    """Validate repo_root/docs in process and return sorted violation messages."""
+    auth_json = repo_root / AUTH_JSON
+    auth_md = repo_root / AUTH_MD
+    if not auth_json.is_file():
+        return [f"Missing authority file: {AUTH_JSON}"]
+    if not auth_md.is_file():
+        return [f"Missing authority file: {AUTH_MD}"]
+
+    docs_root = repo_root / "docs"
+    docs_files = _collect_docs_files(docs_root)
+    if not docs_files:
+        return []
+    return sorted(check_files(docs_files, load_rules(auth_json)))
 
-        files_by_dir.setdefault(rel.parent, []).append(path)
-
-        name = path.name
-        suffix = path.suffix
-        if suffix.lower() == ".json":
-            if name != name.lower() or suffix != ".json":
-                violations.append(
-                    f"JSON filename must be lowercase: docs/{rel.as_posix()}"
-                )
-        if suffix.lower() == ".md":
-            if name != name.upper() or suffix != ".MD":
-                violations.append(
-                    f"MD filename must be uppercase with .MD: docs/{rel.as_posix()}"
-                )
-
-    for rel_dir, paths in files_by_dir.items():
-        json_stems = set()
-        md_stems = set()
-        for path in paths:
-            suffix = path.suffix
-            if suffix.lower() == ".json":
-                json_stems.add(path.stem.lower())
-            if suffix.lower() == ".md":
-                md_stems.add(path.stem.lower())
-        missing_md = sorted(json_stems - md_stems)
-        missing_json = sorted(md_stems - json_stems)
-        for stem in missing_md:
-            violations.append(
-                f"Missing MD pair for JSON '{stem}' in: docs/{rel_dir.as_posix()}"
-            )
-        for stem in missing_json:
-            violations.append(
-                f"Missing JSON pair for MD '{stem}' in: docs/{rel_dir.as_posix()}"
-            )
 
+def main() -> int:
+    violations = lifecycle_violations()
     if violations:
-        for msg in sorted(violations):
+        for msg in violations:
             print(msg)
         return 1
 
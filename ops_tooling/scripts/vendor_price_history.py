@@ -0,0 +1,484 @@
+#!/usr/bin/env python3
+"""
+Vendor price analytics over a local, incrementally synced copy of
+vendor_invoice_lines.
+
+Each run pulls only the lines created since the previous run (keyset on
+created_at, id) into a NumPy backed store. Invoices whose updated_at moved
+(re-ingested, which deletes and re-inserts their lines, or a changed
+invoice_date) have their lines replaced, and lines of deleted invoices are
+dropped. Then it computes for every catalog item in one vectorized pass:
+- the invoice-date average price and cost per base unit
+  (unit_price_cents / (pack_qty * pack_size); line pack fields first, then the
+  catalog item's)
+- latest vs previous invoice-date average inside each review window
+  (7, 14, 28, 56, 90 days), the comparison vendor_price_changes_v1 makes
+- rolling average and volatility of the daily averages in the window and how
+  far the latest price sits from that average
+- an alert flag when either change reaches --alert-percent
+
+--publish replaces each vendor's rows in vendor_price_stats and
+vendor_price_series through vendor_price_stats_publish_v1. The price review
+edge functions read those tables (vendor_price_changes_cached_v1).
+
+Lines whose catalog item is mapped after they were synced are only picked up
+by a --full rebuild.
+
+Needs numpy (pip install numpy) and SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY
+(env or repo root .env.local).
+
+Usage:
+  python vendor_price_history.py                      # sync and print alerts
+  python vendor_price_history.py --publish            # sync, compute and publish the caches
+  python vendor_price_history.py --full --publish     # rebuild the local store first
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("vendor_price_history.py needs numpy (pip install numpy)", file=sys.stderr)
+    raise SystemExit(1)
+
+import toast_api  # noqa: F401  (puts the kit modules, including _common, on sys.path)
+from _common import SupabaseConfig, load_supabase_config, supabase_rest
+
+WINDOWS = (7, 14, 28, 56, 90)
+SERIES_DAYS = max(WINDOWS)
+ALERT_PERCENT = 0.05
+PAGE_SIZE = 1000
+STORE_NAME = "invoice_lines.npz"
+INVOICE_CHUNK = 100
+LINE_FIELDS = "id,vendor_invoice_id,vendor_catalog_item_id,invoice_date,unit_price_cents,pack_qty,pack_size,created_at"
+CATALOG_FIELDS = "id,vendor_id,vendor_sku,description,pack_qty,pack_size"
+
+
+def die(msg: str, code: int = 1) -> None:
+    print(msg, file=sys.stderr)
+    raise SystemExit(code)
+
+
+def _num(value: Any) -> float:
+    if value is None or isinstance(value, bool):
+        return float("nan")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+@dataclass
+class LineStore:
+    """
+    Synced invoice lines as parallel arrays, the (created_at, id) watermark and
+    the updated_at of every invoice as of its last sync.
+    """
+
+    ids: np.ndarray
+    invoice: np.ndarray
+    item: np.ndarray
+    day: np.ndarray
+    price: np.ndarray
+    pack_qty: np.ndarray
+    pack_size: np.ndarray
+    watermark: str = ""
+    watermark_id: str = ""
+    invoices: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def empty(cls) -> "LineStore":
+        return cls(
+            ids=np.empty(0, dtype="U36"),
+            invoice=np.empty(0, dtype="U36"),
+            item=np.empty(0, dtype="U36"),
+            day=np.empty(0, dtype="datetime64[D]"),
+            price=np.empty(0, dtype=np.float64),
+            pack_qty=np.empty(0, dtype=np.float64),
+            pack_size=np.empty(0, dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> "LineStore":
+        if not path.exists():
+            return cls.empty()
+        with np.load(path) as data:
+            if "invoice" not in data:
+                # Written before invoice tracking; rebuild rather than guess.
+                return cls.empty()
+            return cls(
+                ids=data["ids"],
+                invoice=data["invoice"],
+                item=data["item"],
+                day=data["day"],
+                price=data["price"],
+                pack_qty=data["pack_qty"],
+                pack_size=data["pack_size"],
+                watermark=str(data["watermark"]),
+                watermark_id=str(data["watermark_id"]),
+                invoices=dict(zip(data["invoice_ids"].tolist(), data["invoice_updated"].tolist())),
+            )
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as handle:
+            np.savez(
+                handle,
+                ids=self.ids,
+                invoice=self.invoice,
+                item=self.item,
+                day=self.day,
+                price=self.price,
+                pack_qty=self.pack_qty,
+                pack_size=self.pack_size,
+                watermark=np.array(self.watermark),
+                watermark_id=np.array(self.watermark_id),
+                invoice_ids=np.array(list(self.invoices), dtype="U36"),
+                invoice_updated=np.array(list(self.invoices.values()), dtype="U40"),
+            )
+        os.replace(tmp, path)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _keep(self, mask: np.ndarray) -> None:
+        for name in ("ids", "invoice", "item", "day", "price", "pack_qty", "pack_size"):
+            setattr(self, name, getattr(self, name)[mask])
+
+    def drop_invoices(self, invoice_ids: Sequence[str]) -> int:
+        drop = np.isin(self.invoice, np.array(list(invoice_ids), dtype="U36"))
+        self._keep(~drop)
+        return int(drop.sum())
+
+    def upsert(self, rows: Sequence[Dict[str, Any]]) -> None:
+        """Add rows, replacing stored lines with the same id."""
+        if not rows:
+            return
+        new_ids = np.array([r["id"] for r in rows], dtype="U36")
+        self._keep(~np.isin(self.ids, new_ids))
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.invoice = np.concatenate([self.invoice, np.array([r["vendor_invoice_id"] for r in rows], dtype="U36")])
+        self.item = np.concatenate([self.item, np.array([r["vendor_catalog_item_id"] for r in rows], dtype="U36")])
+        self.day = np.concatenate([self.day, np.array([r["invoice_date"] for r in rows], dtype="datetime64[D]")])
+        self.price = np.concatenate([self.price, np.array([_num(r["unit_price_cents"]) for r in rows])])
+        self.pack_qty = np.concatenate([self.pack_qty, np.array([_num(r.get("pack_qty")) for r in rows])])
+        self.pack_size = np.concatenate([self.pack_size, np.array([_num(r.get("pack_size")) for r in rows])])
+
+
+def _pull_invoice_lines(sb: SupabaseConfig, invoice_ids: Sequence[str]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for i in range(0, len(invoice_ids), INVOICE_CHUNK):
+        chunk = ",".join(invoice_ids[i : i + INVOICE_CHUNK])
+        last_id: Optional[str] = None
+        while True:
+            query = {
+                "select": LINE_FIELDS,
+                "vendor_invoice_id": f"in.({chunk})",
+                "vendor_catalog_item_id": "not.is.null",
+                "unit_price_cents": "not.is.null",
+                "order": "id.asc",
+                "limit": str(PAGE_SIZE),
+            }
+            if last_id:
+                query["id"] = f"gt.{last_id}"
+            page, err = supabase_rest(sb, "GET", "vendor_invoice_lines", query)
+            if err:
+                raise RuntimeError(f"Invoice line pull failed: {err}")
+            page = page or []
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                break
+            last_id = page[-1]["id"]
+    return rows
+
+
+def sync_invoices(sb: SupabaseConfig, store: LineStore) -> Tuple[int, int]:
+    """
+    Replace the lines of invoices updated since their last sync and drop the
+    lines of deleted invoices. Returns (invoices changed, invoices deleted).
+    """
+    current: Dict[str, str] = {}
+    last_id: Optional[str] = None
+    while True:
+        query = {"select": "id,updated_at", "order": "id.asc", "limit": str(PAGE_SIZE)}
+        if last_id:
+            query["id"] = f"gt.{last_id}"
+        rows, err = supabase_rest(sb, "GET", "vendor_invoices", query)
+        if err:
+            raise RuntimeError(f"Invoice read failed: {err}")
+        rows = rows or []
+        for row in rows:
+            current[row["id"]] = row["updated_at"]
+        if len(rows) < PAGE_SIZE:
+            break
+        last_id = rows[-1]["id"]
+
+    deleted = [i for i in store.invoices if i not in current]
+    # Invoices with no stored lines are left to the created_at pull, so a fresh
+    # store does not fetch every line twice.
+    known = set(store.invoices) | set(np.unique(store.invoice).tolist())
+    changed = [i for i, u in current.items() if i in known and store.invoices.get(i) != u]
+    store.drop_invoices(deleted + changed)
+    store.upsert(_pull_invoice_lines(sb, changed))
+    store.invoices = current
+    return len(changed), len(deleted)
+
+
+def pull_new_lines(sb: SupabaseConfig, store: LineStore) -> int:
+    """Add lines created after the store watermark, one keyset page at a time."""
+    pulled = 0
+    while True:
+        query = {
+            "select": LINE_FIELDS,
+            "vendor_catalog_item_id": "not.is.null",
+            "unit_price_cents": "not.is.null",
+            "order": "created_at.asc,id.asc",
+            "limit": str(PAGE_SIZE),
+        }
+        if store.watermark:
+            wm, wid = store.watermark, store.watermark_id
+            query["or"] = f'(created_at.gt."{wm}",and(created_at.eq."{wm}",id.gt.{wid}))'
+        rows, err = supabase_rest(sb, "GET", "vendor_invoice_lines", query)
+        if err:
+            raise RuntimeError(f"Invoice line pull failed: {err}")
+        rows = rows or []
+        store.upsert(rows)
+        if rows:
+            store.watermark, store.watermark_id = rows[-1]["created_at"], rows[-1]["id"]
+        pulled += len(rows)
+        if len(rows) < PAGE_SIZE:
+            return pulled
+
+
+def load_catalog(sb: SupabaseConfig) -> Dict[str, Dict[str, Any]]:
+    catalog: Dict[str, Dict[str, Any]] = {}
+    last_id: Optional[str] = None
+    while True:
+        query = {"select": CATALOG_FIELDS, "order": "id.asc", "limit": str(PAGE_SIZE)}
+        if last_id:
+            query["id"] = f"gt.{last_id}"
+        rows, err = supabase_rest(sb, "GET", "vendor_catalog_items", query)
+        if err:
+            raise RuntimeError(f"Catalog read failed: {err}")
+        rows = rows or []
+        for row in rows:
+            catalog[row["id"]] = row
+        if len(rows) < PAGE_SIZE:
+            return catalog
+        last_id = rows[-1]["id"]
+
+
+def _round_cents(values: np.ndarray) -> np.ndarray:
+    """Round half away from zero, like the numeric to bigint cast in Postgres."""
+    return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+
+def _opt(value: float, digits: int) -> Optional[float]:
+    return None if not np.isfinite(value) else round(float(value), digits)
+
+
+def daily_averages(store: LineStore, catalog: Dict[str, Dict[str, Any]]):
+    """
+    Group lines by (item, invoice date). Returns item ids, and per group the
+    item index, day number, average price and average cost per base unit,
+    sorted by item then day.
+    """
+    items, item_code = np.unique(store.item, return_inverse=True)
+    cat_qty = np.array([_num(catalog.get(i, {}).get("pack_qty")) for i in items])
+    cat_size = np.array([_num(catalog.get(i, {}).get("pack_size")) for i in items])
+    qty = np.where(np.isnan(store.pack_qty), cat_qty[item_code], store.pack_qty)
+    size = np.where(np.isnan(store.pack_size), cat_size[item_code], store.pack_size)
+    units = qty * size
+    has_units = np.isfinite(units) & (units > 0)
+    unit_cost = np.divide(store.price, units, out=np.zeros_like(store.price), where=has_units)
+
+    day = store.day.astype(np.int64)
+    base = day.min() if day.size else 0
+    key = (item_code.astype(np.int64) << 32) | (day - base)
+    groups, g_inv = np.unique(key, return_inverse=True)
+    counts = np.bincount(g_inv)
+    avg = np.bincount(g_inv, weights=store.price) / counts
+    cost_n = np.bincount(g_inv, weights=has_units.astype(np.float64))
+    cost_sum = np.bincount(g_inv, weights=unit_cost)
+    cost = np.divide(cost_sum, cost_n, out=np.full_like(cost_sum, np.nan), where=cost_n > 0)
+    return items, groups >> 32, (groups & 0xFFFFFFFF) + base, avg, cost
+
+
+def compute(
+    store: LineStore,
+    catalog: Dict[str, Dict[str, Any]],
+    today: date,
+    windows: Sequence[int] = WINDOWS,
+    alert_percent: float = ALERT_PERCENT,
+) -> Tuple[List[Dict[str, Any]], Dict[str, List[Dict[str, Any]]]]:
+    """Stats rows for every item and window, and the daily series per item."""
+    if not len(store):
+        return [], {}
+    items, g_item, g_day, avg, cost = daily_averages(store, catalog)
+    avg_cents = _round_cents(avg)
+    today_n = np.datetime64(today, "D").astype(np.int64)
+
+    stats: List[Dict[str, Any]] = []
+    for window in windows:
+        idx = np.flatnonzero(g_day >= today_n - window)
+        if not idx.size:
+            continue
+        it = g_item[idx]
+        first = np.r_[True, it[1:] != it[:-1]]
+        last = np.r_[it[1:] != it[:-1], True]
+        run = np.cumsum(first) - 1
+        n = np.bincount(run).astype(np.float64)
+        mean = np.bincount(run, weights=avg[idx]) / n
+        var = np.maximum(np.bincount(run, weights=avg[idx] ** 2) / n - mean**2, 0.0)
+        volatility = np.divide(np.sqrt(var), mean, out=np.full_like(mean, np.nan), where=(n > 1) & (mean != 0))
+
+        latest = idx[last]
+        has_prev = ~first[last]
+        previous = np.where(has_prev, latest - 1, latest)
+        latest_c = avg_cents[latest]
+        prev_c = np.where(has_prev, avg_cents[previous], np.nan)
+        delta = latest_c - prev_c
+        delta_pct = np.divide(delta, prev_c, out=np.full_like(delta, np.nan), where=has_prev & (prev_c != 0))
+        vs_rolling = np.divide(latest_c - mean, mean, out=np.full_like(mean, np.nan), where=mean != 0)
+        alert = (np.nan_to_num(np.abs(delta_pct)) >= alert_percent) | (np.nan_to_num(np.abs(vs_rolling)) >= alert_percent)
+
+        for pos in range(len(latest)):
+            item_id = str(items[g_item[latest[pos]]])
+            meta = catalog.get(item_id)
+            if meta is None:
+                continue
+            prev_ok = bool(has_prev[pos])
+            stats.append(
+                {
+                    "vendor_catalog_item_id": item_id,
+                    "vendor_id": meta["vendor_id"],
+                    "window_days": window,
+                    "vendor_sku": meta.get("vendor_sku"),
+                    "description": meta.get("description"),
+                    "latest_invoice_date": str(np.datetime64(int(g_day[latest[pos]]), "D")),
+                    "latest_price_cents": int(latest_c[pos]),
+                    "previous_invoice_date": str(np.datetime64(int(g_day[previous[pos]]), "D")) if prev_ok else None,
+                    "previous_price_cents": int(prev_c[pos]) if prev_ok else None,
+                    "delta_cents": int(delta[pos]) if prev_ok else None,
+                    "delta_percent": _opt(delta_pct[pos], 6),
+                    "latest_unit_cost_cents": _opt(cost[latest[pos]], 4),
+                    "rolling_avg_price_cents": round(float(mean[pos]), 2),
+                    "rolling_volatility": _opt(volatility[pos], 6),
+                    "vs_rolling_percent": _opt(vs_rolling[pos], 6),
+                    "alert": bool(alert[pos]),
+                }
+            )
+
+    series: Dict[str, List[Dict[str, Any]]] = {}
+    for pos in np.flatnonzero(g_day >= today_n - SERIES_DAYS):
+        series.setdefault(str(items[g_item[pos]]), []).append(
+            {
+                "invoiceDate": str(np.datetime64(int(g_day[pos]), "D")),
+                "averagePriceCents": int(avg_cents[pos]),
+                "unitCostCents": _opt(cost[pos], 4),
+            }
+        )
+    return stats, series
+
+
+def publish(
+    sb: SupabaseConfig,
+    catalog: Dict[str, Dict[str, Any]],
+    stats: List[Dict[str, Any]],
+    series: Dict[str, List[Dict[str, Any]]],
+) -> int:
+    """Replace cached rows vendor by vendor. Vendors with no recent lines are cleared."""
+    by_vendor: Dict[str, Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]] = {
+        meta["vendor_id"]: ([], []) for meta in catalog.values()
+    }
+    for row in stats:
+        body = {k: v for k, v in row.items() if k != "vendor_id"}
+        by_vendor[row["vendor_id"]][0].append(body)
+    for item_id, points in series.items():
+        meta = catalog.get(item_id)
+        if meta is not None:
+            by_vendor[meta["vendor_id"]][1].append({"vendor_catalog_item_id": item_id, "points": points})
+
+    written = 0
+    for vendor_id, (vendor_stats, vendor_series) in sorted(by_vendor.items()):
+        data, err = supabase_rest(
+            sb,
+            "POST",
+            "rpc/vendor_price_stats_publish_v1",
+            body={"p_vendor_id": vendor_id, "p_stats": vendor_stats, "p_series": vendor_series},
+        )
+        if err:
+            raise RuntimeError(f"Publish failed for vendor {vendor_id}: {err}")
+        written += int(data or 0)
+    return written
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Incremental vendor price analytics")
+    parser.add_argument("--store", default="out/vendor_price_history", help="Local store directory")
+    parser.add_argument("--full", action="store_true", help="Discard the local store and pull every line again")
+    parser.add_argument("--publish", action="store_true", help="Write vendor_price_stats and vendor_price_series")
+    parser.add_argument("--alert-percent", type=float, default=ALERT_PERCENT, help="Change that raises an alert")
+    parser.add_argument("--today", default=None, help="Reference date YYYY-MM-DD (default: today UTC)")
+    parser.add_argument("--out", default=None, help="Also write stats and series as JSON")
+    args = parser.parse_args()
+
+    try:
+        sb = load_supabase_config()
+    except ValueError as exc:
+        die(str(exc))
+
+    store_path = Path(args.store) / STORE_NAME
+    store = LineStore.empty() if args.full else LineStore.load(store_path)
+    today = date.fromisoformat(args.today) if args.today else datetime.now(timezone.utc).date()
+
+    try:
+        # Invoices first: lines re-inserted after this read are newer than the
+        # watermark and arrive through the created_at pull.
+        changed, deleted = sync_invoices(sb, store)
+        pulled = pull_new_lines(sb, store)
+        store.save(store_path)
+        catalog = load_catalog(sb)
+        stats, series = compute(store, catalog, today, alert_percent=args.alert_percent)
+        published = publish(sb, catalog, stats, series) if args.publish else 0
+    except RuntimeError as exc:
+        die(str(exc))
+
+    alerts = [row for row in stats if row["alert"] and row["window_days"] == 28]
+    print(
+        json.dumps(
+            {
+                "lines_pulled": pulled,
+                "invoices_changed": changed,
+                "invoices_deleted": deleted,
+                "lines_stored": len(store),
+                "stats_rows": len(stats),
+                "series_items": len(series),
+                "alerts_28d": len(alerts),
+                "published_rows": published,
+            },
+            sort_keys=True,
+        )
+    )
+    for row in sorted(alerts, key=lambda r: -abs(r["delta_percent"] or r["vs_rolling_percent"] or 0))[:20]:
+        print(
+            f"ALERT {row['vendor_sku'] or row['vendor_catalog_item_id']} "
+            f"latest={row['latest_price_cents']} previous={row['previous_price_cents']} "
+            f"delta_percent={row['delta_percent']} vs_rolling={row['vs_rolling_percent']}"
+        )
+    if args.out:
+        Path(args.out).write_text(json.dumps({"stats": stats, "series": series}, indent=2, sort_keys=True) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Append-only ledger of processed update packages (applied/ledger.jsonl).
+
+One JSON object per line. Loading builds in-memory indexes on manifest_sha256
+and package_id, so "was this applied, and when?" is a dict lookup instead of a
+glob over every per-package log.
+
+Usage:
+  python applied_ledger.py --sha <manifest_sha256>
+  python applied_ledger.py --package-id <package_id>
+  python applied_ledger.py --list
+  python applied_ledger.py --rebuild     # backfill from applied/*.json logs
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+APPLIED_DIR = Path(__file__).resolve().parents[1] / "applied"
+LEDGER_NAME = "ledger.jsonl"
+
+
+class AppliedLedger:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: List[Dict[str, Any]] = []
+        self._by_sha: Dict[str, Dict[str, Any]] = {}
+        self._by_package: Dict[str, List[Dict[str, Any]]] = {}
+        self._offset = 0
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> "AppliedLedger":
+        ledger = cls(path or APPLIED_DIR / LEDGER_NAME)
+        ledger.refresh()
+        return ledger
+
+    def refresh(self) -> int:
+        """Read lines appended since the last load (by this or another process)."""
+        if not self.path.exists():
+            return 0
+        added = 0
+        with self.path.open("r", encoding="utf-8") as handle:
+            handle.seek(self._offset)
+            for line in handle:
+                if not line.endswith("\n"):
+                    break
+                self._offset += len(line.encode("utf-8"))
+                if line.strip():
+                    self._index(json.loads(line))
+                    added += 1
+        return added
+
+    def _index(self, entry: Dict[str, Any]) -> None:
+        self.entries.append(entry)
+        sha = entry.get("manifest_sha256")
+        if sha and entry.get("status") == "applied":
+            self._by_sha.setdefault(sha, entry)
+        package_id = entry.get("package_id")
+        if package_id:
+            self._by_package.setdefault(package_id, []).append(entry)
+
+    def applied(self, manifest_sha: str) -> Optional[Dict[str, Any]]:
+        """First successful application of this manifest, if any."""
+        return self._by_sha.get(manifest_sha)
+
+    def for_package(self, package_id: str) -> List[Dict[str, Any]]:
+        return list(self._by_package.get(package_id, []))
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(entry, sort_keys=True) + "\n"
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(line)
+        self._offset += len(line.encode("utf-8"))
+        self._index(entry)
+
+
+def rebuild_from_logs(applied_dir: Path) -> int:
+    """Backfill the ledger from per-package logs that it does not cover yet."""
+    ledger = AppliedLedger.load(applied_dir / LEDGER_NAME)
+    known = {(e.get("zip_filename"), e.get("applied_at_utc")) for e in ledger.entries}
+    added = 0
+    for log_path in sorted(applied_dir.glob("*.json")):
+        data = json.loads(log_path.read_text())
+        if not isinstance(data, dict):
+            continue
+        key = (data.get("zip_filename"), data.get("applied_at_utc"))
+        if key in known:
+            continue
+        data.setdefault("status", "applied")
+        data.setdefault("package_id", None)
+        data["log_file"] = log_path.name
+        ledger.append(data)
+        known.add(key)
+        added += 1
+    return added
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Query the updates inbox applied ledger")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--sha", help="manifest_sha256 to look up")
+    group.add_argument("--package-id", dest="package_id", help="package_id to look up")
+    group.add_argument("--list", action="store_true", help="Print every ledger entry")
+    group.add_argument("--rebuild", action="store_true", help="Backfill from applied/*.json logs")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        print(f"Added {rebuild_from_logs(APPLIED_DIR)} entries to {APPLIED_DIR / LEDGER_NAME}")
+        return 0
+
+    ledger = AppliedLedger.load()
+    if args.list:
+        rows = ledger.entries
+    elif args.sha:
+        hit = ledger.applied(args.sha)
+        rows = [hit] if hit else []
+    else:
+        rows = ledger.for_package(args.package_id)
+
+    for row in rows:
+        print(json.dumps(row, sort_keys=True))
+    return 0 if rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -41,6 +41,25 @@ if [ -d "$payload_dir" ]; then
   cp -R "$payload_dir" "$temp_dir/payload"
 fi
 
+# Record sha256 for each copy op so updates_apply.py can verify payloads before writing.
+python3 - "$temp_dir" <<'PY'
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+root = Path(sys.argv[1])
+manifest_path = root / "manifest.json"
+data = json.loads(manifest_path.read_text(encoding="utf-8"))
+for op in data.get("ops", []):
+    if not isinstance(op, dict) or op.get("op") != "copy" or not isinstance(op.get("src"), str):
+        continue
+    src = root / op["src"]
+    if src.is_file():
+        op["sha256"] = hashlib.sha256(src.read_bytes()).hexdigest()
+manifest_path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+PY
+
 zip_path="${repo_root}/${inbox_dir}/${zip_name}.zip"
 (
   cd "$temp_dir"
@@ -1,14 +1,21 @@
 #!/usr/bin/env python3
 import hashlib
+import importlib.util
 import json
 import os
 import shutil
-import subprocess
 import sys
 import tempfile
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path, PurePosixPath
-from zipfile import ZipFile
+from typing import Dict, List, Optional, Sequence, Tuple
+from zipfile import BadZipFile, ZipFile
+
+from applied_ledger import LEDGER_NAME, AppliedLedger
 
 ALLOWED_PREFIX = "docs/"
 FORBIDDEN_DIRS = {"canonical", "locked", "deprecated"}
@@ -17,6 +24,12 @@ FORBIDDEN_FILES = {
     "docs/DOCUMENT_LIFECYCLE_V1.MD",
 }
 SCRIPT_PATH = Path(__file__).resolve()
+WORKFLOW_ROOT = SCRIPT_PATH.parents[1]
+APPLIED_DIR = WORKFLOW_ROOT / "applied"
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+CHUNK = 1 << 20
+_LEDGER = None
+_LIFECYCLE = None
 
 
 def _repo_root() -> Path:
@@ -34,8 +47,15 @@ def _utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-def _write_log(zip_name, status, manifest_sha, files_written, notes):
-    applied_dir = _repo_root() / "workflows" / "updates-inbox" / "applied"
+def _ledger() -> AppliedLedger:
+    global _LEDGER
+    if _LEDGER is None:
+        _LEDGER = AppliedLedger.load(APPLIED_DIR / LEDGER_NAME)
+    return _LEDGER
+
+
+def _write_log(zip_name, status, manifest_sha, files_written, notes, package_id=None):
+    applied_dir = APPLIED_DIR
     applied_dir.mkdir(parents=True, exist_ok=True)
     log_name = f"{_utc_timestamp()}_{Path(zip_name).stem}.json"
     log_path = applied_dir / log_name
@@ -43,6 +63,7 @@ def _write_log(zip_name, status, manifest_sha, files_written, notes):
         "actor": os.environ.get("GITHUB_ACTOR", "dm-bot"),
         "applied_at_utc": _utc_iso(),
         "manifest_sha256": manifest_sha,
+        "package_id": package_id,
         "run_id": os.environ.get("GITHUB_RUN_ID", ""),
         "zip_filename": zip_name,
         "status": status,
@@ -50,6 +71,13 @@ def _write_log(zip_name, status, manifest_sha, files_written, notes):
         "notes": notes,
     }
     log_path.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+    _ledger().append({**data, "log_file": log_name})
+
+
+def _move_to_applied(zip_path: Path) -> None:
+    applied_zips = APPLIED_DIR / "zips"
+    applied_zips.mkdir(parents=True, exist_ok=True)
+    os.replace(zip_path, applied_zips / zip_path.name)
 
 
 def _validate_dest(dest: str) -> str:
@@ -83,64 +111,224 @@ def _validate_src(src: str) -> PurePosixPath:
     return posix
 
 
-def _run_validator() -> int:
-    validator = _repo_root() / "scripts" / "validate_docs_lifecycle_v1.py"
-    result = subprocess.run([sys.executable, str(validator)])
-    return result.returncode
+def _lifecycle_validator():
+    """Load validate_docs_lifecycle_v1 once so its compiled rules stay warm."""
+    global _LIFECYCLE
+    if _LIFECYCLE is None:
+        path = _repo_root() / "ops_tooling" / "scripts" / "validate_docs_lifecycle_v1.py"
+        spec = importlib.util.spec_from_file_location("validate_docs_lifecycle_v1", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _LIFECYCLE = module
+    return _LIFECYCLE
+
+
+def _run_validator() -> int:
+    violations = _lifecycle_validator().lifecycle_violations(_repo_root())
+    for msg in violations:
+        print(msg)
+    return 1 if violations else 0
+
+
+@dataclass
+class Preflight:
+    zip_path: Path
+    manifest: Optional[dict] = None
+    manifest_sha: str = ""
+    package_id: Optional[str] = None
+    members: List[str] = field(default_factory=list)
+    expected_sha: Dict[str, str] = field(default_factory=dict)
+    copies: List[Tuple[PurePosixPath, str]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+
+def _read_manifest(zip_path: Path) -> Preflight:
+    """Check manifest.json and every op without extracting anything."""
+    plan = Preflight(zip_path)
+    try:
+        with ZipFile(zip_path) as zf:
+            names = zf.namelist()
+            if "manifest.json" not in names:
+                raise ValueError("Missing manifest.json at zip root")
+            manifest_bytes = zf.read("manifest.json")
+        plan.manifest_sha = hashlib.sha256(manifest_bytes).hexdigest()
+        manifest = json.loads(manifest_bytes.decode("utf-8"))
+    except BadZipFile as exc:
+        plan.errors.append(f"Invalid zip: {exc}")
+        return plan
+    except ValueError as exc:
+        plan.errors.append(str(exc))
+        return plan
+
+    if not isinstance(manifest, dict):
+        plan.errors.append("manifest.json must be an object")
+        return plan
+    if not isinstance(manifest.get("package_id"), str):
+        plan.errors.append("manifest.json package_id must be a string")
+        return plan
+    plan.manifest = manifest
+    plan.package_id = manifest["package_id"]
+    plan.members = [name for name in names if not name.endswith("/")]
+
+    try:
+        if not any(name.startswith("payload/") for name in names):
+            raise ValueError("Missing payload/ directory at zip root")
+        ops = manifest.get("ops")
+        if not isinstance(ops, list):
+            raise ValueError("manifest.json ops must be a list")
+        for idx, op in enumerate(ops):
+            if not isinstance(op, dict):
+                raise ValueError(f"op[{idx}] must be an object")
+            if op.get("op") != "copy":
+                raise ValueError(f"op[{idx}].op must be 'copy'")
+            src = op.get("src")
+            dest = op.get("dest")
+            if not isinstance(src, str) or not isinstance(dest, str):
+                raise ValueError(f"op[{idx}] src/dest must be strings")
+            src_posix = _validate_src(src)
+            dest_posix = _validate_dest(dest)
+            if src not in names:
+                raise ValueError(f"Source file missing: {src}")
+            sha = op.get("sha256")
+            if sha is not None:
+                if not isinstance(sha, str) or len(sha) != 64:
+                    raise ValueError(f"op[{idx}].sha256 must be a 64 character hex string")
+                plan.expected_sha[src] = sha.lower()
+            plan.copies.append((src_posix, dest_posix))
+    except ValueError as exc:
+        plan.errors.append(str(exc))
+    return plan
+
+
+class _ZipHandles:
+    """
+    One open ZipFile per worker thread, reused for every member that thread
+    hashes from the same zip. Members are queued zip by zip, so a thread only
+    reopens when it moves on to the next zip, and at most one handle per
+    thread is open at a time.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open: List[ZipFile] = []
+
+    def get(self, zip_path: Path) -> ZipFile:
+        current = getattr(self._local, "current", None)
+        if current is not None and current[0] == zip_path:
+            return current[1]
+        zf = ZipFile(zip_path)
+        with self._lock:
+            if current is not None:
+                current[1].close()
+                self._open.remove(current[1])
+            self._open.append(zf)
+        self._local.current = (zip_path, zf)
+        return zf
+
+    def close(self) -> None:
+        with self._lock:
+            for zf in self._open:
+                zf.close()
+            self._open.clear()
+
+
+def _hash_member(handles: _ZipHandles, zip_path: Path, name: str) -> Tuple[str, str]:
+    """
+    Stream one member and return (sha256, error). zipfile checks the CRC when
+    the stream reaches EOF, so a corrupt member surfaces here as BadZipFile
+    (or zlib.error when the deflate stream itself is damaged).
+    """
+    sha = hashlib.sha256()
+    try:
+        with handles.get(zip_path).open(name) as src:
+            for block in iter(lambda: src.read(CHUNK), b""):
+                sha.update(block)
+    except (BadZipFile, OSError, EOFError, zlib.error) as exc:
+        return "", str(exc)
+    return sha.hexdigest(), ""
+
+
+def preflight(zip_paths: Sequence[Path], workers: int = HASH_WORKERS) -> Dict[Path, Preflight]:
+    """
+    Verify every member CRC and declared sha256 for a batch of zips before any
+    of them is applied. Members of all zips share one thread pool.
+    Packages already in the ledger are not hashed.
+    """
+    plans = [_read_manifest(path) for path in zip_paths]
+    to_hash = [
+        plan
+        for plan in plans
+        if not plan.errors and _ledger().applied(plan.manifest_sha) is None
+    ]
+    handles = _ZipHandles()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            jobs = [
+                (plan, name, pool.submit(_hash_member, handles, plan.zip_path, name))
+                for plan in to_hash
+                for name in plan.members
+            ]
+            for plan, name, future in jobs:
+                digest, err = future.result()
+                if err:
+                    plan.errors.append(f"Corrupt member {name}: {err}")
+                    continue
+                expected = plan.expected_sha.get(name)
+                if expected is not None and digest != expected:
+                    plan.errors.append(f"SHA-256 mismatch for {name}: expected {expected}, got {digest}")
+    finally:
+        handles.close()
+    return {plan.zip_path: plan for plan in plans}
 
 
-def _apply_zip(zip_path: Path) -> bool:
+def _apply_zip(zip_path: Path, plan: Optional[Preflight] = None) -> bool:
     zip_name = zip_path.name
     files_written = []
     manifest_sha = ""
+    package_id = None
 
     try:
+        if plan is None:
+            plan = preflight([zip_path])[zip_path]
+        manifest_sha = plan.manifest_sha
+        package_id = plan.package_id
+        if plan.manifest is None:
+            raise ValueError("; ".join(plan.errors))
+
+        previous = _ledger().applied(manifest_sha)
+        if previous is not None:
+            _move_to_applied(zip_path)
+            _write_log(
+                zip_name,
+                "skipped_duplicate",
+                manifest_sha,
+                [],
+                f"manifest already applied at {previous.get('applied_at_utc')}",
+                package_id,
+            )
+            print(f"Skipped {zip_name}: manifest already applied at {previous.get('applied_at_utc')}")
+            return True
+
+        if plan.errors:
+            raise ValueError("Preflight failed: " + "; ".join(plan.errors))
+
         with tempfile.TemporaryDirectory() as tmpdir:
             tmp_root = Path(tmpdir)
             with ZipFile(zip_path) as zf:
                 zf.extractall(tmp_root)
 
-            manifest_path = tmp_root / "manifest.json"
             payload_dir = tmp_root / "payload"
-            if not manifest_path.is_file():
-                raise ValueError("Missing manifest.json at zip root")
-            if not payload_dir.is_dir():
-                raise ValueError("Missing payload/ directory at zip root")
-
-            manifest_bytes = manifest_path.read_bytes()
-            manifest_sha = hashlib.sha256(manifest_bytes).hexdigest()
-            manifest = json.loads(manifest_bytes.decode("utf-8"))
-
-            if not isinstance(manifest, dict):
-                raise ValueError("manifest.json must be an object")
-            if not isinstance(manifest.get("package_id"), str):
-                raise ValueError("manifest.json package_id must be a string")
-            ops = manifest.get("ops")
-            if not isinstance(ops, list):
-                raise ValueError("manifest.json ops must be a list")
-
-            for idx, op in enumerate(ops):
-                if not isinstance(op, dict):
-                    raise ValueError(f"op[{idx}] must be an object")
-                if op.get("op") != "copy":
-                    raise ValueError(f"op[{idx}].op must be 'copy'")
-                src = op.get("src")
-                dest = op.get("dest")
-                if not isinstance(src, str) or not isinstance(dest, str):
-                    raise ValueError(f"op[{idx}] src/dest must be strings")
-
-                src_posix = _validate_src(src)
-                dest_posix = _validate_dest(dest)
-
+            resolved_payload = payload_dir.resolve()
+            for src_posix, dest_posix in plan.copies:
                 src_path = tmp_root.joinpath(*src_posix.parts)
                 if not src_path.is_file():
-                    raise ValueError(f"Source file missing: {src}")
+                    raise ValueError(f"Source file missing: {src_posix}")
                 resolved_src = src_path.resolve()
-                resolved_payload = payload_dir.resolve()
                 if os.path.commonpath([resolved_src, resolved_payload]) != str(
                     resolved_payload
                 ):
-                    raise ValueError(f"Source file escapes payload/: {src}")
+                    raise ValueError(f"Source file escapes payload/: {src_posix}")
 
                 dest_path = _repo_root() / PurePosixPath(dest_posix)
                 dest_path.parent.mkdir(parents=True, exist_ok=True)
@@ -154,22 +342,21 @@ def _apply_zip(zip_path: Path) -> bool:
                     manifest_sha,
                     files_written,
                     "docs lifecycle validation failed",
+                    package_id,
                 )
                 return False
 
-        applied_zips = _repo_root() / "workflows" / "updates-inbox" / "applied" / "zips"
-        applied_zips.mkdir(parents=True, exist_ok=True)
-        os.replace(zip_path, applied_zips / zip_name)
-        _write_log(zip_name, "applied", manifest_sha, files_written, "")
+        _move_to_applied(zip_path)
+        _write_log(zip_name, "applied", manifest_sha, files_written, "", package_id)
         return True
     except Exception as exc:
-        _write_log(zip_name, "failed", manifest_sha, files_written, str(exc))
+        _write_log(zip_name, "failed", manifest_sha, files_written, str(exc), package_id)
         print(f"Failed applying {zip_name}: {exc}", file=sys.stderr)
         return False
 
 
 def main() -> int:
-    inbox = _repo_root() / "workflows" / "updates-inbox" / "inbox"
+    inbox = WORKFLOW_ROOT / "inbox"
     if not inbox.exists():
         print("No packages in ops_tooling/workflows/updates-inbox/inbox")
         return 0
@@ -179,8 +366,9 @@ def main() -> int:
         print("No packages in ops_tooling/workflows/updates-inbox/inbox")
         return 0
 
+    plans = preflight(zips)
     for zip_path in zips:
-        if not _apply_zip(zip_path):
+        if not _apply_zip(zip_path, plans[zip_path]):
             return 1
 
     return 0
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Watch the updates inbox and apply packages as soon as they land.
+
+Runs the same apply path as updates_apply.py, but in one long lived process,
+so the applied ledger, the docs lifecycle rules and the validator stay loaded
+between packages. New zips are detected with inotify on Linux and by polling
+elsewhere. Events that arrive close together are debounced into one batch.
+
+Usage:
+  python updates_watch.py                   # inotify when available, else polling
+  python updates_watch.py --poll            # force polling
+  python updates_watch.py --debounce 0.5 --interval 1.0
+"""
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import updates_apply
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Minimal inotify binding over ctypes; yields names written into one directory."""
+
+    def __init__(self, directory: Path) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify not supported")
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(fd, os.fsencode(str(directory)), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+        self.fd = fd
+
+    def wait(self, timeout: Optional[float]) -> List[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            _wd, _mask, _cookie, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            raw = buf[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if raw:
+                names.append(os.fsdecode(raw))
+        return names
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback that reports zips whose size or mtime changed since the last scan."""
+
+    def __init__(self, directory: Path, interval: float) -> None:
+        self.directory = directory
+        self.interval = interval
+        self._seen: Dict[str, Tuple[int, int]] = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for path in self.directory.glob("*.zip"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            state[path.name] = (st.st_size, st.st_mtime_ns)
+        return state
+
+    def wait(self, timeout: Optional[float]) -> List[str]:
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        current = self._scan()
+        changed = [name for name, sig in current.items() if self._seen.get(name) != sig]
+        self._seen = current
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def _open_watcher(inbox: Path, force_poll: bool, interval: float):
+    if not force_poll:
+        try:
+            return InotifyWatcher(inbox), "inotify"
+        except (OSError, AttributeError) as exc:
+            print(f"inotify unavailable ({exc}); falling back to polling", file=sys.stderr)
+    return PollingWatcher(inbox, interval), "polling"
+
+
+def apply_batch(inbox: Path, names: Iterable[str]) -> Tuple[int, int]:
+    """Apply the named zips in sorted order. Returns (applied_or_skipped, failed)."""
+    updates_apply._ledger().refresh()
+    zips = [inbox / name for name in sorted(set(names)) if (inbox / name).is_file()]
+    plans = updates_apply.preflight(zips)
+    ok = failed = 0
+    for zip_path in zips:
+        name = zip_path.name
+        start = time.perf_counter()
+        if updates_apply._apply_zip(zip_path, plans[zip_path]):
+            ok += 1
+            print(f"Processed {name} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        else:
+            failed += 1
+    return ok, failed
+
+
+def watch(inbox: Path, debounce: float, interval: float, force_poll: bool) -> int:
+    inbox.mkdir(parents=True, exist_ok=True)
+    # Load the ledger and lifecycle rules before the first package arrives.
+    updates_apply._ledger()
+    updates_apply._lifecycle_validator().load_rules(updates_apply._repo_root() / "docs" / "document_lifecycle_v1.json")
+
+    watcher, mode = _open_watcher(inbox, force_poll, interval)
+    print(f"Watching {inbox} ({mode}, debounce {debounce}s)")
+
+    pending: Set[str] = {p.name for p in inbox.glob("*.zip")}
+    try:
+        while True:
+            if pending:
+                # Keep collecting until the inbox has been quiet for the debounce window.
+                names = watcher.wait(debounce)
+                if names:
+                    pending.update(n for n in names if n.endswith(".zip"))
+                    continue
+                ok, failed = apply_batch(inbox, pending)
+                print(f"Batch done: {ok} processed, {failed} failed")
+                pending.clear()
+            else:
+                pending.update(n for n in watcher.wait(None) if n.endswith(".zip"))
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Apply update packages as they land in the inbox")
+    parser.add_argument("--inbox", default=None, help="Inbox directory (default: updates-inbox/inbox)")
+    parser.add_argument("--debounce", type=float, default=0.25, help="Quiet period in seconds before a batch is applied")
+    parser.add_argument("--interval", type=float, default=1.0, help="Polling interval in seconds when inotify is unavailable")
+    parser.add_argument("--poll", action="store_true", help="Use polling even when inotify is available")
+    args = parser.parse_args()
+
+    inbox = Path(args.inbox).resolve() if args.inbox else updates_apply.WORKFLOW_ROOT / "inbox"
+    return watch(inbox, args.debounce, args.interval, args.poll)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -221,15 +221,11 @@ serve(async (req) => {
     const fullOrder = await toastGetOrder(orderGuid, restaurantGuid);
 
     const supabase = createClient(env("SUPABASE_URL"), env("SUPABASE_SERVICE_ROLE_KEY"));
-    const { error: upsertError } = await supabase.from("curbside_orders").upsert(
-      {
-        toast_order_guid: orderGuid,
-        toast_restaurant_guid: restaurantGuid ?? null,
-        order_payload: fullOrder,
-        updated_at: new Date().toISOString(),
-      },
-      { onConflict: "toast_order_guid" },
-    );
+    const { error: upsertError } = await supabase.rpc("curbside_order_upsert_v1", {
+      p_toast_order_guid: orderGuid,
+      p_toast_restaurant_guid: restaurantGuid ?? null,
+      p_order_payload: fullOrder,
+    });
 
     if (upsertError) {
       console.log("curbside_orders upsert failed", {
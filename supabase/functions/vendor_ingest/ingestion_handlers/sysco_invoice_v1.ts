@@ -350,8 +350,18 @@ export async function ingestSyscoInvoiceV1(args: IngestArgs): Promise<{
     throw new Error(`Failed to clear existing invoice lines: ${deleteError.message}`);
   }
 
+  const { error: partitionError } = await args.supabase.rpc("dm_partition_ensure_month_v1", {
+    p_parent: "vendor_invoice_lines",
+    p_month: invoiceDate,
+  });
+
+  if (partitionError) {
+    throw new Error(`Failed to ensure invoice line partition: ${partitionError.message}`);
+  }
+
   const lineRows = enrichedLines.map((line, idx) => ({
     vendor_invoice_id: invoiceId,
+    invoice_date: invoiceDate,
     line_number: idx + 1,
     vendor_sku: line.vendor_sku,
     vendor_sku_normalized: line.vendor_sku_normalized,
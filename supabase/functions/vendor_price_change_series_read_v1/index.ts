@@ -7,6 +7,15 @@ type SeriesPayload = {
   itemIds: string[]
 }
 
+type CachedSeriesRow = {
+  vendor_catalog_item_id: string
+  points: Array<{ invoiceDate: string; averagePriceCents: number }> | null
+}
+
+// vendor_price_history.py keeps 90 days of points and refreshes at least daily.
+const CACHE_SERIES_DAYS = 90
+const CACHE_MAX_AGE_MS = 36 * 60 * 60 * 1000
+
 type InvoiceLineRow = {
   vendor_catalog_item_id: string | null
   unit_price_cents: number | string | null
@@ -90,12 +99,48 @@ serve(async (request) => {
       auth: { persistSession: false },
     })
 
+    const result: Record<string, Array<{ invoiceDate: string; averagePriceCents: number }>> = {}
+    let liveItemIds = payload.itemIds
+
+    if ((payload.days ?? 28) <= CACHE_SERIES_DAYS) {
+      const freshSince = new Date(Date.now() - CACHE_MAX_AGE_MS).toISOString()
+      const { data: cached, error: cacheError } = await supabase
+        .from("vendor_price_series")
+        .select("vendor_catalog_item_id,points")
+        .eq("vendor_id", payload.vendorId)
+        .in("vendor_catalog_item_id", payload.itemIds)
+        .gte("computed_at", freshSince)
+
+      if (!cacheError && cached) {
+        for (const row of cached as CachedSeriesRow[]) {
+          result[row.vendor_catalog_item_id] = (row.points ?? [])
+            .filter((point) => point.invoiceDate >= startDateString)
+            .map((point) => ({
+              invoiceDate: point.invoiceDate,
+              averagePriceCents: point.averagePriceCents,
+            }))
+        }
+        // Items without a fresh cache row are computed live below.
+        liveItemIds = payload.itemIds.filter((itemId) => !(itemId in result))
+      }
+    }
+
+    if (liveItemIds.length === 0) {
+      return new Response(JSON.stringify(result), {
+        status: 200,
+        headers: {
+          ...corsHeaders,
+          "content-type": "application/json",
+        },
+      })
+    }
+
     const { data, error } = await supabase
       .from("vendor_invoice_lines")
       .select("vendor_catalog_item_id,unit_price_cents,vendor_invoices!inner(invoice_date,vendor_id)")
       .eq("vendor_invoices.vendor_id", payload.vendorId)
-      .gte("vendor_invoices.invoice_date", startDateString)
-      .in("vendor_catalog_item_id", payload.itemIds)
+      .gte("invoice_date", startDateString)
+      .in("vendor_catalog_item_id", liveItemIds)
       .order("invoice_date", { foreignTable: "vendor_invoices", ascending: true })
 
     if (error) {
@@ -129,7 +174,6 @@ serve(async (request) => {
       }
     })
 
-    const result: Record<string, Array<{ invoiceDate: string; averagePriceCents: number }>> = {}
     seriesMap.forEach((dateMap, itemId) => {
       const points = Array.from(dateMap.entries())
         .sort((a, b) => a[0].localeCompare(b[0]))
@@ -90,7 +90,7 @@ serve(async (request) => {
     const days = payload?.days ?? 28
     const minPercentChange = payload?.minPercentChange ?? 0.02
 
-    const { data, error } = await supabase.rpc("vendor_price_changes_v1", {
+    const { data, error } = await supabase.rpc("vendor_price_changes_cached_v1", {
       p_vendor_id: payload.vendorId,
       p_days: days,
       p_min_percent_change: minPercentChange,
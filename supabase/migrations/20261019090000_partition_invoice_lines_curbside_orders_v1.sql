@@ -0,0 +1,406 @@
+-- Range partition vendor_invoice_lines by invoice_date and curbside_orders by
+-- first_seen_at month. Partitions are monthly and named <parent>_pYYYYMM.
+
+create or replace function public.dm_partition_ensure_month_v1(
+  p_parent text,
+  p_month date
+)
+returns text
+language plpgsql
+-- Creating a partition needs ownership of the parent, which the ingest roles
+-- calling this over RPC (service_role) do not have.
+security definer
+set search_path = public, pg_temp
+as $$
+declare
+  v_start date := date_trunc('month', p_month)::date;
+  v_end date := (date_trunc('month', p_month) + interval '1 month')::date;
+  v_name text := p_parent || '_p' || to_char(v_start, 'YYYYMM');
+begin
+  if p_parent not in ('vendor_invoice_lines', 'curbside_orders') then
+    raise exception 'dm_partition_ensure_month_v1: unsupported parent %', p_parent;
+  end if;
+
+  if to_regclass('public.' || v_name) is not null then
+    return v_name;
+  end if;
+
+  -- Bounds are written as UTC midnight so the same literal works for the
+  -- date key (vendor_invoice_lines) and the timestamptz key (curbside_orders).
+  execute format(
+    'create table if not exists public.%I partition of public.%I for values from (%L) to (%L)',
+    v_name,
+    p_parent,
+    v_start::text || ' 00:00:00+00',
+    v_end::text || ' 00:00:00+00'
+  );
+  -- Partitions are reachable through PostgREST by name, so lock them down and
+  -- leave access control to the parent policies.
+  execute format('alter table public.%I enable row level security', v_name);
+
+  return v_name;
+end;
+$$;
+
+revoke all on function public.dm_partition_ensure_month_v1(text, date) from public, anon, authenticated;
+grant execute on function public.dm_partition_ensure_month_v1(text, date) to service_role;
+
+create or replace function public.dm_partitions_ensure_v1(
+  p_months_ahead int default 3
+)
+returns setof text
+language sql
+as $$
+  select public.dm_partition_ensure_month_v1(parents.parent, months.month::date)
+  from (values ('vendor_invoice_lines'), ('curbside_orders')) as parents(parent)
+  cross join generate_series(
+    date_trunc('month', current_date),
+    date_trunc('month', current_date) + make_interval(months => p_months_ahead),
+    interval '1 month'
+  ) as months(month);
+$$;
+
+revoke all on function public.dm_partitions_ensure_v1(int) from public, anon, authenticated;
+grant execute on function public.dm_partitions_ensure_v1(int) to service_role;
+
+-- vendor_invoice_lines
+
+alter table vendor_invoice_lines rename to vendor_invoice_lines_unpartitioned;
+alter table vendor_invoice_lines_unpartitioned
+  rename constraint vendor_invoice_lines_pkey to vendor_invoice_lines_unpartitioned_pkey;
+
+create table vendor_invoice_lines (
+  id uuid not null default gen_random_uuid(),
+  vendor_invoice_id uuid not null references vendor_invoices(id) on delete cascade,
+  invoice_date date not null,
+  line_number int null,
+  vendor_sku text null,
+  vendor_sku_normalized text null,
+  vendor_catalog_item_id uuid null references vendor_catalog_items(id) on delete set null,
+  description text null,
+  quantity numeric null,
+  unit_price_cents bigint null,
+  extended_price_cents bigint null,
+  uom text null,
+  pack_qty numeric null,
+  pack_uom text null,
+  pack_size numeric null,
+  pack_size_uom text null,
+  unmatched boolean not null default false,
+  unmatched_reason text null,
+  raw jsonb null,
+  created_at timestamptz not null default now(),
+  primary key (id, invoice_date)
+) partition by range (invoice_date);
+
+select public.dm_partition_ensure_month_v1('vendor_invoice_lines', months.month::date)
+from generate_series(
+  date_trunc('month', coalesce(
+    (select min(vi.invoice_date)
+     from vendor_invoice_lines_unpartitioned vil
+     join vendor_invoices vi on vi.id = vil.vendor_invoice_id),
+    current_date
+  )),
+  date_trunc('month', current_date) + interval '3 months',
+  interval '1 month'
+) as months(month);
+
+insert into vendor_invoice_lines (
+  id,
+  vendor_invoice_id,
+  invoice_date,
+  line_number,
+  vendor_sku,
+  vendor_sku_normalized,
+  vendor_catalog_item_id,
+  description,
+  quantity,
+  unit_price_cents,
+  extended_price_cents,
+  uom,
+  pack_qty,
+  pack_uom,
+  pack_size,
+  pack_size_uom,
+  unmatched,
+  unmatched_reason,
+  raw,
+  created_at
+)
+select
+  vil.id,
+  vil.vendor_invoice_id,
+  vi.invoice_date,
+  vil.line_number,
+  vil.vendor_sku,
+  vil.vendor_sku_normalized,
+  vil.vendor_catalog_item_id,
+  vil.description,
+  vil.quantity,
+  vil.unit_price_cents,
+  vil.extended_price_cents,
+  vil.uom,
+  vil.pack_qty,
+  vil.pack_uom,
+  vil.pack_size,
+  vil.pack_size_uom,
+  vil.unmatched,
+  vil.unmatched_reason,
+  vil.raw,
+  vil.created_at
+from vendor_invoice_lines_unpartitioned vil
+join vendor_invoices vi on vi.id = vil.vendor_invoice_id;
+
+drop table vendor_invoice_lines_unpartitioned;
+
+create index if not exists vendor_invoice_lines_vendor_invoice_id_idx
+  on vendor_invoice_lines (vendor_invoice_id);
+create index if not exists vendor_invoice_lines_vendor_catalog_item_id_idx
+  on vendor_invoice_lines (vendor_catalog_item_id, invoice_date);
+create index if not exists vendor_invoice_lines_unmatched_true_idx
+  on vendor_invoice_lines (unmatched)
+  where unmatched = true;
+
+alter table vendor_invoice_lines enable row level security;
+
+create policy vendor_invoice_lines_service_role_all
+  on vendor_invoice_lines
+  for all
+  using (auth.role() = 'service_role')
+  with check (auth.role() = 'service_role');
+
+create policy vendor_invoice_lines_authenticated_select
+  on vendor_invoice_lines
+  for select
+  using (auth.role() = 'authenticated');
+
+create policy vendor_invoice_lines_anon_select
+  on vendor_invoice_lines
+  for select
+  to anon
+  using (true);
+
+-- Keep the denormalized invoice_date in step with its invoice. The update
+-- moves rows between partitions when the date crosses a month.
+create or replace function public.vendor_invoices_sync_line_invoice_date()
+returns trigger
+language plpgsql
+as $$
+begin
+  perform public.dm_partition_ensure_month_v1('vendor_invoice_lines', new.invoice_date);
+  update vendor_invoice_lines
+  set invoice_date = new.invoice_date
+  where vendor_invoice_id = new.id
+    and invoice_date = old.invoice_date;
+  return new;
+end;
+$$;
+
+create trigger vendor_invoices_sync_line_invoice_date
+after update of invoice_date on vendor_invoices
+for each row
+when (old.invoice_date is distinct from new.invoice_date)
+execute function public.vendor_invoices_sync_line_invoice_date();
+
+-- Date bounded reads filter on the partition key so only recent partitions
+-- are scanned.
+create or replace function vendor_price_changes_v1(
+  p_vendor_id uuid,
+  p_days int default 28,
+  p_min_percent_change numeric default 0.02
+)
+returns table(
+  vendor_catalog_item_id uuid,
+  vendor_sku text,
+  description text,
+  latest_invoice_date date,
+  latest_price_cents bigint,
+  previous_invoice_date date,
+  previous_price_cents bigint,
+  delta_cents bigint,
+  delta_percent numeric
+)
+language sql
+stable
+as $$
+with invoice_averages as (
+  select
+    vil.vendor_catalog_item_id,
+    vil.invoice_date as invoice_date,
+    avg(vil.unit_price_cents)::bigint as avg_price_cents
+  from vendor_invoice_lines vil
+  join vendor_invoices vi on vi.id = vil.vendor_invoice_id
+  where vi.vendor_id = p_vendor_id
+    and vil.invoice_date >= (current_date - p_days)
+    and vil.vendor_catalog_item_id is not null
+    and vil.unit_price_cents is not null
+  group by vil.vendor_catalog_item_id, vil.invoice_date
+),
+ranked as (
+  select
+    vendor_catalog_item_id,
+    invoice_date,
+    avg_price_cents,
+    row_number() over (
+      partition by vendor_catalog_item_id
+      order by invoice_date desc
+    ) as rn
+  from invoice_averages
+),
+latest as (
+  select * from ranked where rn = 1
+),
+previous as (
+  select * from ranked where rn = 2
+)
+select
+  latest.vendor_catalog_item_id,
+  vci.vendor_sku,
+  vci.description,
+  latest.invoice_date as latest_invoice_date,
+  latest.avg_price_cents as latest_price_cents,
+  previous.invoice_date as previous_invoice_date,
+  previous.avg_price_cents as previous_price_cents,
+  (latest.avg_price_cents - previous.avg_price_cents) as delta_cents,
+  (latest.avg_price_cents - previous.avg_price_cents)::numeric / previous.avg_price_cents as delta_percent
+from latest
+join previous on previous.vendor_catalog_item_id = latest.vendor_catalog_item_id
+join vendor_catalog_items vci on vci.id = latest.vendor_catalog_item_id
+where previous.avg_price_cents is not null
+  and previous.avg_price_cents <> 0
+  and abs((latest.avg_price_cents - previous.avg_price_cents)::numeric / previous.avg_price_cents) >= p_min_percent_change
+order by abs((latest.avg_price_cents - previous.avg_price_cents)::numeric / previous.avg_price_cents) desc;
+$$;
+
+-- curbside_orders
+
+alter table curbside_orders rename to curbside_orders_unpartitioned;
+alter table curbside_orders_unpartitioned
+  rename constraint curbside_orders_pkey to curbside_orders_unpartitioned_pkey;
+alter table curbside_orders_unpartitioned
+  rename constraint curbside_orders_toast_order_guid_key to curbside_orders_unpartitioned_toast_order_guid_key;
+alter index curbside_orders_updated_at_idx rename to curbside_orders_unpartitioned_updated_at_idx;
+
+-- A partitioned table cannot enforce uniqueness on toast_order_guid alone,
+-- so the guid registry carries that constraint and records which partition
+-- (first_seen_at) holds the order.
+create table if not exists curbside_order_guids (
+  toast_order_guid text primary key,
+  first_seen_at timestamptz not null default now()
+);
+
+alter table curbside_order_guids enable row level security;
+
+create table curbside_orders (
+  id uuid not null default gen_random_uuid(),
+  toast_order_guid text not null,
+  toast_restaurant_guid text null,
+  order_payload jsonb not null,
+  first_seen_at timestamptz not null default now(),
+  updated_at timestamptz not null default now(),
+  primary key (id, first_seen_at),
+  unique (toast_order_guid, first_seen_at)
+) partition by range (first_seen_at);
+
+select public.dm_partition_ensure_month_v1('curbside_orders', months.month::date)
+from generate_series(
+  date_trunc('month', coalesce(
+    (select min(first_seen_at at time zone 'UTC')::date from curbside_orders_unpartitioned),
+    current_date
+  )),
+  date_trunc('month', current_date) + interval '3 months',
+  interval '1 month'
+) as months(month);
+
+insert into curbside_order_guids (toast_order_guid, first_seen_at)
+select toast_order_guid, first_seen_at
+from curbside_orders_unpartitioned;
+
+insert into curbside_orders (
+  id,
+  toast_order_guid,
+  toast_restaurant_guid,
+  order_payload,
+  first_seen_at,
+  updated_at
+)
+select
+  id,
+  toast_order_guid,
+  toast_restaurant_guid,
+  order_payload,
+  first_seen_at,
+  updated_at
+from curbside_orders_unpartitioned;
+
+drop table curbside_orders_unpartitioned;
+
+create index if not exists curbside_orders_toast_order_guid_idx
+  on curbside_orders (toast_order_guid);
+create index if not exists curbside_orders_updated_at_idx
+  on curbside_orders (updated_at);
+
+-- Replaces the PostgREST upsert on toast_order_guid, which needs a unique
+-- constraint the partitioned table no longer has.
+create or replace function public.curbside_order_upsert_v1(
+  p_toast_order_guid text,
+  p_toast_restaurant_guid text,
+  p_order_payload jsonb
+)
+returns timestamptz
+language plpgsql
+as $$
+declare
+  v_first_seen_at timestamptz;
+begin
+  insert into curbside_order_guids (toast_order_guid)
+  values (p_toast_order_guid)
+  on conflict (toast_order_guid) do nothing
+  returning first_seen_at into v_first_seen_at;
+
+  if v_first_seen_at is not null then
+    perform public.dm_partition_ensure_month_v1('curbside_orders', (v_first_seen_at at time zone 'UTC')::date);
+    insert into curbside_orders (
+      toast_order_guid,
+      toast_restaurant_guid,
+      order_payload,
+      first_seen_at
+    )
+    values (
+      p_toast_order_guid,
+      p_toast_restaurant_guid,
+      p_order_payload,
+      v_first_seen_at
+    );
+    return v_first_seen_at;
+  end if;
+
+  select first_seen_at into v_first_seen_at
+  from curbside_order_guids
+  where toast_order_guid = p_toast_order_guid;
+
+  update curbside_orders
+  set
+    toast_restaurant_guid = p_toast_restaurant_guid,
+    order_payload = p_order_payload,
+    updated_at = now()
+  where toast_order_guid = p_toast_order_guid
+    and first_seen_at = v_first_seen_at;
+
+  return v_first_seen_at;
+end;
+$$;
+
+-- Keep a few months of partitions ahead of the clock. Ingest paths also call
+-- dm_partition_ensure_month_v1 directly, so this is a warm up, not a gate.
+do $do$
+begin
+  if exists (select 1 from pg_extension where extname = 'pg_cron') then
+    perform cron.schedule(
+      'dm_partitions_ensure_v1',
+      '15 3 * * *',
+      $cron$select public.dm_partitions_ensure_v1(3)$cron$
+    );
+  end if;
+end;
+$do$;
@@ -0,0 +1,304 @@
+-- Typed projection of the Toast order payload. curbside_order_upsert_v1 fills
+-- it at ingest time; ops_tooling/scripts/toast_api/toast_order_project.py
+-- backfills it from snapshots. Readers that only need these fields no longer
+-- parse order_payload.
+
+alter table curbside_orders
+  add column if not exists business_date date null,
+  add column if not exists dining_option_guid text null,
+  add column if not exists order_source text null,
+  add column if not exists display_number text null,
+  add column if not exists customer_name text null,
+  add column if not exists customer_phone text null,
+  add column if not exists curbside_transport_color text null,
+  add column if not exists curbside_transport_description text null,
+  add column if not exists curbside_notes text null,
+  add column if not exists check_count int null,
+  add column if not exists selection_count int null,
+  add column if not exists total_amount_cents bigint null,
+  add column if not exists tax_amount_cents bigint null,
+  add column if not exists opened_at timestamptz null,
+  add column if not exists closed_at timestamptz null,
+  add column if not exists promised_at timestamptz null,
+  add column if not exists toast_modified_at timestamptz null,
+  add column if not exists projection_version int null;
+
+create index if not exists curbside_orders_business_date_idx
+  on curbside_orders (business_date);
+
+-- Applies a batch of projected rows in one call. Rows are matched through the
+-- guid registry so the update only touches the partition that holds the order.
+create or replace function public.curbside_orders_project_v1(
+  p_rows jsonb
+)
+returns int
+language plpgsql
+as $$
+declare
+  v_updated int;
+begin
+  update curbside_orders co
+  set
+    business_date = r.business_date,
+    dining_option_guid = r.dining_option_guid,
+    order_source = r.order_source,
+    display_number = r.display_number,
+    customer_name = r.customer_name,
+    customer_phone = r.customer_phone,
+    curbside_transport_color = r.curbside_transport_color,
+    curbside_transport_description = r.curbside_transport_description,
+    curbside_notes = r.curbside_notes,
+    check_count = r.check_count,
+    selection_count = r.selection_count,
+    total_amount_cents = r.total_amount_cents,
+    tax_amount_cents = r.tax_amount_cents,
+    opened_at = r.opened_at,
+    closed_at = r.closed_at,
+    promised_at = r.promised_at,
+    toast_modified_at = r.toast_modified_at,
+    projection_version = r.projection_version
+  from jsonb_to_recordset(p_rows) as r(
+    toast_order_guid text,
+    business_date date,
+    dining_option_guid text,
+    order_source text,
+    display_number text,
+    customer_name text,
+    customer_phone text,
+    curbside_transport_color text,
+    curbside_transport_description text,
+    curbside_notes text,
+    check_count int,
+    selection_count int,
+    total_amount_cents bigint,
+    tax_amount_cents bigint,
+    opened_at timestamptz,
+    closed_at timestamptz,
+    promised_at timestamptz,
+    toast_modified_at timestamptz,
+    projection_version int
+  )
+  join curbside_order_guids g on g.toast_order_guid = r.toast_order_guid
+  where co.toast_order_guid = r.toast_order_guid
+    and co.first_seen_at = g.first_seen_at;
+
+  get diagnostics v_updated = row_count;
+  return v_updated;
+end;
+$$;
+
+-- Ingest time projection. Mirrors PROJECTION in toast_order_project.py
+-- (keep projection_version in step). Values that do not cast become null
+-- rather than failing the webhook insert.
+create or replace function public.curbside_order_cast_ts_v1(p_value jsonb)
+returns timestamptz
+language plpgsql
+immutable
+as $$
+begin
+  if jsonb_typeof(p_value) is distinct from 'string' then
+    return null;
+  end if;
+  return (p_value #>> '{}')::timestamptz;
+exception when others then
+  return null;
+end;
+$$;
+
+create or replace function public.curbside_order_cast_business_date_v1(p_value jsonb)
+returns date
+language plpgsql
+immutable
+as $$
+begin
+  if coalesce(p_value #>> '{}', '') !~ '^[0-9]{8}$' then
+    return null;
+  end if;
+  return make_date(
+    substr(p_value #>> '{}', 1, 4)::int,
+    substr(p_value #>> '{}', 5, 2)::int,
+    substr(p_value #>> '{}', 7, 2)::int
+  );
+exception when others then
+  return null;
+end;
+$$;
+
+create or replace function public.curbside_order_projection_v1(p_order jsonb)
+returns table (
+  business_date date,
+  dining_option_guid text,
+  order_source text,
+  display_number text,
+  customer_name text,
+  customer_phone text,
+  curbside_transport_color text,
+  curbside_transport_description text,
+  curbside_notes text,
+  check_count int,
+  selection_count int,
+  total_amount_cents bigint,
+  tax_amount_cents bigint,
+  opened_at timestamptz,
+  closed_at timestamptz,
+  promised_at timestamptz,
+  toast_modified_at timestamptz,
+  projection_version int
+)
+language sql
+immutable
+as $$
+  with checks as (
+    select c.chk, c.n
+    from jsonb_array_elements(
+      case when jsonb_typeof(p_order -> 'checks') = 'array' then p_order -> 'checks' else '[]'::jsonb end
+    ) with ordinality as c(chk, n)
+  )
+  select
+    public.curbside_order_cast_business_date_v1(p_order -> 'businessDate'),
+    p_order -> 'diningOption' ->> 'guid',
+    p_order ->> 'source',
+    coalesce(
+      p_order ->> 'displayNumber',
+      (select chk ->> 'displayNumber' from checks where chk ->> 'displayNumber' is not null order by n limit 1)
+    ),
+    coalesce(
+      nullif((select chk ->> 'tabName' from checks where chk ->> 'tabName' is not null order by n limit 1), ''),
+      nullif(concat_ws(
+        ' ',
+        nullif((select chk -> 'customer' ->> 'firstName' from checks
+                where chk -> 'customer' ->> 'firstName' is not null order by n limit 1), ''),
+        nullif((select chk -> 'customer' ->> 'lastName' from checks
+                where chk -> 'customer' ->> 'lastName' is not null order by n limit 1), '')
+      ), '')
+    ),
+    (select chk -> 'customer' ->> 'phone' from checks where chk -> 'customer' ->> 'phone' is not null order by n limit 1),
+    p_order -> 'curbsidePickupInfo' ->> 'transportColor',
+    p_order -> 'curbsidePickupInfo' ->> 'transportDescription',
+    p_order -> 'curbsidePickupInfo' ->> 'notes',
+    (select count(*) from checks)::int,
+    (select coalesce(sum(jsonb_array_length(chk -> 'selections')), 0) from checks
+     where jsonb_typeof(chk -> 'selections') = 'array')::int,
+    (select sum(round((chk ->> 'totalAmount')::numeric * 100))::bigint from checks
+     where jsonb_typeof(chk -> 'totalAmount') = 'number'),
+    (select sum(round((chk ->> 'taxAmount')::numeric * 100))::bigint from checks
+     where jsonb_typeof(chk -> 'taxAmount') = 'number'),
+    public.curbside_order_cast_ts_v1(p_order -> 'openedDate'),
+    public.curbside_order_cast_ts_v1(p_order -> 'closedDate'),
+    public.curbside_order_cast_ts_v1(p_order -> 'promisedDate'),
+    public.curbside_order_cast_ts_v1(p_order -> 'modifiedDate'),
+    1;
+$$;
+
+-- The webhook path (toast_webhook_capture) stores the typed columns together
+-- with the payload, so they never lag order_payload.
+create or replace function public.curbside_order_upsert_v1(
+  p_toast_order_guid text,
+  p_toast_restaurant_guid text,
+  p_order_payload jsonb
+)
+returns timestamptz
+language plpgsql
+as $$
+declare
+  v_first_seen_at timestamptz;
+begin
+  insert into curbside_order_guids (toast_order_guid)
+  values (p_toast_order_guid)
+  on conflict (toast_order_guid) do nothing
+  returning first_seen_at into v_first_seen_at;
+
+  if v_first_seen_at is not null then
+    perform public.dm_partition_ensure_month_v1('curbside_orders', (v_first_seen_at at time zone 'UTC')::date);
+    insert into curbside_orders (
+      toast_order_guid,
+      toast_restaurant_guid,
+      order_payload,
+      first_seen_at,
+      business_date,
+      dining_option_guid,
+      order_source,
+      display_number,
+      customer_name,
+      customer_phone,
+      curbside_transport_color,
+      curbside_transport_description,
+      curbside_notes,
+      check_count,
+      selection_count,
+      total_amount_cents,
+      tax_amount_cents,
+      opened_at,
+      closed_at,
+      promised_at,
+      toast_modified_at,
+      projection_version
+    )
+    select
+      p_toast_order_guid,
+      p_toast_restaurant_guid,
+      p_order_payload,
+      v_first_seen_at,
+      pr.*
+    from public.curbside_order_projection_v1(p_order_payload) pr;
+    return v_first_seen_at;
+  end if;
+
+  select first_seen_at into v_first_seen_at
+  from curbside_order_guids
+  where toast_order_guid = p_toast_order_guid;
+
+  update curbside_orders co
+  set
+    toast_restaurant_guid = p_toast_restaurant_guid,
+    order_payload = p_order_payload,
+    updated_at = now(),
+    business_date = pr.business_date,
+    dining_option_guid = pr.dining_option_guid,
+    order_source = pr.order_source,
+    display_number = pr.display_number,
+    customer_name = pr.customer_name,
+    customer_phone = pr.customer_phone,
+    curbside_transport_color = pr.curbside_transport_color,
+    curbside_transport_description = pr.curbside_transport_description,
+    curbside_notes = pr.curbside_notes,
+    check_count = pr.check_count,
+    selection_count = pr.selection_count,
+    total_amount_cents = pr.total_amount_cents,
+    tax_amount_cents = pr.tax_amount_cents,
+    opened_at = pr.opened_at,
+    closed_at = pr.closed_at,
+    promised_at = pr.promised_at,
+    toast_modified_at = pr.toast_modified_at,
+    projection_version = pr.projection_version
+  from public.curbside_order_projection_v1(p_order_payload) pr
+  where co.toast_order_guid = p_toast_order_guid
+    and co.first_seen_at = v_first_seen_at;
+
+  return v_first_seen_at;
+end;
+$$;
+
+-- Backfill rows stored before this migration.
+update curbside_orders co
+set (
+  business_date,
+  dining_option_guid,
+  order_source,
+  display_number,
+  customer_name,
+  customer_phone,
+  curbside_transport_color,
+  curbside_transport_description,
+  curbside_notes,
+  check_count,
+  selection_count,
+  total_amount_cents,
+  tax_amount_cents,
+  opened_at,
+  closed_at,
+  promised_at,
+  toast_modified_at,
+  projection_version
+) = (select pr.* from public.curbside_order_projection_v1(co.order_payload) pr)
+where co.projection_version is null;
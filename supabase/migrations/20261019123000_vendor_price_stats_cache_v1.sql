@@ -0,0 +1,200 @@
+-- Precomputed vendor price analytics, filled by
+-- ops_tooling/scripts/vendor_price_history.py. Price review reads come from
+-- these tables instead of scanning vendor_invoice_lines.
+
+-- The engine pulls new lines by created_at, so keep that pull off a full scan.
+create index if not exists vendor_invoice_lines_created_at_id_idx
+  on vendor_invoice_lines (created_at, id);
+
+-- One row per catalog item and review window (7, 14, 28, 56, 90 days).
+create table if not exists vendor_price_stats (
+  vendor_catalog_item_id uuid not null references vendor_catalog_items(id) on delete cascade,
+  window_days int not null,
+  vendor_id uuid not null references vendors(id) on delete cascade,
+  vendor_sku text null,
+  description text null,
+  latest_invoice_date date not null,
+  latest_price_cents bigint not null,
+  previous_invoice_date date null,
+  previous_price_cents bigint null,
+  delta_cents bigint null,
+  delta_percent numeric null,
+  latest_unit_cost_cents numeric null,
+  rolling_avg_price_cents numeric not null,
+  rolling_volatility numeric null,
+  vs_rolling_percent numeric null,
+  alert boolean not null default false,
+  computed_at timestamptz not null default now(),
+  primary key (vendor_catalog_item_id, window_days)
+);
+
+create index if not exists vendor_price_stats_vendor_window_idx
+  on vendor_price_stats (vendor_id, window_days);
+
+-- Daily invoice averages per item for the longest review window.
+create table if not exists vendor_price_series (
+  vendor_catalog_item_id uuid primary key references vendor_catalog_items(id) on delete cascade,
+  vendor_id uuid not null references vendors(id) on delete cascade,
+  points jsonb not null,
+  computed_at timestamptz not null default now()
+);
+
+create index if not exists vendor_price_series_vendor_id_idx
+  on vendor_price_series (vendor_id);
+
+alter table vendor_price_stats enable row level security;
+alter table vendor_price_series enable row level security;
+
+create policy vendor_price_stats_service_role_all
+  on vendor_price_stats
+  for all
+  using (auth.role() = 'service_role')
+  with check (auth.role() = 'service_role');
+
+create policy vendor_price_stats_authenticated_select
+  on vendor_price_stats
+  for select
+  using (auth.role() = 'authenticated');
+
+create policy vendor_price_series_service_role_all
+  on vendor_price_series
+  for all
+  using (auth.role() = 'service_role')
+  with check (auth.role() = 'service_role');
+
+create policy vendor_price_series_authenticated_select
+  on vendor_price_series
+  for select
+  using (auth.role() = 'authenticated');
+
+-- Replaces one vendor's cached stats and series in a single transaction.
+create or replace function public.vendor_price_stats_publish_v1(
+  p_vendor_id uuid,
+  p_stats jsonb,
+  p_series jsonb
+)
+returns int
+language plpgsql
+as $$
+declare
+  v_rows int;
+begin
+  delete from vendor_price_stats where vendor_id = p_vendor_id;
+  delete from vendor_price_series where vendor_id = p_vendor_id;
+
+  insert into vendor_price_stats (
+    vendor_catalog_item_id,
+    window_days,
+    vendor_id,
+    vendor_sku,
+    description,
+    latest_invoice_date,
+    latest_price_cents,
+    previous_invoice_date,
+    previous_price_cents,
+    delta_cents,
+    delta_percent,
+    latest_unit_cost_cents,
+    rolling_avg_price_cents,
+    rolling_volatility,
+    vs_rolling_percent,
+    alert
+  )
+  select
+    r.vendor_catalog_item_id,
+    r.window_days,
+    p_vendor_id,
+    r.vendor_sku,
+    r.description,
+    r.latest_invoice_date,
+    r.latest_price_cents,
+    r.previous_invoice_date,
+    r.previous_price_cents,
+    r.delta_cents,
+    r.delta_percent,
+    r.latest_unit_cost_cents,
+    r.rolling_avg_price_cents,
+    r.rolling_volatility,
+    r.vs_rolling_percent,
+    coalesce(r.alert, false)
+  from jsonb_to_recordset(p_stats) as r(
+    vendor_catalog_item_id uuid,
+    window_days int,
+    vendor_sku text,
+    description text,
+    latest_invoice_date date,
+    latest_price_cents bigint,
+    previous_invoice_date date,
+    previous_price_cents bigint,
+    delta_cents bigint,
+    delta_percent numeric,
+    latest_unit_cost_cents numeric,
+    rolling_avg_price_cents numeric,
+    rolling_volatility numeric,
+    vs_rolling_percent numeric,
+    alert boolean
+  );
+  get diagnostics v_rows = row_count;
+
+  insert into vendor_price_series (vendor_catalog_item_id, vendor_id, points)
+  select r.vendor_catalog_item_id, p_vendor_id, r.points
+  from jsonb_to_recordset(p_series) as r(vendor_catalog_item_id uuid, points jsonb);
+
+  return v_rows;
+end;
+$$;
+
+-- Same result shape as vendor_price_changes_v1. Served from the cache when it
+-- holds a fresh run for the vendor and window, otherwise computed live.
+create or replace function public.vendor_price_changes_cached_v1(
+  p_vendor_id uuid,
+  p_days int default 28,
+  p_min_percent_change numeric default 0.02
+)
+returns table(
+  vendor_catalog_item_id uuid,
+  vendor_sku text,
+  description text,
+  latest_invoice_date date,
+  latest_price_cents bigint,
+  previous_invoice_date date,
+  previous_price_cents bigint,
+  delta_cents bigint,
+  delta_percent numeric
+)
+language plpgsql
+stable
+as $$
+begin
+  if exists (
+    select 1
+    from vendor_price_stats s
+    where s.vendor_id = p_vendor_id
+      and s.window_days = p_days
+      and s.computed_at >= now() - interval '36 hours'
+  ) then
+    return query
+    select
+      s.vendor_catalog_item_id,
+      s.vendor_sku,
+      s.description,
+      s.latest_invoice_date,
+      s.latest_price_cents,
+      s.previous_invoice_date,
+      s.previous_price_cents,
+      s.delta_cents,
+      s.delta_percent
+    from vendor_price_stats s
+    where s.vendor_id = p_vendor_id
+      and s.window_days = p_days
+      and s.previous_price_cents is not null
+      and s.previous_price_cents <> 0
+      and abs(s.delta_percent) >= p_min_percent_change
+    order by abs(s.delta_percent) desc;
+    return;
+  end if;
+
+  return query
+  select * from vendor_price_changes_v1(p_vendor_id, p_days, p_min_percent_change);
+end;
+$$;
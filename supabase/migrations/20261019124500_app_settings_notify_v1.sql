@@ -0,0 +1,34 @@
+-- Announce app_settings changes on the app_settings_changed channel so
+-- long running clients (ops_tooling/scripts/toast_api/app_settings_client.py)
+-- can keep an in-memory copy without polling. The payload names the key and
+-- the operation; listeners read the new value themselves, which keeps large
+-- values clear of the 8000 byte NOTIFY limit.
+
+create or replace function public.app_settings_notify_change()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op = 'TRUNCATE' then
+    perform pg_notify('app_settings_changed', json_build_object('op', tg_op)::text);
+  elsif tg_op = 'DELETE' then
+    perform pg_notify('app_settings_changed', json_build_object('op', tg_op, 'key', old.key)::text);
+  else
+    perform pg_notify('app_settings_changed', json_build_object('op', tg_op, 'key', new.key)::text);
+    if tg_op = 'UPDATE' and old.key is distinct from new.key then
+      perform pg_notify('app_settings_changed', json_build_object('op', 'DELETE', 'key', old.key)::text);
+    end if;
+  end if;
+  return null;
+end;
+$$;
+
+create trigger app_settings_notify_change
+after insert or update or delete on app_settings
+for each row
+execute function public.app_settings_notify_change();
+
+create trigger app_settings_notify_truncate
+after truncate on app_settings
+for each statement
+execute function public.app_settings_notify_change();
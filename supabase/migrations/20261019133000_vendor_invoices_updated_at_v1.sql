@@ -0,0 +1,12 @@
+-- Stamp vendor invoices on every update. Re-ingesting an invoice upserts this
+-- row before its lines are deleted and inserted again, and an invoice_date
+-- change is an update too, so ops_tooling/scripts/vendor_price_history.py
+-- uses updated_at to find invoices whose lines it must pull again.
+
+alter table vendor_invoices
+  add column if not exists updated_at timestamptz not null default now();
+
+create trigger vendor_invoices_set_updated_at
+before update on vendor_invoices
+for each row
+execute function public.set_updated_at_timestamp();